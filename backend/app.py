@@ -1,17 +1,82 @@
 # -*- encoding: utf-8 -*-
 
 import os
-from core import app, db
+
+import click
+
+from core import app, db, startup
+from core.apis.spec import api_spec
+from core.models import JWTTokenBlocklist
+from core.outbox import outbox
+from core.presence import presence_buffer
+from core.ratelimit import rate_limiter
+from core.schema import SchemaMismatch, add_missing_columns, bootstrap_schema, create_missing_indexes
+from core.search import create_search_indexes
 
 @app.shell_context_processor
 def make_shell_context():
     return {"app": app, "db": db}
 
+# flask --app app init-db
+@app.cli.command("init-db")
+def init_db():
+    """Create the missing tables, columns and indexes and record the schema fingerprint."""
+    # columns added to the models since the tables were created (user.token_version on a database from before it)
+    for name in add_missing_columns():
+        print(f"Added column {name}.")
+    # indexes added to the models since the tables were created
+    for name in create_missing_indexes():
+        print(f"Created index {name}.")
+    # indexes the existing rows, a while on large tables
+    for name in create_search_indexes(db.engine):
+        print(f"Created full-text index {name}.")
+    try:
+        fingerprint = bootstrap_schema()
+    except SchemaMismatch as error:
+        raise click.ClickException(str(error))
+    print(f"Schema fingerprint {fingerprint}.")
+
+# flask --app app build-spec
+@app.cli.command("build-spec")
+def build_spec():
+    """Generate swagger.json (and its gzip) into API_SPEC_FILE."""
+    path = api_spec.build()
+    print(f"Wrote {path}.")
+
+# flask --app app purge-blocklist
+@app.cli.command("purge-blocklist")
+def purge_blocklist():
+    """Delete blocklist entries whose tokens have already expired."""
+    deleted = JWTTokenBlocklist.purge_expired()
+    print(f"Purged {deleted} expired blocklist entries.")
+
+# flask --app app send-outbox
+@app.cli.command("send-outbox")
+def send_outbox():
+    """Send all due messages in the email outbox, delete the expired sent ones."""
+    sent = outbox.flush()
+    print(f"Sent {sent} outbox messages.")
+    purged = outbox.purge()
+    print(f"Deleted {purged} sent messages past the retention period.")
+
+# flask --app app flush-presence
+@app.cli.command("flush-presence")
+def flush_presence():
+    """Write the buffered last_online timestamps."""
+    written = presence_buffer.flush()
+    print(f"Updated last_online for {written} users.")
+
+# flask --app app purge-rate-limits
+@app.cli.command("purge-rate-limits")
+def purge_rate_limits():
+    """Delete rate limit buckets idle for a day."""
+    rate_limiter.purge()
+    print("Purged idle rate limit buckets.")
+
 # python3 app.py
 if __name__ == '__main__':
-    # !!! For production: Waitress server
-    # from waitress import serve
-    # serve(app, host="0.0.0.0", port=os.getenv('PORT', 8000))
+    # !!! For production: python3 serve.py (Waitress, prefork workers, see serve.py)
     
     # !!! For development: Flask server
+    startup()
     app.run(debug=True, host="0.0.0.0", port=os.getenv('PORT', 8000))
@@ -0,0 +1,89 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Request latency added by the access log
+
+    Times an authenticated GET /api/v1/courses with the access log off, written through
+    the queue and writer thread, and written synchronously on the request thread, first to
+    a file, then to a slow sink (--sink-delay ms per write, a congested disk or log pipe).
+
+        python benchmarks/access_log.py --requests 2000 --sink-delay 2
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+class SlowHandler(logging.FileHandler):
+    def __init__(self, path, delay):
+        super().__init__(path)
+        self.delay = delay
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        super().emit(record)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--sink-delay", type=float, default=2, help="ms per write of the slow sink")
+    args = parser.parse_args()
+
+    log_dir = tempfile.mkdtemp()
+    os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(log_dir, "bench.db"))
+    os.environ["ACCESS_LOG_ENABLED"] = "true"
+    os.environ["ACCESS_LOG_FILE"] = os.path.join(log_dir, "access.log")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from core import app, startup
+    from core.accesslog import JSONFormatter, access_log
+    from core.apis.user import create_access_token
+    from core.models import User
+    startup()
+
+    with app.app_context():
+        user = User("bench", "bench@uic.edu.cn", "Passw0rdBench", "TEACHER", "ACTIVE")
+        user.save()
+        token = "Bearer " + create_access_token(user)
+    client = app.test_client()
+    queued = access_log.handler
+    file_sink = access_log.target
+    slow_sink = SlowHandler(os.path.join(log_dir, "slow.log"), args.sink_delay / 1000)
+    slow_sink.setFormatter(JSONFormatter())
+
+    def run(handler, target):
+        access_log.stop()
+        access_log.logger.handlers = [handler] if handler else []
+        access_log.target = target
+        latencies = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            client.get("/api/v1/courses", headers={"Authorization": token})
+            latencies.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        access_log.stop()
+        return latencies, time.perf_counter() - started
+
+    for _ in range(100):
+        client.get("/api/v1/courses", headers={"Authorization": token})
+    modes = [("off", None, file_sink),
+             ("queued, file", queued, file_sink),
+             ("sync, file", file_sink, file_sink),
+             ("queued, slow sink", queued, slow_sink),
+             ("sync, slow sink", slow_sink, slow_sink)]
+    for name, handler, target in modes:
+        dropped = queued.dropped
+        latencies, drain = run(handler, target)
+        latencies.sort()
+        print(f"{name:18} mean {statistics.mean(latencies) * 1000:7.3f} ms   p50 {latencies[len(latencies) // 2] * 1000:7.3f} ms   "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.3f} ms   dropped {queued.dropped - dropped:5d}   drained in {drain:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Cost of serving /api/v1/swagger.json
+
+    Compares flask-restx's SwaggerView (spec built on first use in each worker, then
+    re-serialized on every request) with the cached artifact (bytes built once, gzip, ETag),
+    and reports the bytes on the wire for a plain, a gzip and a revalidating (If-None-Match) client.
+
+        python benchmarks/api_spec.py --requests 500
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+    os.environ["API_SPEC_FILE"] = os.path.join(tempfile.mkdtemp(), "swagger.json")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from flask_restx.api import SwaggerView
+    from core import app, rest_api, startup
+    from core.apis.spec import api_spec
+    startup()
+
+    client = app.test_client()
+    cached_view = app.view_functions["specs"]
+
+    started = time.perf_counter()
+    with app.test_request_context():
+        rest_api.__schema__
+    print(f"first build of the spec                {(time.perf_counter() - started) * 1000:8.1f} ms (per worker, without the cache)")
+
+    def run(headers):
+        latencies = []
+        size = 0
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            response = client.get("/api/v1/swagger.json", headers=headers)
+            latencies.append(time.perf_counter() - started)
+            size = len(response.data)
+        return statistics.mean(latencies) * 1000, size
+
+    app.view_functions["specs"] = SwaggerView.as_view("specs", rest_api)
+    restx, restx_size = run({})
+    app.view_functions["specs"] = cached_view
+    api_spec.load()
+    plain, plain_size = run({})
+    compressed, gzip_size = run({"Accept-Encoding": "gzip"})
+    revalidated, revalidated_size = run({"Accept-Encoding": "gzip", "If-None-Match": f'"{api_spec.etag}-gz"'})
+
+    print(f"restx SwaggerView                      {restx:8.3f} ms  {restx_size:7d} bytes")
+    print(f"cached, identity                       {plain:8.3f} ms  {plain_size:7d} bytes")
+    print(f"cached, gzip                           {compressed:8.3f} ms  {gzip_size:7d} bytes")
+    print(f"cached, If-None-Match (304)            {revalidated:8.3f} ms  {revalidated_size:7d} bytes")
+
+
+if __name__ == '__main__':
+    main()
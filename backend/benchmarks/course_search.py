@@ -0,0 +1,99 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Course name/code search per keystroke, ILIKE against the in-memory course index
+
+    Fills a throwaway SQLite database with --courses courses and --questions questions, then, for each
+    prefix of a few typed keywords, times the course search and the questions-by-course search
+    (page 1 + exact total) the way they ran before (ILIKE on course_code and course_name, joined for
+    the questions) and with the index (`course_id IN (...)`), and the autocomplete lookup alone.
+
+        python benchmarks/course_search.py --courses 5000 --questions 500000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BATCH = 50000
+
+SUBJECTS = ["Programming", "Data", "Structures", "Algorithms", "Calculus", "Linear", "Algebra", "Probability", "Statistics",
+            "Physics", "Chemistry", "Biology", "Economics", "Accounting", "Finance", "Marketing", "History", "Literature",
+            "Networks", "Databases", "Operating", "Systems", "Machine", "Learning", "Design", "Analysis", "Introduction"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=500000)
+    parser.add_argument("--keywords", default="COMP2013,data struct,calculus")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+    # time the COUNT itself, not the count cache
+    os.environ.setdefault("COUNT_CACHE_SIZE", "0")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from sqlalchemy import insert
+    from core import app, db, startup
+    from core.models import Course, Question
+    from core.pagination import paginate
+    startup()
+
+    def timed(func, repeat=args.repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return result, best * 1000
+
+    random.seed(0)
+    prefixes = ["COMP", "MATH", "STAT", "PHYS", "CHEM", "BIOL", "ECON", "ACCT", "FINA", "MKTG", "HIST", "LITR"]
+    with app.app_context():
+        started = time.perf_counter()
+        db.session.execute(insert(Course.__table__), [{"id": i, "course_code": f"{random.choice(prefixes)}{i:04d}",
+                                                       "course_name": " ".join(random.sample(SUBJECTS, random.randint(2, 4))),
+                                                       "course_category": random.choice(["PROG", "MATH", "SCI", "BUS"])}
+                                                      for i in range(1, args.courses + 1)])
+        rows = [{"id": i, "question_text": f"Question {i}", "question_category": "PROG", "question_score": 5,
+                 "course_id": random.randint(1, args.courses)} for i in range(1, args.questions + 1)]
+        for start in range(0, len(rows), BATCH):
+            db.session.execute(insert(Question.__table__), rows[start:start + BATCH])
+        db.session.commit()
+        print(f"inserted {args.courses} courses and {args.questions} questions in {time.perf_counter() - started:.1f}s")
+
+        _, build_ms = timed(Course.rebuild_index, 1)
+        print(f"built the course index in {build_ms:.1f} ms")
+
+        def ilike_courses(keyword):
+            return paginate(Course.query.filter(Course.course_name.ilike(f"%{keyword}%") | Course.course_code.ilike(f"%{keyword}%")),
+                            1, args.page_size)
+
+        def ilike_questions(keyword):
+            return paginate(Question.query.join(Course).filter(Course.course_code.ilike(f"%{keyword}%") | Course.course_name.ilike(f"%{keyword}%")),
+                            1, args.page_size)
+
+        print(f"{'typed':16} {'courses':>9} {'ilike':>8} {'index':>8}   {'questions':>9} {'ilike':>8} {'index':>8}   {'autocomplete':>12}")
+        print(f"{'':16} {'':>9} {'(ms)':>8} {'(ms)':>8}   {'':>9} {'(ms)':>8} {'(ms)':>8}   {'(us)':>12}")
+        for keyword in args.keywords.split(","):
+            for end in range(1, len(keyword) + 1):
+                typed = keyword[:end]
+                (_, courses, _), courses_ilike_ms = timed(lambda: ilike_courses(typed))
+                (_, indexed_courses, _), courses_index_ms = timed(lambda: Course.get_courses_by_name_or_code_paginated(typed, 1, args.page_size))
+                (_, questions, _), questions_ilike_ms = timed(lambda: ilike_questions(typed))
+                (_, indexed_questions, _), questions_index_ms = timed(lambda: Question.get_questions_by_course_name_or_code_paginated(typed, 1, args.page_size))
+                assert (courses, questions) == (indexed_courses, indexed_questions), typed
+                _, autocomplete_ms = timed(lambda: Course.autocomplete(typed), 1000)
+                print(f"{typed!r:16} {courses:9d} {courses_ilike_ms:8.2f} {courses_index_ms:8.2f}   "
+                      f"{questions:9d} {questions_ilike_ms:8.2f} {questions_index_ms:8.2f}   {autocomplete_ms * 1000:12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Latency of deep pages, OFFSET (current/pageSize) against keyset cursors
+
+    Fills a throwaway SQLite database with --rows requests, and --children answers of one question
+    and experiments of one user, then times GET /api/v1/requests (newest first), /answers and
+    /experiments at increasing page numbers, once with `current` and once with the `cursor`
+    of the same page. The OFFSET timings include the COUNT the endpoint runs on every page.
+
+        python benchmarks/deep_pages.py --rows 1000000 --children 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BATCH = 50000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="requests")
+    parser.add_argument("--children", type=int, default=200000, help="answers of one question, experiments of one user")
+    parser.add_argument("--pages", default="1,100,1000,10000,20000")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+    # time the COUNT itself, not the count cache
+    os.environ.setdefault("COUNT_CACHE_SIZE", "0")
+    os.environ.setdefault("ACCESS_LOG_ENABLED", "false")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from sqlalchemy import insert
+    from core import app, db, startup
+    from core.apis.user import create_access_token
+    from core.models import Answer, Course, Experiment, Question, Request, RequestAddCourse, User
+    from core.pagination import encode_cursor
+    startup()
+
+    def fill(table, rows):
+        rows = list(rows)
+        for start in range(0, len(rows), BATCH):
+            db.session.execute(insert(table), rows[start:start + BATCH])
+
+    random.seed(0)
+    with app.app_context():
+        user = User("bench", "bench@uic.edu.cn", "Passw0rdBench", "ADMIN", "ACTIVE")
+        user.save()
+        token = "Bearer " + create_access_token(user)
+        course = Course.add_course("BENCH001", "Benchmark course", "Benchmark")
+        question = Question.add_question("Benchmark question", "PROG", 10, course.id)
+        started = time.perf_counter()
+        fill(Request.__table__, ({"id": i, "user_id": user.id, "request_type": "ADD_COURSE",
+                                  "request_status": random.choice(["PENDING", "APPROVED", "REJECTED"])} for i in range(1, args.rows + 1)))
+        fill(RequestAddCourse.__table__, ({"request_id": i, "course_code": f"C{i}", "course_name": f"Course {i}",
+                                           "course_category": "Benchmark"} for i in range(1, args.rows + 1)))
+        fill(Answer.__table__, ({"question_id": question.id, "llm_name": "GPT-4", "answer_text": f"Answer {i}", "score": 5.0,
+                                 "score_update_count": 1} for i in range(args.children)))
+        fill(Experiment.__table__, ({"user_id": user.id, "question_id": question.id, "experiment_text": f"Experiment {i}",
+                                     "is_answer": False} for i in range(args.children)))
+        db.session.commit()
+        print(f"inserted {args.rows} requests, {args.children} answers and experiments in {time.perf_counter() - started:.1f}s")
+
+        endpoints = [
+            ("requests", "/api/v1/requests?desc_order=true", Request.query.order_by(Request.id.desc())),
+            ("answers", f"/api/v1/answers?question_id={question.id}", Answer.query.filter_by(question_id=question.id).order_by(Answer.id)),
+            ("experiments", "/api/v1/experiments?", Experiment.query.filter_by(user_id=user.id).order_by(Experiment.id)),
+        ]
+        # the cursor of page n is the id of the last row of page n - 1
+        cursors = {}
+        for name, _, query in endpoints:
+            for page in map(int, args.pages.split(",")):
+                last = query.offset((page - 1) * args.page_size - 1).limit(1).first() if page > 1 else None
+                cursors[name, page] = encode_cursor([last.id]) if last else ""
+
+    client = app.test_client()
+    headers = {"Authorization": token}
+
+    def timed(url):
+        best = None
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            response = client.get(url, headers=headers)
+            elapsed = time.perf_counter() - started
+            assert response.status_code == 200, response.json
+            best = elapsed if best is None else min(best, elapsed)
+        return response.json["data"], best * 1000
+
+    print(f"{'endpoint':12} {'page':>7} {'offset':>10} {'cursor':>10}   (page of {args.page_size}, best of {args.repeat}, ms)")
+    for name, url, _ in endpoints:
+        for page in map(int, args.pages.split(",")):
+            offset_page, offset_ms = timed(f"{url}&current={page}&pageSize={args.page_size}")
+            cursor_page, cursor_ms = timed(f"{url}&cursor={cursors[name, page]}&pageSize={args.page_size}")
+            assert offset_page[name] == cursor_page[name], (name, page)
+            print(f"{name:12} {page:7d} {offset_ms:10.2f} {cursor_ms:10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Keyword search, ILIKE scans against the full-text indexes
+
+    Fills a throwaway SQLite database with --rows questions and help topics of generated, LLM-like
+    text (a few hundred common words and a long tail of rare ones), drops the full-text indexes,
+    times page 1 (rows + exact total) of the question and help topic searches on the ILIKE fallback,
+    then builds the indexes (what `flask --app app init-db` does on an existing database) and times
+    the same searches on FTS5. ILIKE matches substrings and FTS5 word prefixes, so the match counts
+    can differ a little.
+
+        python benchmarks/full_text_search.py --rows 500000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BATCH = 50000
+
+COMMON = ("the a of to and in is that for it as with on be this by are or an function value variable "
+          "return loop list array string number program code data type error call memory pointer "
+          "object class method example result input output recursion stack queue tree node graph "
+          "search sort algorithm complexity time space binary hash table index key order case base "
+          "step first second each every when which then also can will may should use using used").split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500000, help="questions and help topics each")
+    parser.add_argument("--rare-words", type=int, default=50000)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+    # time the COUNT itself, not the count cache
+    os.environ.setdefault("COUNT_CACHE_SIZE", "0")
+    os.environ.setdefault("ACCESS_LOG_ENABLED", "false")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from sqlalchemy import insert
+    from core import app, db, startup
+    from core.models import Course, HelpTopic, Question
+    from core.search import SEARCH_INDEXES, create_search_indexes
+    startup()
+
+    random.seed(0)
+    syllables = ["ka", "lo", "mi", "ne", "ru", "ta", "vo", "zen", "qui", "dra", "pel", "sor", "tix", "bun"]
+    rare = list({"".join(random.choices(syllables, k=4)) for _ in range(args.rare_words)})
+
+    def sentence(words):
+        # four common words out of five, the rest from the long tail
+        return " ".join(random.choice(COMMON) if random.random() < 0.8 else random.choice(rare) for _ in range(words)).capitalize() + "."
+
+    def fill(table, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == BATCH:
+                db.session.execute(insert(table), batch)
+                batch = []
+        if batch:
+            db.session.execute(insert(table), batch)
+
+    def timed(func):
+        best = None
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return result, best * 1000
+
+    with app.app_context():
+        # the rows are loaded before the indexes exist, like on a database that predates them
+        for index in SEARCH_INDEXES:
+            index.drop(db.engine)
+        course = Course.add_course("BENCH001", "Benchmark course", "Benchmark")
+        started = time.perf_counter()
+        fill(Question.__table__, ({"id": i, "question_text": sentence(random.randint(12, 30)), "question_category": "PROG",
+                                   "question_score": 5, "course_id": course.id} for i in range(1, args.rows + 1)))
+        fill(HelpTopic.__table__, ({"id": i, "topic_title": sentence(random.randint(3, 8)), "topic_content": sentence(random.randint(20, 40)),
+                                    "topic_type": "NORMAL", "course_id": course.id, "llm_name": "GPT-4",
+                                    "llm_answer": " ".join(sentence(random.randint(8, 20)) for _ in range(5))}
+                                   for i in range(1, args.rows + 1)))
+        db.session.commit()
+        print(f"inserted {args.rows} questions and help topics in {time.perf_counter() - started:.1f}s")
+
+        keywords = [("common word", "recursion"), ("prefix", "algo"), ("two common words", "binary tree"),
+                    ("common + rare", f"memory {rare[0]}"), ("rare word", rare[1]), ("no match", "zzzz")]
+        searches = [("questions", Question.search_questions_paginated), ("help topics", HelpTopic.search_topics_paginated)]
+
+        before = {}
+        for name, search in searches:
+            for label, keyword in keywords:
+                before[name, label] = timed(lambda: search(keyword, 1, args.page_size))
+
+        started = time.perf_counter()
+        created = create_search_indexes(db.engine)
+        print(f"built {', '.join(created)} in {time.perf_counter() - started:.1f}s")
+
+        print(f"{'search':12} {'keyword':18} {'ilike':>10} {'fts':>10} {'ilike total':>12} {'fts total':>10}   (page 1 of {args.page_size} + total, best of {args.repeat}, ms)")
+        for name, search in searches:
+            for label, keyword in keywords:
+                (_, ilike_total, _), ilike_ms = before[name, label]
+                (_, fts_total, _), fts_ms = timed(lambda: search(keyword, 1, args.page_size))
+                print(f"{name:12} {label:18} {ilike_ms:10.2f} {fts_ms:10.2f} {ilike_total:12d} {fts_total:10d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Import-time budget for `import core`
+
+    Imports the app in fresh interpreters with `python -X importtime` (on a throwaway SQLite database),
+    reports the median total and the slowest modules, and fails when:
+    - the median exceeds --budget milliseconds
+    - a dependency that must only load on first use (requests, the mail stack) was imported at boot
+
+        python benchmarks/import_budget.py
+        python benchmarks/import_budget.py --budget 600 --top 20
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# loaded on first use, see core/apis/llmapi.py and core/utils.py
+DEFERRED_MODULES = ["requests", "urllib3", "flask_mail", "smtplib"]
+
+
+def measure(env):
+    """
+        One cold import, returns ({module: cumulative us}, top level total us, set of imported modules)
+    """
+    code = "import sys, core; print(','.join(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package", the name indented by depth
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if cumulative_us.strip().isdigit():
+            cumulative[name.strip()] = int(cumulative_us)
+    modules = set(result.stdout.strip().split(","))
+    return cumulative, cumulative.get("core", 0), modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=750, help="milliseconds allowed for `import core`")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+    runs = [measure(env) for _ in range(args.repeat)]
+    totals = [total / 1000 for _, total, _ in runs]
+    median = statistics.median(totals)
+    cumulative, _, modules = runs[len(runs) // 2]
+
+    print(f"import core: median {median:.1f} ms, min {min(totals):.1f} ms, max {max(totals):.1f} ms, budget {args.budget:.0f} ms")
+    print("slowest modules (cumulative):")
+    for name, us in sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    loaded = [name for name in DEFERRED_MODULES if name in modules]
+    if loaded:
+        print(f"FAIL: imported at boot but should load on first use: {', '.join(loaded)}")
+        failed = True
+    if median > args.budget:
+        print(f"FAIL: import core takes {median:.1f} ms, over the {args.budget:.0f} ms budget")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    List queries before and after the index migration, at a million rows
+
+    Fills a throwaway SQLite database with --rows answers, experiments and requests (and a tenth
+    as many help topics), drops the foreign key and filter indexes to get the schema as it was
+    before them, and times the first page (rows + COUNT) of each `get_*_paginated` access pattern.
+    Then runs the migration (`create_missing_indexes`, what `flask --app app init-db` does on an
+    existing database), times the same queries again and prints their query plans.
+
+        python benchmarks/index_coverage.py --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BATCH = 50000
+
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="answers, experiments and requests each")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--questions", type=int, default=20000)
+    parser.add_argument("--courses", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+    # time the COUNT itself, not the count cache
+    os.environ.setdefault("COUNT_CACHE_SIZE", "0")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from sqlalchemy import insert, text
+    from core import app, db, startup
+    from core.models import (Answer, Course, Experiment, HelpTopic, Question, Request,
+                             RequestAddExperiment, RequestUpdateScore, User)
+    from core.schema import create_missing_indexes
+    startup()
+
+    def fill(table, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == BATCH:
+                db.session.execute(insert(table), batch)
+                batch = []
+        if batch:
+            db.session.execute(insert(table), batch)
+
+    random.seed(0)
+    categories = [f"Category {i}" for i in range(20)]
+    with app.app_context():
+        started = time.perf_counter()
+        fill(User.__table__, ({"id": i, "username": f"user{i:06d}", "email": f"user{i:06d}@uic.edu.cn",
+                               # never checked here, skip the KDF
+                               "password": "scrypt:32768:8:1$bench$0", "user_type": "STUDENT",
+                               "account_status": "ACTIVE", "token_version": 0} for i in range(1, args.users + 1)))
+        fill(Course.__table__, ({"id": i, "course_code": f"C{i:05d}", "course_name": f"Course {i}",
+                                 "course_category": random.choice(categories)} for i in range(1, args.courses + 1)))
+        fill(Question.__table__, ({"id": i, "question_text": f"Question {i}", "question_category": "PROG",
+                                   "question_score": random.randint(1, 20), "course_id": random.randint(1, args.courses)}
+                                  for i in range(1, args.questions + 1)))
+        fill(Answer.__table__, ({"id": i, "question_id": random.randint(1, args.questions), "llm_name": "GPT-4",
+                                 "answer_text": f"Answer {i}", "score": 5.0, "score_update_count": 1}
+                                for i in range(1, args.rows + 1)))
+        fill(Experiment.__table__, ({"id": i, "user_id": random.randint(1, args.users), "question_id": random.randint(1, args.questions),
+                                     "experiment_text": f"Experiment {i}", "is_answer": False} for i in range(1, args.rows + 1)))
+        fill(HelpTopic.__table__, ({"id": i, "topic_title": f"Topic {i}", "topic_content": f"Content {i}", "topic_type": "NORMAL",
+                                    "course_id": random.randint(1, args.courses)} for i in range(1, args.rows // 10 + 1)))
+        request_types = [random.choices(["UPDATE_SCORE", "ADD_EXPERIMENT", "ADD_COURSE"], [45, 45, 10])[0] for _ in range(args.rows)]
+        fill(Request.__table__, ({"id": i, "user_id": random.randint(1, args.users), "request_type": request_type,
+                                  "request_status": random.choices(["PENDING", "APPROVED", "REJECTED", "REVOKED"], [10, 60, 25, 5])[0]}
+                                 for i, request_type in enumerate(request_types, 1)))
+        fill(RequestUpdateScore.__table__, ({"request_id": i, "answer_id": random.randint(1, args.rows), "new_score": 5.0}
+                                            for i, request_type in enumerate(request_types, 1) if request_type == "UPDATE_SCORE"))
+        fill(RequestAddExperiment.__table__, ({"request_id": i, "experiment_id": random.randint(1, args.rows)}
+                                              for i, request_type in enumerate(request_types, 1) if request_type == "ADD_EXPERIMENT"))
+        db.session.commit()
+        print(f"inserted {args.rows} answers, experiments and requests, {args.rows // 10} help topics in {time.perf_counter() - started:.1f}s")
+
+        # the schema before the migration
+        tables = [Answer, Course, Experiment, HelpTopic, Question, Request, RequestAddExperiment, RequestUpdateScore]
+        for model in tables:
+            for index in model.__table__.indexes:
+                db.session.execute(text(f"DROP INDEX {index.name}"))
+        db.session.commit()
+
+        question_id = random.randint(1, args.questions)
+        user_id = random.randint(1, args.users)
+        size = args.page_size
+        cases = [
+            ("answers of a question", lambda: Answer.get_answers_by_question_id_paginated(question_id, 1, size),
+             Answer.query.filter_by(question_id=question_id)),
+            ("experiments of a user", lambda: Experiment.get_user_experiments_paginated(user_id, 1, size),
+             Experiment.query.filter_by(user_id=user_id)),
+            ("experiments of a user, question", lambda: Experiment.get_user_experiments_by_question_id_paginated(user_id, question_id, 1, size),
+             Experiment.query.filter_by(user_id=user_id, question_id=question_id)),
+            ("experiments of a question", lambda: Experiment.get_experiments_by_question_id_paginated(question_id, 1, size),
+             Experiment.query.filter_by(question_id=question_id)),
+            ("help topics of a course", lambda: HelpTopic.get_topics_by_course_id_paginated(1, 1, size),
+             HelpTopic.query.filter_by(course_id=1)),
+            ("questions by course category", lambda: Question.get_questions_by_course_category_paginated(categories[0], 1, size),
+             Question.query.join(Course).filter(Course.course_category == categories[0])),
+            ("questions by score", lambda: Question.get_questions_by_score_paginated(7, 1, size),
+             Question.query.filter_by(question_score=7)),
+            ("user requests, desc", lambda: Request.get_user_requests_paginated(user_id, 1, size, True),
+             Request.query.filter_by(user_id=user_id).order_by(Request.id.desc())),
+            ("user requests by type, status", lambda: Request.get_user_requests_by_type_and_status_paginated(user_id, "UPDATE_SCORE", "APPROVED", 1, size, True),
+             Request.query.filter_by(user_id=user_id, request_type="UPDATE_SCORE", request_status="APPROVED").order_by(Request.id.desc())),
+            ("pending requests, desc", lambda: Request.get_requests_by_status_paginated("PENDING", 1, size, True),
+             Request.query.filter_by(request_status="PENDING").order_by(Request.id.desc())),
+            ("requests by type, status", lambda: Request.get_requests_by_type_and_status_paginated("ADD_COURSE", "PENDING", 1, size, True),
+             Request.query.filter_by(request_type="ADD_COURSE", request_status="PENDING").order_by(Request.id.desc())),
+            ("score request of an answer", lambda: RequestUpdateScore.get_request_by_answer_id(question_id),
+             RequestUpdateScore.query.filter_by(answer_id=question_id)),
+            ("request of an experiment", lambda: RequestAddExperiment.get_request_by_experiment_id(question_id),
+             RequestAddExperiment.query.filter_by(experiment_id=question_id)),
+        ]
+        before = [timed(call, args.repeat) for _, call, _ in cases]
+
+        started = time.perf_counter()
+        created = create_missing_indexes()
+        print(f"migration created {len(created)} indexes in {time.perf_counter() - started:.1f}s")
+
+        print(f"{'query':34} {'before':>10} {'after':>10}   (page 1 of {size} + count, best of {args.repeat}, ms)")
+        for (name, call, query), baseline in zip(cases, before):
+            print(f"{name:34} {baseline:10.2f} {timed(call, args.repeat):10.2f}")
+            compiled = query.limit(size).statement.compile(db.engine, compile_kwargs={"literal_binds": True})
+            for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")):
+                print(f"{'':36}{row[-1]}")
+
+
+if __name__ == '__main__':
+    main()
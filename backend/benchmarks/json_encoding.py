@@ -0,0 +1,84 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Serialization throughput of the API's JSON representation on large pages
+
+    Builds pages of answers shaped like GET /api/v1/answers (long answer_text and comment)
+    and encodes them with each JSON_ENCODER, first the representation alone (MB/s),
+    then whole requests through the test client.
+
+        python benchmarks/json_encoding.py --page-size 100 --text-size 4000
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+
+def text(size):
+    words = ["".join(random.choices(string.ascii_lowercase, k=random.randint(2, 10))) for _ in range(size // 6)]
+    return " ".join(words)[:size] + " é中\n\t\"quoted\""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--text-size", type=int, default=4000, help="characters of answer_text per answer")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from core import app, db, rest_api, startup
+    from core.apis.representations import JSON_ENCODERS, init_representations
+    from core.apis.user import create_access_token
+    from core.models import Answer, Course, Question, User
+    startup()
+
+    random.seed(1)
+    with app.app_context():
+        user = User("bench", "bench@uic.edu.cn", "Passw0rdBench", "TEACHER", "ACTIVE")
+        user.save()
+        token = "Bearer " + create_access_token(user)
+        course = Course("BENCH001", "Benchmark course", "Benchmark")
+        db.session.add(course)
+        db.session.flush()
+        question = Question("Benchmark question", "PROG", 10, course.id)
+        db.session.add(question)
+        db.session.flush()
+        for _ in range(args.page_size):
+            db.session.add(Answer(question.id, "GPT-4", text(args.text_size), text(args.text_size // 10), 7.5))
+        db.session.commit()
+        answers = [answer.to_dict() for answer in Answer.query.limit(args.page_size)]
+        question_id = question.id
+    page = {"success": True, "code": "SUCCESS", "message": "Success.",
+            "data": {"answers": answers, "pagination": {"total": args.page_size, "current": 1, "pageSize": args.page_size}}}
+
+    client = app.test_client()
+    url = f"/api/v1/answers?question_id={question_id}&current=1&pageSize={args.page_size}"
+    print(f"page of {args.page_size} answers, {args.text_size} characters of answer_text each")
+    for name, encode in JSON_ENCODERS.items():
+        app.config["JSON_ENCODER"] = name
+        init_representations(app, rest_api)
+        with app.test_request_context():
+            size = len(encode(page, 200).get_data())
+            started = time.perf_counter()
+            for _ in range(args.rounds):
+                encode(page, 200).get_data()
+            encoding = (time.perf_counter() - started) / args.rounds
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            response = client.get(url, headers={"Authorization": token})
+            assert response.status_code == 200 and len(response.json["data"]["answers"]) == args.page_size
+        request = (time.perf_counter() - started) / args.rounds
+        print(f"{name:8} encode {encoding * 1000:7.3f} ms ({size / encoding / 1e6:7.1f} MB/s, {size} bytes)   "
+              f"GET /answers {request * 1000:7.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
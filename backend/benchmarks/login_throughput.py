@@ -0,0 +1,93 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Login throughput under concurrency
+
+    Runs a burst of concurrent LoginApi calls against a throwaway SQLite database,
+    while another thread measures the latency of a cheap GET (/courses).
+    Compare inline hashing with the process pool:
+
+        PASSWORD_HASH_WORKERS=0 python benchmarks/login_throughput.py
+        PASSWORD_HASH_WORKERS=4 python benchmarks/login_throughput.py
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000 if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(db_dir, "bench.db"))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from core import app, db, startup
+    from core.hashing import password_hasher
+    from core.models import User
+    startup()
+
+    password = "Passw0rdBench"
+    with app.app_context():
+        db.create_all()
+        for i in range(args.users):
+            db.session.add(User(f"bench{i}", f"bench{i}@uic.edu.cn", password, "TEACHER", "ACTIVE"))
+        db.session.commit()
+
+    client = app.test_client()
+    token = client.post("/api/v1/user/login", json={"email": "bench0@uic.edu.cn", "password": password}).json["data"]["token"]
+
+    def login(i):
+        started = time.perf_counter()
+        response = app.test_client().post("/api/v1/user/login", json={"email": f"bench{i % args.users}@uic.edu.cn", "password": password})
+        return response.status_code, time.perf_counter() - started
+
+    get_latencies = []
+    done = threading.Event()
+
+    def probe():
+        probe_client = app.test_client()
+        while not done.is_set():
+            started = time.perf_counter()
+            probe_client.get("/api/v1/courses", headers={"Authorization": token})
+            get_latencies.append(time.perf_counter() - started)
+
+    probe_thread = threading.Thread(target=probe)
+    probe_thread.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(login, range(args.logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    probe_thread.join()
+
+    login_latencies = [latency for _, latency in results]
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    print(f"hash method       {password_hasher.method}")
+    print(f"hash workers      {password_hasher.workers or 'inline'}")
+    print(f"concurrency       {args.concurrency}")
+    print(f"logins            {args.logins} in {elapsed:.2f}s -> {args.logins / elapsed:.1f} req/s {statuses}")
+    print(f"login latency     p50 {percentile(login_latencies, 50):.1f} ms, p95 {percentile(login_latencies, 95):.1f} ms")
+    print(f"GET /courses      p50 {percentile(get_latencies, 50):.1f} ms, p95 {percentile(get_latencies, 95):.1f} ms, mean {statistics.mean(get_latencies) * 1000 if get_latencies else 0:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Cost and accuracy of the page totals per totalMode
+
+    Fills a throwaway SQLite database with --rows requests (types and statuses drawn at random),
+    then times page 2 of a few request lists with totalMode=exact (count cache off, and warm),
+    estimate (cache off) and none, and compares the estimated totals with the exact ones.
+
+        python benchmarks/page_totals.py --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BATCH = 50000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from sqlalchemy import insert
+    from core import app, db, startup
+    from core.models import Request, RequestAddCourse
+    from core.pagination import total_counter
+    startup()
+
+    random.seed(0)
+    with app.app_context():
+        started = time.perf_counter()
+        rows = [{"id": i, "user_id": random.randint(1, args.users), "request_type": "ADD_COURSE",
+                 "request_status": random.choices(["PENDING", "APPROVED", "REJECTED", "REVOKED"], [10, 60, 25, 5])[0]}
+                for i in range(1, args.rows + 1)]
+        for start in range(0, len(rows), BATCH):
+            db.session.execute(insert(Request.__table__), rows[start:start + BATCH])
+            db.session.execute(insert(RequestAddCourse.__table__), [{"request_id": row["id"], "course_code": "C", "course_name": "C",
+                                                                      "course_category": "C"} for row in rows[start:start + BATCH]])
+        db.session.commit()
+        print(f"inserted {args.rows} requests in {time.perf_counter() - started:.1f}s, estimate limit {total_counter.estimate_limit}")
+
+        cases = [
+            ("all requests", lambda mode: Request.get_requests_paginated(2, args.page_size, True, mode)),
+            ("pending requests", lambda mode: Request.get_requests_by_status_paginated("PENDING", 2, args.page_size, True, mode)),
+            ("revoked requests", lambda mode: Request.get_requests_by_status_paginated("REVOKED", 2, args.page_size, True, mode)),
+            ("requests of a user", lambda mode: Request.get_user_requests_paginated(1, 2, args.page_size, True, mode)),
+        ]
+        modes = [("exact", "exact", 0), ("exact, cached", "exact", 4096), ("estimate", "estimate", 0), ("none", "none", 0)]
+        print(f"{'query':20} " + " ".join(f"{name:>14}" for name, _, _ in modes) + f"   {'exact total':>12} {'estimate':>10}   (ms, best of {args.repeat})")
+        for name, page in cases:
+            timings = []
+            for _, mode, cache_size in modes:
+                total_counter.clear()
+                total_counter.max_size = cache_size
+                page(mode)
+                best = None
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    page(mode)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                timings.append(best * 1000)
+            _, exact, _ = page("exact")
+            _, estimate, _ = page("estimate")
+            print(f"{name:20} " + " ".join(f"{timing:14.2f}" for timing in timings) + f"   {exact:12d} {estimate:10d} ({(estimate - exact) / exact:+.1%})")
+
+
+if __name__ == '__main__':
+    main()
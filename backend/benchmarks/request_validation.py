@@ -0,0 +1,90 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Request body validation cost per endpoint
+
+    For every endpoint with an expected model, validates a valid payload (built from the
+    field examples) and an invalid one (empty object) with:
+
+        jsonschema   what restx does by default, a Draft4Validator over model.__schema__ per call
+        compiled     the function generated once from the model (core/apis/validation.py)
+
+        python benchmarks/request_validation.py --rounds 2000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+
+def example(schema, definitions):
+    """
+        A valid payload for `schema`, from the field examples
+    """
+    if "$ref" in schema:
+        return example(definitions[schema["$ref"].rsplit("/", 1)[-1]].__schema__, definitions)
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: example(field, definitions) for name, field in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [example(schema["items"], definitions)]
+    if "example" in schema:
+        return schema["example"]
+    return {"string": "text", "integer": 1, "number": 1.0, "boolean": False}[kind]
+
+
+def timed(function, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from jsonschema import Draft4Validator
+    from core import app, startup
+    from core.apis import rest_api, validators
+    startup()
+
+    def jsonschema_validate(model, data):
+        validator = Draft4Validator(model.__schema__, resolver=rest_api.refresolver, format_checker=rest_api.format_checker)
+        return list(validator.iter_errors(data))
+
+    endpoints = []
+    for resource, namespace, urls, kwargs in rest_api.resources:
+        for method in ("post", "put", "delete"):
+            expect = getattr(getattr(resource, method, None), "__apidoc__", {}).get("expect", [])
+            for model in expect:
+                if getattr(model, "name", None) in validators:
+                    endpoints.append((f"{method.upper()} {rest_api.prefix}{urls[0]}", model))
+
+    print(f"{'endpoint':44} {'model':28} {'valid, us':>22} {'invalid, us':>22}")
+    print(f"{'':44} {'':28} {'jsonschema':>11}{'compiled':>11} {'jsonschema':>11}{'compiled':>11}")
+    totals = [0.0, 0.0]
+    with app.test_request_context():
+        for endpoint, model in endpoints:
+            valid = example(model.__schema__, rest_api.models)
+            compiled = validators[model.name]
+            assert not compiled(valid) and not jsonschema_validate(model, valid), endpoint
+            assert compiled({}) or not model.__schema__.get("required"), endpoint
+            row = [timed(lambda: jsonschema_validate(model, payload), args.rounds) if interpreted
+                   else timed(lambda: compiled(payload), args.rounds)
+                   for payload in (valid, {}) for interpreted in (True, False)]
+            totals[0] += row[0]
+            totals[1] += row[1]
+            print(f"{endpoint:44} {model.name:28} {row[0]:11.1f}{row[1]:11.2f} {row[2]:11.1f}{row[3]:11.2f}")
+    print(f"valid payloads on average: jsonschema {totals[0] / len(endpoints):.1f} us, compiled {totals[1] / len(endpoints):.2f} us, "
+          f"{totals[0] / totals[1]:.0f}x faster")
+
+
+if __name__ == '__main__':
+    main()
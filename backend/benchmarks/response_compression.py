@@ -0,0 +1,103 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Bytes and latency saved by response compression on realistic pages
+
+    Fills a throwaway SQLite database with answers, experiments and help topics whose
+    free-text fields look like LLM output (prose and code), then requests a page of each
+    with every encoding the server offers. Latency is the server time plus the time
+    to transfer the body over a link of --bandwidth Mbit/s.
+
+        python benchmarks/response_compression.py --page-size 20 --bandwidth 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+WORDS = ("the a of to and in is for that with as on by this be are it from or an function value return "
+         "variable loop each list array pointer memory output input program compute result integer string "
+         "step first then finally because therefore example derivative polynomial matrix vector sum error "
+         "call print case condition true false algorithm complexity sort search node tree graph").split()
+CODE = ['for (int i = 0; i < n; i++) {', '    sum += a[i];', '}', 'printf("%d\\n", sum);',
+        'def solve(values):', '    return sorted(values)[len(values) // 2]', 'int *p = malloc(n * sizeof(int));']
+
+
+def llm_text(size):
+    parts = []
+    while sum(len(part) for part in parts) < size:
+        if random.random() < 0.2:
+            parts.append("\n```c\n" + "\n".join(random.sample(CODE, 4)) + "\n```\n")
+        else:
+            sentence = " ".join(random.choices(WORDS, k=random.randint(8, 20)))
+            parts.append(sentence.capitalize() + ". ")
+    return "".join(parts)[:size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--text-size", type=int, default=3000, help="characters per free-text field")
+    parser.add_argument("--bandwidth", type=float, default=20, help="client link in Mbit/s")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from core import app, db, startup
+    from core.apis.user import create_access_token
+    from core.compression import response_compressor
+    from core.models import Answer, Course, Experiment, HelpTopic, Question, User
+    startup()
+
+    random.seed(1)
+    with app.app_context():
+        user = User("bench", "bench@uic.edu.cn", "Passw0rdBench", "ADMIN", "ACTIVE")
+        user.save()
+        token = "Bearer " + create_access_token(user)
+        course = Course("BENCH001", "Benchmark course", "Benchmark")
+        db.session.add(course)
+        db.session.flush()
+        question = Question(llm_text(500), "PROG", 10, course.id)
+        db.session.add(question)
+        db.session.flush()
+        for _ in range(args.page_size):
+            db.session.add(Answer(question.id, "GPT-4", llm_text(args.text_size), llm_text(200), 7.5))
+            db.session.add(Experiment(user.id, question.id, llm_text(args.text_size), False))
+            db.session.add(HelpTopic(llm_text(60), llm_text(args.text_size), "NORMAL", course.id,
+                                     "GPT-4", llm_text(args.text_size), 4.5))
+        db.session.commit()
+        question_id = question.id
+
+    pages = {
+        "answers": f"/api/v1/answers?question_id={question_id}&pageSize={args.page_size}",
+        "experiments": f"/api/v1/experiments?question_id={question_id}&pageSize={args.page_size}",
+        "helptopics": f"/api/v1/helptopics?pageSize={args.page_size}",
+    }
+    client = app.test_client()
+    link = args.bandwidth * 1e6 / 8
+    print(f"pages of {args.page_size}, {args.text_size} characters per text field, {args.bandwidth:g} Mbit/s link, "
+          f"gzip level {response_compressor.gzip_level}, brotli quality {response_compressor.brotli_quality}")
+    for page, url in pages.items():
+        baseline = None
+        for encoding in ["identity"] + response_compressor.encodings:
+            headers = {"Authorization": token, "Accept-Encoding": encoding}
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200 and response.headers.get("Content-Encoding", "identity") == encoding, page
+            started = time.perf_counter()
+            for _ in range(args.rounds):
+                client.get(url, headers=headers)
+            server = (time.perf_counter() - started) / args.rounds
+            size = len(response.data)
+            total = server + size / link
+            baseline = baseline or (size, total)
+            print(f"{page:12} {encoding:9} {size:8d} bytes ({size / baseline[0]:6.1%})   server {server * 1000:6.2f} ms   "
+                  f"with transfer {total * 1000:7.2f} ms   saved {(baseline[1] - total) * 1000:7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Per-request cost of the old `db.create_all()` before_request hook
+
+    Times a cheap authenticated GET (/courses) against a throwaway SQLite database,
+    once as the app runs now (schema checked once at boot) and once with the old hook put back,
+    and counts the SQL statements each request issues.
+
+        python benchmarks/schema_bootstrap.py
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(db_dir, "bench.db"))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from sqlalchemy import event
+    from core import app, db, startup
+    from core.apis.user import create_access_token
+    from core.models import User
+    startup()
+
+    with app.app_context():
+        user = User("bench", "bench@uic.edu.cn", "Passw0rdBench", "TEACHER", "ACTIVE")
+        user.save()
+        token = "Bearer " + create_access_token(user)
+        engine = db.engine
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *rest: statements.append(statement))
+    client = app.test_client()
+
+    def run():
+        latencies = []
+        statements.clear()
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            client.get("/api/v1/courses", headers={"Authorization": token})
+            latencies.append(time.perf_counter() - started)
+        return latencies, len(statements) / args.requests
+
+    def create_all_hook():
+        db.create_all()
+
+    for _ in range(100):
+        client.get("/api/v1/courses", headers={"Authorization": token})
+    boot, boot_statements = run()
+    app.before_request_funcs.setdefault(None, []).insert(0, create_all_hook)
+    hooked, hooked_statements = run()
+
+    for name, latencies, per_request in [("create_all per request", hooked, hooked_statements), ("schema checked at boot", boot, boot_statements)]:
+        latencies = sorted(latencies)
+        print(f"{name:24} mean {statistics.mean(latencies) * 1000:.3f} ms, p50 {latencies[len(latencies) // 2] * 1000:.3f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.3f} ms, {per_request:.1f} SQL statements/request")
+    print(f"saved                    {(statistics.mean(hooked) - statistics.mean(boot)) * 1000:.3f} ms per request")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Throughput of the ways to run the backend, on the same workload
+
+    Starts each server mode in turn on a throwaway SQLite database and drives it
+    with keep-alive clients in several processes, all requesting an authenticated
+    page of courses (GET /api/v1/courses):
+
+        dev        Flask development server, threaded (app.run)
+        waitress   python serve.py --workers 0, one process with --threads threads
+        prefork    python serve.py --workers N, N preloaded processes with --threads threads each
+
+        python benchmarks/server_modes.py --workers 4 --threads 8 --concurrency 32 --duration 10
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def client_process(port, token, threads, duration, results):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def run():
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local = []
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request("GET", "/api/v1/courses?current=1&pageSize=10", headers={"Authorization": token})
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    raise RuntimeError(response.status)
+                local.append(time.perf_counter() - started)
+            except Exception:
+                errors[0] += 1
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put((latencies, errors[0]))
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/api/v1/courses")
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def run_mode(name, command, env, args, token):
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(args.port)
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        per_process = max(1, args.concurrency // args.client_processes)
+        clients = [context.Process(target=client_process, args=(args.port, token, per_process, args.duration, results))
+                   for _ in range(args.client_processes)]
+        for client in clients:
+            client.start()
+        latencies, errors = [], 0
+        for _ in clients:
+            client_latencies, client_errors = results.get()
+            latencies.extend(client_latencies)
+            errors += client_errors
+        for client in clients:
+            client.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+    print(f"{name:10} {len(latencies) / args.duration:9.1f} req/s   p50 {p50:7.1f} ms   p95 {p95:7.1f} ms   errors {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=32, help="keep-alive connections in total")
+    parser.add_argument("--client-processes", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--modes", default="dev,waitress,prefork")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+    env["PORT"] = str(args.port)
+    os.environ.update(env)
+    sys.path.insert(0, BACKEND_DIR)
+
+    from core import app, db, startup
+    from core.apis.user import create_access_token
+    from core.models import Course, User
+    startup()
+
+    with app.app_context():
+        user = User("bench", "bench@uic.edu.cn", "Passw0rdBench", "TEACHER", "ACTIVE")
+        user.save()
+        for i in range(50):
+            db.session.add(Course(f"BENCH{i:03d}", f"Benchmark course {i}", "Benchmark"))
+        db.session.commit()
+        token = "Bearer " + create_access_token(user)
+        db.engine.dispose()
+
+    commands = {
+        "dev": [sys.executable, "-c", f"from core import app; app.run(host='127.0.0.1', port={args.port}, threaded=True)"],
+        "waitress": [sys.executable, "serve.py", "--host", "127.0.0.1", "--workers", "0", "--threads", str(args.threads)],
+        "prefork": [sys.executable, "serve.py", "--host", "127.0.0.1", "--workers", str(args.workers), "--threads", str(args.threads)],
+    }
+    print(f"{args.concurrency} connections, {args.duration:.0f}s per mode, {os.cpu_count()} CPUs, prefork {args.workers} workers x {args.threads} threads")
+    for name in args.modes.split(","):
+        run_mode(name, commands[name], env, args, token)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    SQLite under concurrent readers and writers, with and without the engine profile
+
+    Several processes (prefork workers) with several threads each run a mix of page reads
+    (GET /courses query) and writes shaped like the handlers (look up by code, then insert and commit)
+    against one SQLite file, once with DATABASE_ENGINE_PROFILE=none (rollback journal,
+    SQLAlchemy defaults) and once with the sqlite profile (WAL, busy_timeout, ...).
+
+        python benchmarks/sqlite_profile.py --processes 4 --threads 4 --duration 10
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def worker(uri, profile, threads, duration, write_ratio, results):
+    os.environ["SQLALCHEMY_DATABASE_URI"] = uri
+    os.environ["DATABASE_ENGINE_PROFILE"] = profile
+    os.environ["ACCESS_LOG_ENABLED"] = "false"
+    sys.path.insert(0, BACKEND_DIR)
+    from sqlalchemy.exc import OperationalError
+    from core import app, db, startup
+    from core.models import Course
+    startup()
+
+    counts = {"reads": 0, "writes": 0, "locked": 0, "latencies": []}
+    lock = threading.Lock()
+
+    def run():
+        local = {"reads": 0, "writes": 0, "locked": 0, "latencies": []}
+        deadline = time.perf_counter() + duration
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    if random.random() < write_ratio:
+                        code = f"C{os.getpid()}-{threading.get_ident()}-{random.getrandbits(40)}"
+                        if Course.get_course_by_code(code) is None:
+                            db.session.add(Course(code, "Benchmark course " + code, "Benchmark"))
+                            db.session.commit()
+                        local["writes"] += 1
+                    else:
+                        Course.query.order_by(Course.id.desc()).limit(10).all()
+                        Course.query.count()
+                        db.session.rollback()
+                        local["reads"] += 1
+                    local["latencies"].append(time.perf_counter() - started)
+                except OperationalError:
+                    db.session.rollback()
+                    local["locked"] += 1
+        with lock:
+            for key in ("reads", "writes", "locked"):
+                counts[key] += local[key]
+            counts["latencies"].extend(local["latencies"])
+
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{args.processes} processes x {args.threads} threads, {args.write_ratio:.0%} writes, {args.duration:g}s per profile")
+    for profile in ("none", "sqlite"):
+        uri = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+        # create the schema once, before the workers race for it
+        results = context.Queue()
+        setup = context.Process(target=worker, args=(uri, profile, 0, 0, 0, results))
+        setup.start()
+        results.get()
+        setup.join()
+
+        processes = [context.Process(target=worker, args=(uri, profile, args.threads, args.duration, args.write_ratio, results))
+                     for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        totals = {"reads": 0, "writes": 0, "locked": 0, "latencies": []}
+        for _ in processes:
+            counts = results.get()
+            for key in totals:
+                totals[key] += counts[key]
+        for process in processes:
+            process.join()
+
+        latencies = sorted(totals["latencies"])
+        p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0
+        print(f"{profile:7} reads {totals['reads'] / args.duration:8.1f}/s   writes {totals['writes'] / args.duration:7.1f}/s   "
+              f"'database is locked' {totals['locked']:5d}   p50 {p50:6.2f} ms   p99 {p99:7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Time to first request
+
+    Measures, in fresh processes on a throwaway SQLite database:
+    - in process: interpreter start to the first answered test-client request, with the
+      deferred dependencies (requests, Flask-Mail) loaded lazily as now, and imported eagerly as before
+    - serve.py: spawn of `python serve.py` to the first HTTP response on its socket
+
+        python benchmarks/startup_time.py --repeat 5 --workers 0 2
+"""
+
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IN_PROCESS = """
+import time
+started = time.perf_counter()
+{preload}
+from core import app
+app.test_client().get("/api/v1/courses")
+print(time.perf_counter() - started)
+"""
+
+
+def in_process(env, preload):
+    result = subprocess.run([sys.executable, "-c", IN_PROCESS.format(preload=preload)], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def serve_py(env, port, workers):
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+                              cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                connection.request("GET", "/api/v1/courses")
+                connection.getresponse().read()
+                return time.perf_counter() - started
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError("serve.py exited")
+                time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def report(name, samples):
+    samples = [sample * 1000 for sample in samples]
+    print(f"{name:34} median {statistics.median(samples):7.1f} ms   min {min(samples):7.1f} ms   max {max(samples):7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--workers", type=int, nargs="*", default=[0], help="serve.py worker counts to measure")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    # create the schema once, so every run below measures a warm database
+    in_process(env, "")
+
+    report("in process, lazy dependencies", [in_process(env, "") for _ in range(args.repeat)])
+    report("in process, eager dependencies", [in_process(env, "import requests, flask_mail") for _ in range(args.repeat)])
+    for workers in args.workers:
+        report(f"serve.py --workers {workers}", [serve_py(env, args.port, workers) for _ in range(args.repeat)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Admin user directory on a synthetic user table
+
+    Fills a throwaway SQLite database with --users accounts, then times page 1 and page --page
+    of a few directory queries, with OFFSET pagination (+ COUNT) and with keyset cursors.
+    Prints the query plan of each keyset query. Compare with the directory indexes dropped:
+
+        python benchmarks/user_directory.py
+        python benchmarks/user_directory.py --no-indexes
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-indexes", action="store_true", help="drop the directory indexes first")
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(db_dir, "bench.db"))
+    # time the COUNT itself, not the count cache
+    os.environ.setdefault("COUNT_CACHE_SIZE", "0")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from sqlalchemy import text
+    from core import app, db, startup
+    from core.models import User
+    from core.pagination import decode_cursor, keyset_condition, keyset_order
+    startup()
+
+    random.seed(0)
+    now = datetime.now()
+    with app.app_context():
+        db.create_all()
+        rows = []
+        for i in range(args.users):
+            user_type = random.choices(["STUDENT", "TEACHER", "ADMIN"], [90, 9, 1])[0]
+            rows.append({
+                "username": f"user{i:06d}",
+                "email": f"user{i:06d}@{'mail.' if user_type == 'STUDENT' else ''}uic.edu.cn",
+                # never checked here, skip the KDF
+                "password": "scrypt:32768:8:1$bench$0",
+                "user_type": user_type,
+                "account_status": "INACTIVE" if random.random() < 0.05 else "ACTIVE",
+                "last_online": now - timedelta(seconds=random.randint(0, 90 * 86400)) if random.random() < 0.8 else None,
+            })
+        started = time.perf_counter()
+        User.bulk_register(rows, 5000)
+        print(f"inserted {args.users} users in {time.perf_counter() - started:.1f}s")
+        if args.no_indexes:
+            for index in User.__table__.indexes:
+                db.session.execute(text(f"DROP INDEX {index.name}"))
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+
+        cases = [
+            ("all by id", {}, "id", False),
+            ("teachers, last online desc", {"user_type": "TEACHER"}, "last_online", True),
+            ("active students by id", {"user_type": "STUDENT", "account_status": "ACTIVE"}, "id", False),
+            ("online last 7 days desc", {"last_online_from": now - timedelta(days=7)}, "last_online", True),
+            ("username prefix", {"username": "user01"}, "username", False),
+        ]
+        print(f"{'query':32} {'offset p1':>10} {'offset p' + str(args.page):>12} {'keyset p1':>10} {'keyset p' + str(args.page):>12}   (best of {args.repeat}, ms)")
+        for name, filters, sort_by, descending in cases:
+            filters = dict({"user_type": None, "account_status": None, "username": None, "email": None, "last_online_from": None, "last_online_to": None}, **filters)
+            _, offset_first = timed(lambda: User.get_users_paginated(filters, sort_by, descending, 1, args.page_size), args.repeat)
+            _, offset_last = timed(lambda: User.get_users_paginated(filters, sort_by, descending, args.page, args.page_size), args.repeat)
+            _, keyset_first = timed(lambda: User.get_users_keyset(filters, sort_by, descending, None, args.page_size), args.repeat)
+            # walk to the cursor of the last page, then time only that page
+            cursor = None
+            for _ in range(args.page - 1):
+                _, cursor = User.get_users_keyset(filters, sort_by, descending, cursor, args.page_size)
+                if cursor is None:
+                    break
+            _, keyset_last = timed(lambda: User.get_users_keyset(filters, sort_by, descending, cursor, args.page_size), args.repeat)
+            print(f"{name:32} {offset_first:10.2f} {offset_last:12.2f} {keyset_first:10.2f} {keyset_last:12.2f}")
+
+            # plan of the first keyset query behind the last page
+            columns = User.get_sort_columns(sort_by)
+            values = decode_cursor(cursor, columns) if cursor else None
+            query = User.filter_users(**filters)
+            if values is not None and values[0] is not None:
+                query = query.filter(keyset_condition(columns, values, descending))
+            statement = query.order_by(*keyset_order(columns, descending)).limit(args.page_size + 1).statement
+            compiled = statement.compile(db.engine, compile_kwargs={"literal_binds": True})
+            for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")):
+                print(f"{'':34}{row[-1]}")
+
+if __name__ == '__main__':
+    main()
@@ -1,54 +1,85 @@
 # -*- encoding: utf-8 -*-
 
-import json
+import threading
 
 from flask import Flask
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 
-from .models import db
+from .models import db, Course, JWTTokenBlocklist, User
 from .apis import rest_api
+from .apis.spec import api_spec
+from .apis.representations import init_representations
 
 from .utils import mail
+from .cache import principal_cache
+from .pagination import total_counter
+from .hashing import password_hasher
+from .outbox import outbox
+from .presence import presence_buffer
+from .ratelimit import rate_limiter
+from .compression import response_compressor
+from .accesslog import access_log
+from .schema import check_schema
+from .engine import select_engine_profile
 
 app = Flask(__name__)
 
 app.config.from_object('core.config.BaseConfig')
 
+# request.remote_addr is the client's address, not the reverse proxy's, when the proxies are trusted
+if app.config['PROXY_FIX_X_FOR'] or app.config['PROXY_FIX_X_PROTO']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'], x_proto=app.config['PROXY_FIX_X_PROTO'])
+
+# pool options before the engine is created, connection settings (SQLite pragmas) once it exists
+engine_profile = select_engine_profile(app.config)
+engine_profile.init_app(app)
 db.init_app(app)
-rest_api.init_app(app)
+engine_profile.configure_engines(app, db)
+access_log.init_app(app)
+# after_request hooks run in reverse order, registered first so it compresses the final body
+response_compressor.init_app(app)
+# without docs neither the Swagger UI nor swagger.json are registered
+rest_api.init_app(app, add_specs=app.config['API_DOCS_ENABLED'])
+api_spec.init_app(app, rest_api)
+init_representations(app, rest_api)
 mail.init_app(app)
+principal_cache.init_app(app)
+total_counter.init_app(app)
+password_hasher.init_app(app)
+outbox.init_app(app)
+presence_buffer.init_app(app, User.update_last_online_bulk)
+rate_limiter.init_app(app)
+JWTTokenBlocklist.init_app(app)
+Course.init_app(app)
 CORS(app)
 
 """
     Database initialization
-    Create tables if they don't exist
+    Create tables if they don't exist, once at boot instead of on every request
+    (flask --app app init-db does the same explicitly)
     WARNING: This will not create the database, only the tables.
     So, you need to create the database first. (MySQL only)
-"""
 
-@app.before_request
-def initialize_database():
-    db.create_all()
-
-
-
-# """
-#     Request handlers
-# """
-
-@app.after_request
-def after_request(response):
-    """
-        after_request handler
-    """
-    if int(response.status_code) >= 400:
-        response_data = json.loads(response.get_data())
-        if "errors" in response_data: # flask-restx model validation error
-            response_data = {"success": False,
-                             "code": "VALIDATION_ERROR",
-                             "message": list(response_data["errors"].items())[0][1]}
-            response.set_data(json.dumps(response_data))
-    return response
+    Not run on import: the flask CLI commands never call it, so init-db works on a database the check refuses.
+    serve.py and app.py run it before serving, other WSGI servers on the first request.
+"""
+_startup_lock = threading.Lock()
+_started = False
+
+def startup():
+    global _started
+    if _started:
+        return
+    with _startup_lock:
+        if not _started:
+            check_schema(app)
+            # course search and autocomplete are served from memory, built before the first request
+            with app.app_context():
+                Course.rebuild_index()
+            _started = True
+
+app.before_request(startup)
 
 
 @app.errorhandler(404)
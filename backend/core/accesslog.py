@@ -0,0 +1,161 @@
+# -*- encoding: utf-8 -*-
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+        Puts records on a bounded queue without ever blocking, a record that does not fit is dropped and counted.
+        The count of records dropped since the last one that got through is attached to the next one.
+    """
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+        self._unreported = 0
+
+    def prepare(self, record):
+        # formatting is left to the writer thread
+        return record
+
+    def enqueue(self, record):
+        if self._unreported:
+            record.dropped = self._unreported
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+        else:
+            self._unreported -= getattr(record, "dropped", 0)
+
+
+class JSONFormatter(logging.Formatter):
+    """
+        One JSON object per line: the fields of the record, its `dropped` count if any
+    """
+
+    def format(self, record):
+        entry = dict(record.fields)
+        if getattr(record, "dropped", 0):
+            entry["dropped"] = record.dropped
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+
+class AccessLog():
+    """
+        Structured access log, one record per request:
+        time, method, path, endpoint, user id, status, SQL statements, DB time, total time.
+        The request thread only puts the record on a bounded queue,
+        a writer thread per worker process formats it and writes it to ACCESS_LOG_FILE.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.logger = logging.getLogger("llmhomework.access")
+        self.logger.propagate = False
+        self.handler = None
+        self.target = None
+        self.listener = None
+        self._listener_pid = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('ACCESS_LOG_ENABLED', self.enabled)
+        if not self.enabled:
+            return
+        path = app.config.get('ACCESS_LOG_FILE', '-')
+        self.target = logging.StreamHandler(sys.stderr) if path == '-' else logging.handlers.WatchedFileHandler(path)
+        self.target.setFormatter(JSONFormatter())
+        self.handler = DroppingQueueHandler(queue.Queue(app.config.get('ACCESS_LOG_QUEUE_SIZE', 10000)))
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.INFO)
+
+        event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+        # first before_request and last after_request, so the timing covers the other hooks;
+        # the record is written at teardown, which also runs when the request failed with an unhandled exception
+        app.before_request_funcs.setdefault(None, []).insert(0, self.start_request)
+        app.after_request_funcs.setdefault(None, []).insert(0, self.record_status)
+        app.teardown_request(self.end_request)
+        atexit.register(self.stop)
+
+    def ensure_started(self):
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid != os.getpid():
+                # threads do not survive the fork of a prefork server, each worker starts its own writer
+                self.handler.queue = queue.Queue(self.handler.queue.maxsize)
+                self.listener = logging.handlers.QueueListener(self.handler.queue, self.target)
+                self.listener.start()
+                self._listener_pid = os.getpid()
+
+    def stop(self):
+        """
+            Write what is queued and stop the writer thread
+        """
+        if self.listener is not None and self._listener_pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+            self._listener_pid = None
+
+    def start_request(self):
+        self.ensure_started()
+        self._local.db_time = 0.0
+        self._local.db_statements = 0
+        self._local.status = None
+        self._local.started = time.perf_counter()
+
+    def record_status(self, response):
+        self._local.status = response.status_code
+        return response
+
+    def end_request(self, exception=None):
+        started = getattr(self._local, "started", None)
+        if started is None:
+            return
+        self._local.started = None
+        self.logger.info("access", extra={"fields": {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "user_id": g.get("user_id"),
+            # no response went through after_request: the exception ended up as a 500
+            "status": self._local.status or 500,
+            "db_statements": self._local.db_statements,
+            "db_ms": round(self._local.db_time * 1000, 3),
+            "total_ms": round((time.perf_counter() - started) * 1000, 3),
+        }})
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["access_log_started"] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("access_log_started", None)
+        # statements outside a request (CLI, background threads) are not counted
+        if started is not None and getattr(self._local, "started", None) is not None:
+            self._local.db_time += time.perf_counter() - started
+            self._local.db_statements += 1
+
+    def stats(self):
+        return {"enabled": self.enabled,
+                "queued": self.handler.queue.qsize() if self.handler else 0,
+                "dropped": self.handler.dropped if self.handler else 0}
+
+
+access_log = AccessLog()
@@ -1,6 +1,8 @@
 # -*- encoding: utf-8 -*-
 
+from http import HTTPStatus
 from flask_restx import Api
+from werkzeug.exceptions import BadRequest
 
 from .user import user_ns
 from .course import course_ns
@@ -10,6 +12,7 @@ from .answer import answer_ns
 from .request import request_ns
 from .help_topic import help_topic_ns
 from .llmapi import llmapi
+from .validation import compile_validators
 
 authorizations = {
     'Bearer Auth': {
@@ -22,7 +25,7 @@ authorizations = {
 
 rest_api = Api(version="1.0", title="LLM Homework API", prefix="/api/v1",
                description="LLM Homework API", security="Bearer Auth",
-               authorizations=authorizations)
+               authorizations=authorizations, validate=True)
 
 rest_api.add_namespace(user_ns, path="/user")
 rest_api.add_namespace(course_ns, path="/course")
@@ -31,4 +34,23 @@ rest_api.add_namespace(experiment_ns, path="/experiment")
 rest_api.add_namespace(answer_ns, path="/answer")
 rest_api.add_namespace(request_ns, path="/request")
 rest_api.add_namespace(help_topic_ns, path="/helptopic")
-rest_api.add_namespace(llmapi, path="/llmapi")
\ No newline at end of file
+rest_api.add_namespace(llmapi, path="/llmapi")
+
+# every expected model is validated, by a function compiled once here (after the namespaces, it binds to their endpoints)
+validators = compile_validators(rest_api)
+
+
+@rest_api.errorhandler(BadRequest)
+def handle_bad_request(error):
+    """
+        Build the error envelope for flask-restx payload validation errors directly,
+        other bad requests keep the default body
+    """
+    errors = (getattr(error, "data", None) or {}).get("errors")
+    if not errors:
+        return {"message": error.description}, HTTPStatus.BAD_REQUEST
+    # restx answers with error.data when it is set, replace it with the envelope
+    error.data = {"success": False,
+                  "code": "VALIDATION_ERROR",
+                  "message": next(iter(errors.values()))}
+    return error.data, HTTPStatus.BAD_REQUEST
@@ -7,8 +7,9 @@ from functools import wraps
 
 from core.config import BaseConfig
 from core.models import Answer, Course
+from core.pagination import InvalidCursor, TOTAL_MODES
 
-from .user import jwt_token_required, admin_required
+from .user import jwt_token_required, jwt_claims_required, admin_required
 
 answer_ns = Namespace(name="Answer", description="Answer related APIs")
 
@@ -74,7 +75,7 @@ class AnswerApi(Resource):
             return {"success": True, "code": "ANSWER_ADDED", "message": "Answer added successfully.", "data": answer.to_dict()}, HTTPStatus.CREATED
         
     
-    @jwt_token_required
+    @jwt_claims_required
     @answer_ns.param("id", "Answer ID")
     def get(self, cls):
         data = request.args
@@ -131,9 +132,11 @@ class AnswerApi(Resource):
 @answer_ns.route("s")
 class AnswersApi(Resource):
     @answer_ns.param("question_id", "Question ID")
+    @answer_ns.param("cursor", "Keyset cursor, pass an empty value for the first page and nextCursor afterwards (overrides current)", type=str)
     @answer_ns.param("current", description="Current page number", required=False, type="integer", default=1)
     @answer_ns.param("pageSize", description="Page size", required=False, type="integer", default=BaseConfig.PAGE_SIZE)
-    @jwt_token_required
+    @answer_ns.param("totalMode", "How the total is counted: exact, estimate (exact up to COUNT_ESTIMATE_LIMIT rows, extrapolated beyond) or none (total is null, see hasMore)", type=str, default="exact")
+    @jwt_claims_required
     def get(self, cls):
         data = request.args
 
@@ -141,10 +144,23 @@ class AnswersApi(Resource):
 
         current = data.get("current", 1, type=int)
         pageSize = data.get("pageSize", BaseConfig.PAGE_SIZE, type=int)
+        totalMode = data.get("totalMode", "exact")
+        if totalMode not in TOTAL_MODES:
+            return {"success": False, "code": "TOTAL_MODE_INVALID", "message": f"Invalid total mode, valid modes are {', '.join(TOTAL_MODES)}."}, HTTPStatus.BAD_REQUEST
+        if not 1 <= pageSize <= BaseConfig.MAX_PAGE_SIZE:
+            return {"success": False, "code": "PAGE_SIZE_INVALID", "message": f"Invalid page size, valid sizes are 1 to {BaseConfig.MAX_PAGE_SIZE}."}, HTTPStatus.BAD_REQUEST
+
+        if question_id and "cursor" in data:
+            # keyset pagination, every page costs the same
+            try:
+                answers, nextCursor = Answer.get_answers_by_question_id_keyset(question_id, data.get("cursor"), pageSize)
+            except InvalidCursor as e:
+                return {"success": False, "code": "CURSOR_INVALID", "message": str(e)}, HTTPStatus.BAD_REQUEST
+            return {"success": True, "code": "SUCCESS", "message": "Success.", "data": {"answers": [answer.to_dict() for answer in answers], "pagination": {"pageSize": pageSize, "nextCursor": nextCursor}}}, HTTPStatus.OK
 
         if question_id:
-            answers, total = Answer.get_answers_by_question_id_paginated(question_id, current, pageSize)
-            return {"success": True, "code": "SUCCESS", "message": "Success.", "data": {"answers": [answer.to_dict() for answer in answers], "pagination": {"total": total, "current": current, "pageSize": pageSize}}}, HTTPStatus.OK
+            answers, total, hasMore = Answer.get_answers_by_question_id_paginated(question_id, current, pageSize, total_mode=totalMode)
+            return {"success": True, "code": "SUCCESS", "message": "Success.", "data": {"answers": [answer.to_dict() for answer in answers], "pagination": {"total": total, "current": current, "pageSize": pageSize, "totalMode": totalMode, "hasMore": hasMore}}}, HTTPStatus.OK
 
         return {"success": False, "code": "QUESTION_ID_MISSING", "message": "Question ID is required."}, HTTPStatus.BAD_REQUEST
 
@@ -7,8 +7,9 @@ from functools import wraps
 
 from core.config import BaseConfig
 from core.models import Question, Course
+from core.pagination import InvalidCursor, TOTAL_MODES
 
-from .user import jwt_token_required, admin_required
+from .user import jwt_token_required, jwt_claims_required, admin_required
 
 course_ns = Namespace(name="Course", description="Course related APIs")
 
@@ -77,7 +78,7 @@ class CourseApi(Resource):
 
     @course_ns.param("id", "Course ID")
     @course_ns.param("course_code", "Course code")
-    @jwt_token_required
+    @jwt_claims_required
     def get(self, cls):
         data = request.args
 
@@ -164,9 +165,11 @@ class CourseApi(Resource):
 class CoursesApi(Resource):
     @course_ns.param("ids", "List of course IDs")
     @course_ns.param("keyword", "Search keyword")
+    @course_ns.param("cursor", "Keyset cursor, pass an empty value for the first page and nextCursor afterwards (overrides current)", type=str)
     @course_ns.param("current", description="Current page number", required=False, type="integer", default=1)
     @course_ns.param("pageSize", description="Page size", required=False, type="integer", default=BaseConfig.PAGE_SIZE)
-    @jwt_token_required
+    @course_ns.param("totalMode", "How the total is counted: exact, estimate (exact up to COUNT_ESTIMATE_LIMIT rows, extrapolated beyond) or none (total is null, see hasMore)", type=str, default="exact")
+    @jwt_claims_required
     def get(self, cls):
         data = request.args
 
@@ -179,10 +182,37 @@ class CoursesApi(Resource):
         keyword = data.get("keyword")
         current = data.get("current", 1, type=int)
         pageSize = data.get("pageSize", BaseConfig.PAGE_SIZE, type=int)
+        totalMode = data.get("totalMode", "exact")
+        if totalMode not in TOTAL_MODES:
+            return {"success": False, "code": "TOTAL_MODE_INVALID", "message": f"Invalid total mode, valid modes are {', '.join(TOTAL_MODES)}."}, HTTPStatus.BAD_REQUEST
+        if not 1 <= pageSize <= BaseConfig.MAX_PAGE_SIZE:
+            return {"success": False, "code": "PAGE_SIZE_INVALID", "message": f"Invalid page size, valid sizes are 1 to {BaseConfig.MAX_PAGE_SIZE}."}, HTTPStatus.BAD_REQUEST
+
+        # keyset pagination, every page costs the same
+        if "cursor" in data:
+            try:
+                courses, nextCursor = Course.get_courses_keyset(keyword, data.get("cursor"), pageSize)
+            except InvalidCursor as e:
+                return {"success": False, "code": "CURSOR_INVALID", "message": str(e)}, HTTPStatus.BAD_REQUEST
+            return {"success": True, "code": "SUCCESS", "message": "Success.", "data": {"courses": [course.to_dict() for course in courses], "pagination": {"pageSize": pageSize, "nextCursor": nextCursor}}}, HTTPStatus.OK
 
         if keyword:
-            courses, total = Course.get_courses_by_name_or_code_paginated(keyword, current, pageSize)
+            courses, total, hasMore = Course.get_courses_by_name_or_code_paginated(keyword, current, pageSize, total_mode=totalMode)
         else:
-            courses, total = Course.get_all_courses_paginated(current, pageSize)
+            courses, total, hasMore = Course.get_all_courses_paginated(current, pageSize, total_mode=totalMode)
+
+        return {"success": True, "code": "SUCCESS", "message": "Success.", "data": {"courses": [course.to_dict() for course in courses], "pagination": {"total": total, "current": current, "pageSize": pageSize, "totalMode": totalMode, "hasMore": hasMore}}}, HTTPStatus.OK
+
+@course_ns.route("s/autocomplete")
+class CoursesAutocompleteApi(Resource):
+    @course_ns.param("prefix", "What was typed so far, matched against course codes and names")
+    @course_ns.param("limit", description="Maximum number of suggestions", required=False, type="integer", default=10)
+    @jwt_claims_required
+    def get(self, cls):
+        data = request.args
+
+        prefix = data.get("prefix", "")
+        limit = min(max(data.get("limit", 10, type=int), 1), BaseConfig.COURSE_AUTOCOMPLETE_MAX_LIMIT)
 
-        return {"success": True, "code": "SUCCESS", "message": "Success.", "data": {"courses": [course.to_dict() for course in courses], "pagination": {"total": total, "current": current, "pageSize": pageSize}}}, HTTPStatus.OK
\ No newline at end of file
+        # from the in-memory course index, no query per keystroke
+        return {"success": True, "code": "SUCCESS", "message": "Success.", "data": {"courses": Course.autocomplete(prefix, limit)}}, HTTPStatus.OK
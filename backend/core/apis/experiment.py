@@ -7,6 +7,7 @@ from functools import wraps
 
 from core.config import BaseConfig
 from core.models import Experiment, Question
+from core.pagination import InvalidCursor, TOTAL_MODES
 
 from .user import jwt_token_required, teacher_required
 
@@ -127,8 +128,10 @@ class ExperimentApi(Resource):
 class ExperimentsApi(Resource):
 
     @experiment_ns.param("question_id", "Question ID")
+    @experiment_ns.param("cursor", "Keyset cursor, pass an empty value for the first page and nextCursor afterwards (overrides current)", type=str)
     @experiment_ns.param("current", description="Current page number", required=False, type="integer", default=1)
     @experiment_ns.param("pageSize", description="Page size", required=False, type="integer", default=BaseConfig.PAGE_SIZE)
+    @experiment_ns.param("totalMode", "How the total is counted: exact, estimate (exact up to COUNT_ESTIMATE_LIMIT rows, extrapolated beyond) or none (total is null, see hasMore)", type=str, default="exact")
     @jwt_token_required
     @teacher_required
     def get(self, cls):
@@ -139,10 +142,23 @@ class ExperimentsApi(Resource):
 
         current = data.get("current", 1, type=int)
         pageSize = data.get("pageSize", BaseConfig.PAGE_SIZE, type=int)
+        totalMode = data.get("totalMode", "exact")
+        if totalMode not in TOTAL_MODES:
+            return {"success": False, "code": "TOTAL_MODE_INVALID", "message": f"Invalid total mode, valid modes are {', '.join(TOTAL_MODES)}."}, HTTPStatus.BAD_REQUEST
+        if not 1 <= pageSize <= BaseConfig.MAX_PAGE_SIZE:
+            return {"success": False, "code": "PAGE_SIZE_INVALID", "message": f"Invalid page size, valid sizes are 1 to {BaseConfig.MAX_PAGE_SIZE}."}, HTTPStatus.BAD_REQUEST
+
+        # keyset pagination, every page costs the same
+        if "cursor" in data:
+            try:
+                experiments, nextCursor = Experiment.get_user_experiments_keyset(user_id, question_id or None, data.get("cursor"), pageSize)
+            except InvalidCursor as e:
+                return {"success": False, "code": "CURSOR_INVALID", "message": str(e)}, HTTPStatus.BAD_REQUEST
+            return {"success": True, "code": "SUCCESS", "message": "SUCCESS.", "data": {"experiments": [experiment.to_dict() for experiment in experiments], "pagination": {"pageSize": pageSize, "nextCursor": nextCursor}}}, HTTPStatus.OK
 
         if not question_id:
-            experiments, total = Experiment.get_user_experiments_paginated(user_id, current, pageSize)
+            experiments, total, hasMore = Experiment.get_user_experiments_paginated(user_id, current, pageSize, total_mode=totalMode)
         else:
-            experiments, total = Experiment.get_user_experiments_by_question_id_paginated(user_id, question_id, current, pageSize)
+            experiments, total, hasMore = Experiment.get_user_experiments_by_question_id_paginated(user_id, question_id, current, pageSize, total_mode=totalMode)
         
-        return {"success": True, "code": "SUCCESS", "message": "SUCCESS.", "data": {"experiments": [experiment.to_dict() for experiment in experiments], "pagination": {"total": total, "current": current, "pageSize": pageSize}}}, HTTPStatus.OK
\ No newline at end of file
+        return {"success": True, "code": "SUCCESS", "message": "SUCCESS.", "data": {"experiments": [experiment.to_dict() for experiment in experiments], "pagination": {"total": total, "current": current, "pageSize": pageSize, "totalMode": totalMode, "hasMore": hasMore}}}, HTTPStatus.OK
\ No newline at end of file
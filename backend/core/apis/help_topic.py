@@ -7,8 +7,10 @@ from functools import wraps
 
 from core.config import BaseConfig
 from core.models import HelpTopic, Course
+from core.pagination import InvalidCursor, TOTAL_MODES
+from core.search import help_topic_search
 
-from .user import admin_required, jwt_token_required
+from .user import admin_required, jwt_token_required, jwt_claims_required
 
 help_topic_ns = Namespace(name="HelpTopic", description="HelpTopic related APIs")
 
@@ -20,7 +22,7 @@ add_help_topic_model = help_topic_ns.model('AddHelpTopic', {
     'topic_title': fields.String(required=True, description="Help Topic title", example="Derivative of Polynomial"),
     'topic_content': fields.String(required=True, description="Help Topic content", example="Explanation about derivatives"),
     'topic_type': fields.String(required=True, description="Help Topic type", example="NORMAL"),
-    'course_code': fields.Integer(required=True, description="Course ID", example="COMP3003"),
+    'course_code': fields.String(required=True, description="Course code", example="COMP3003"),
     'llm_name': fields.String(description="LLM used", example="ChatGPT-4"),
     'llm_answer': fields.String(description="LLM answer", example="The derivative of a polynomial.."),
     'human_score': fields.Float(description="Human score", example=4.5)
@@ -89,7 +91,7 @@ class HelpTopicApi(Resource):
         return {"success": True, "code": "SUCCESS", "message": "Help topic created successfully.", "data": new_topic.to_dict()}, HTTPStatus.CREATED
     
     @help_topic_ns.param("id", "Help topic ID")
-    @jwt_token_required
+    @jwt_claims_required
     def get(self, cls):
         data = request.args
 
@@ -166,7 +168,7 @@ class HelpTopicApi(Resource):
 
 @help_topic_ns.route("/<int:id>")
 class HelpTopicByIdApi(Resource):
-    @jwt_token_required
+    @jwt_claims_required
     def get(self, cls, id):
         topic = HelpTopic.get_topic_by_id(id)
         if topic:
@@ -174,7 +176,6 @@ class HelpTopicByIdApi(Resource):
         else:
             return {"success": False, "code": "HELP_TOPIC_NOT_FOUND", "message": "Help topic not found."}, HTTPStatus.NOT_FOUND
 
-    @help_topic_ns.expect(delete_help_topic_model)
     @jwt_token_required
     @admin_required
     def delete(self, cls, id):
@@ -205,10 +206,12 @@ class HelpTopicByIdApi(Resource):
 
 @help_topic_ns.route("s")
 class HelpTopicsApi(Resource):
-    @help_topic_ns.param("keyword", "Search keyword")
+    @help_topic_ns.param("keyword", "Full-text search of the titles, contents and LLM answers (word prefixes), results are ranked and have a snippet")
+    @help_topic_ns.param("cursor", "Keyset cursor, pass an empty value for the first page and nextCursor afterwards (overrides current)", type=str)
     @help_topic_ns.param("current", description="Current page number", required=False, type="integer", default=1)
     @help_topic_ns.param("pageSize", description="Page size", required=False, type="integer", default=BaseConfig.PAGE_SIZE)
-    @jwt_token_required
+    @help_topic_ns.param("totalMode", "How the total is counted: exact, estimate (exact up to COUNT_ESTIMATE_LIMIT rows, extrapolated beyond) or none (total is null, see hasMore)", type=str, default="exact")
+    @jwt_claims_required
     def get(self, cls):
         data = request.args
 
@@ -216,10 +219,25 @@ class HelpTopicsApi(Resource):
 
         current = data.get("current", 1, type=int)
         pageSize = data.get("pageSize", BaseConfig.PAGE_SIZE, type=int)
+        totalMode = data.get("totalMode", "exact")
+        if totalMode not in TOTAL_MODES:
+            return {"success": False, "code": "TOTAL_MODE_INVALID", "message": f"Invalid total mode, valid modes are {', '.join(TOTAL_MODES)}."}, HTTPStatus.BAD_REQUEST
+        if not 1 <= pageSize <= BaseConfig.MAX_PAGE_SIZE:
+            return {"success": False, "code": "PAGE_SIZE_INVALID", "message": f"Invalid page size, valid sizes are 1 to {BaseConfig.MAX_PAGE_SIZE}."}, HTTPStatus.BAD_REQUEST
+
+        # keyset pagination, every page costs the same
+        if "cursor" in data:
+            try:
+                topics, nextCursor = HelpTopic.get_topics_keyset(keyword, data.get("cursor"), pageSize)
+            except InvalidCursor as e:
+                return {"success": False, "code": "CURSOR_INVALID", "message": str(e)}, HTTPStatus.BAD_REQUEST
+            return {"success": True, "code": "SUCCESS", "message": "Success.", "data": {"topics": [topic.to_dict() for topic in topics], "pagination": {"pageSize": pageSize, "nextCursor": nextCursor}}}, HTTPStatus.OK
 
         if keyword:
-            topics, total = HelpTopic.get_topics_by_keyword_paginated(keyword, current, pageSize)
+            results, total, hasMore = HelpTopic.search_topics_paginated(keyword, current, pageSize, total_mode=totalMode)
+            topics = [dict(topic.to_dict(), snippet=help_topic_search.snippet(topic, keyword, snippet)) for topic, snippet in results]
+            return {"success": True, "code": "SUCCESS", "message": "Success.", "data": {"topics": topics, "pagination": {"total": total, "current": current, "pageSize": pageSize, "totalMode": totalMode, "hasMore": hasMore}}}, HTTPStatus.OK
         else:
-            topics, total = HelpTopic.get_all_topics_paginated(current, pageSize)
+            topics, total, hasMore = HelpTopic.get_all_topics_paginated(current, pageSize, total_mode=totalMode)
 
-        return {"success": True, "code": "SUCCESS", "message": "Success.", "data": {"topics": [topic.to_dict() for topic in topics], "pagination": {"total": total, "current": current, "pageSize": pageSize}}}, HTTPStatus.OK
+        return {"success": True, "code": "SUCCESS", "message": "Success.", "data": {"topics": [topic.to_dict() for topic in topics], "pagination": {"total": total, "current": current, "pageSize": pageSize, "totalMode": totalMode, "hasMore": hasMore}}}, HTTPStatus.OK
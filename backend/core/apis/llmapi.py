@@ -4,7 +4,6 @@ from http import HTTPStatus
 from flask import request, jsonify, Response, stream_with_context
 from flask_restx import Namespace, Resource, fields
 from functools import wraps
-import requests
 
 from core.config import BaseConfig
 
@@ -23,13 +22,18 @@ llm_request_model = llmapi.model('LLMRequest', {
         'role': fields.String(required=True, description="Role of the message", example="user"),
         'content': fields.String(required=True, description="Content of the message", example="who are you?")
     }))),
-    'stream': fields.Boolean(required=True, description="Stream the response", example=False),
+    'stream': fields.Boolean(required=False, description="Stream the response", example=False),
     'presence_penalty': fields.Float(required=False, description="Presence penalty", example=0.0),
     'frequency_penalty': fields.Float(required=False, description="Frequency penalty", example=0.0),
     'temperature': fields.Float(required=False, description="Temperature", example=0.7),
     'max_tokens': fields.Integer(required=False, description="Maximum tokens", example=2048)
 })
 
+def post_to_llm(headers, data, stream):
+    # requests (urllib3, certifi, ...) is imported by the first proxied call instead of at boot
+    import requests
+    return requests.post(BaseConfig.LLM_API_ENDPOINT, headers=headers, json=data, stream=stream)
+
 """
     Flask-Restx routes
 """
@@ -48,7 +52,7 @@ class LLMAPIProxy(Resource):
 
         stream = data.get('stream', False)
         
-        response = requests.post(BaseConfig.LLM_API_ENDPOINT, headers=headers, json=data, stream=stream)
+        response = post_to_llm(headers, data, stream)
 
         if stream:
             def generate():
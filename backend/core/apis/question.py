@@ -7,8 +7,10 @@ from functools import wraps
 
 from core.config import BaseConfig
 from core.models import Question, Course
+from core.pagination import InvalidCursor, TOTAL_MODES
+from core.search import question_search
 
-from .user import admin_required, jwt_token_required
+from .user import admin_required, jwt_token_required, jwt_claims_required
 
 question_ns = Namespace(name="Question", description="Question related APIs")
 
@@ -20,7 +22,7 @@ add_question_model = question_ns.model('AddQuestion', {
     'question_text': fields.String(required=True, description="Question text", example="What is the output of the following code?"),
     'question_category': fields.String(required=True, description="Question category", example="PROG"),
     'question_score': fields.Float(required=True, description="Question score", example=100.0),
-    'course_id': fields.Integer(required=True, description="Course ID", example=1)
+    'course_code': fields.String(required=True, description="Course code", example="COMP1023")
 })
 
 delete_question_model = question_ns.model('DeleteQuestion', {
@@ -80,7 +82,7 @@ class QuestionApi(Resource):
             return {"success": False, "code": "QUESTION_ADD_FAILED", "message": "Failed to add question."}, HTTPStatus.INTERNAL_SERVER_ERROR
 
     @question_ns.param("id", "Question ID")
-    @jwt_token_required
+    @jwt_claims_required
     def get(self, cls):
         data = request.args
 
@@ -152,13 +154,15 @@ class QuestionApi(Resource):
 
 @question_ns.route("s")
 class QuestionsApi(Resource):
-    @question_ns.param("keyword", "Search keyword")
+    @question_ns.param("keyword", "Full-text search of the question texts (word prefixes), results are ranked and have a snippet")
     @question_ns.param("course_name_or_code", "Search by course name or code")
     @question_ns.param("category", "Search by category")
     @question_ns.param("score", "Search by score")
+    @question_ns.param("cursor", "Keyset cursor, pass an empty value for the first page and nextCursor afterwards (overrides current)", type=str)
     @question_ns.param("current", description="Current page number", required=False, type="integer", default=1)
     @question_ns.param("pageSize", description="Page size", required=False, type="integer", default=BaseConfig.PAGE_SIZE)
-    @jwt_token_required
+    @question_ns.param("totalMode", "How the total is counted: exact, estimate (exact up to COUNT_ESTIMATE_LIMIT rows, extrapolated beyond) or none (total is null, see hasMore)", type=str, default="exact")
+    @jwt_claims_required
     def get(self, cls):
         data = request.args
 
@@ -169,16 +173,28 @@ class QuestionsApi(Resource):
 
         current = data.get("current", 1, type=int)
         pageSize = data.get("pageSize", BaseConfig.PAGE_SIZE, type=int)
-
-        if course_name_or_code:
-            questions, total = Question.get_questions_by_course_name_or_code_paginated(course_name_or_code, current, pageSize)
-        elif course_category:
-            questions, total = Question.get_questions_by_course_category_paginated(course_category, current, pageSize)
-        elif score:
-            questions, total = Question.get_questions_by_score_paginated(score, current, pageSize)
-        elif keyword:
-            questions, total = Question.get_questions_by_keyword_paginated(keyword, current, pageSize)
-        else:
-            questions, total = Question.get_all_questions_paginated(current, pageSize)
-
-        return {"success": True, "code": "SUCCESS", "message": "Success.", "data": {"questions": [question.to_dict() for question in questions], "pagination": {"total": total, "current": current, "pageSize": pageSize}}}, HTTPStatus.OK
+        totalMode = data.get("totalMode", "exact")
+        if totalMode not in TOTAL_MODES:
+            return {"success": False, "code": "TOTAL_MODE_INVALID", "message": f"Invalid total mode, valid modes are {', '.join(TOTAL_MODES)}."}, HTTPStatus.BAD_REQUEST
+        if not 1 <= pageSize <= BaseConfig.MAX_PAGE_SIZE:
+            return {"success": False, "code": "PAGE_SIZE_INVALID", "message": f"Invalid page size, valid sizes are 1 to {BaseConfig.MAX_PAGE_SIZE}."}, HTTPStatus.BAD_REQUEST
+
+        # every filter given applies, in both pagination modes
+        filters = {"course_name_or_code": course_name_or_code, "course_category": course_category, "question_score": score}
+
+        # keyset pagination, every page costs the same
+        if "cursor" in data:
+            try:
+                questions, nextCursor = Question.get_questions_keyset(dict(filters, keyword=keyword), data.get("cursor"), pageSize)
+            except InvalidCursor as e:
+                return {"success": False, "code": "CURSOR_INVALID", "message": str(e)}, HTTPStatus.BAD_REQUEST
+            return {"success": True, "code": "SUCCESS", "message": "Success.", "data": {"questions": [question.to_dict() for question in questions], "pagination": {"pageSize": pageSize, "nextCursor": nextCursor}}}, HTTPStatus.OK
+
+        if keyword:
+            results, total, hasMore = Question.search_questions_paginated(keyword, current, pageSize, total_mode=totalMode, filters=filters)
+            questions = [dict(question.to_dict(), snippet=question_search.snippet(question, keyword, snippet)) for question, snippet in results]
+            return {"success": True, "code": "SUCCESS", "message": "Success.", "data": {"questions": questions, "pagination": {"total": total, "current": current, "pageSize": pageSize, "totalMode": totalMode, "hasMore": hasMore}}}, HTTPStatus.OK
+
+        questions, total, hasMore = Question.get_questions_paginated(filters, current, pageSize, total_mode=totalMode)
+
+        return {"success": True, "code": "SUCCESS", "message": "Success.", "data": {"questions": [question.to_dict() for question in questions], "pagination": {"total": total, "current": current, "pageSize": pageSize, "totalMode": totalMode, "hasMore": hasMore}}}, HTTPStatus.OK
@@ -0,0 +1,52 @@
+# -*- encoding: utf-8 -*-
+
+import decimal
+import logging
+from flask import current_app, make_response
+from flask_restx.representations import output_json
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib encoder is used instead
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def orjson_default(value):
+    # the few types orjson does not encode natively
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def output_orjson(data, code, headers=None):
+    """
+        Same response as flask-restx's output_json, encoded by orjson straight to bytes
+    """
+    option = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+    if current_app.debug:
+        option |= orjson.OPT_INDENT_2
+    response = make_response(orjson.dumps(data, default=orjson_default, option=option), code)
+    response.headers.extend(headers or {})
+    return response
+
+
+# JSON_ENCODER -> representation of application/json
+JSON_ENCODERS = {
+    "json": output_json,
+    "orjson": output_orjson,
+}
+
+
+def init_representations(app, api):
+    """
+        Register the application/json representation of `api` selected by JSON_ENCODER
+    """
+    name = app.config.get('JSON_ENCODER', 'json')
+    if name == "orjson" and orjson is None:
+        logger.warning("JSON_ENCODER is orjson but orjson is not installed, using the json module")
+        name = "json"
+    api.representations["application/json"] = JSON_ENCODERS[name]
@@ -7,6 +7,7 @@ from functools import wraps
 
 from core.config import BaseConfig
 from core.models import Request, RequestAddCourse, RequestAddExperiment, RequestUpdateScore, Course, Experiment, Question, Answer
+from core.pagination import InvalidCursor, TOTAL_MODES
 
 from .user import jwt_token_required, admin_required, teacher_required
 
@@ -27,15 +28,15 @@ add_course_request_model = request_ns.model('AddCourseRequest', {
 add_experiment_request_model = request_ns.model('AddExperimentRequest', {
     'request_explanation': fields.String(description="Request explanation", example="Detailed explanation"),
     'experiment_id': fields.Integer(required=True, description="Experiment ID", example=1),
-    'llm_name': fields.String(required=True, description="LLM name", example="GPT-4"),
-    'comment': fields.String(required=True, description="Comment", example="No comment"),
-    'score': fields.Float(required=True, description="Score", example=4.5),
+    'llm_name': fields.String(description="LLM name", example="GPT-4"),
+    'comment': fields.String(description="Comment", example="No comment"),
+    'score': fields.Float(min=0, description="Score", example=4.5),
 })
 
 update_score_request_model = request_ns.model('UpdateScoreRequest', {
     'request_explanation': fields.String(description="Request explanation", example="Detailed explanation"),
     'answer_id': fields.Integer(required=True, description="Answer ID", example=1),
-    'new_score': fields.Float(required=True, description="New score", example=4.5),
+    'new_score': fields.Float(required=True, min=0, description="New score", example=4.5),
 })
 
 delete_request_model = request_ns.model('DeleteRequest', {
@@ -56,8 +57,10 @@ class RequestsApi(Resource):
     @request_ns.param("request_type", description="Request type", required=False, type="string", default=None)
     @request_ns.param("request_status", description="Request status", required=False, type="string", default=None)
     @request_ns.param("desc_order", description="Order by ID desc", required=False, type="boolean", default="true")
+    @request_ns.param("cursor", "Keyset cursor, pass an empty value for the first page and nextCursor afterwards (overrides current)", type=str)
     @request_ns.param("current", description="Current page number", required=False, type="integer", default=1)
     @request_ns.param("pageSize", description="Page size", required=False, type="integer", default=BaseConfig.PAGE_SIZE)
+    @request_ns.param("totalMode", "How the total is counted: exact, estimate (exact up to COUNT_ESTIMATE_LIMIT rows, extrapolated beyond) or none (total is null, see hasMore)", type=str, default="exact")
     @jwt_token_required
     @admin_required
     def get(self, cls):
@@ -67,19 +70,33 @@ class RequestsApi(Resource):
         request_status = data.get("request_status")
         desc_order = True if data.get("desc_order") == "true" else False
 
-        current = int(data.get("current", 1))
-        pageSize = int(data.get("pageSize", BaseConfig.PAGE_SIZE))
+        current = data.get("current", 1, type=int)
+        pageSize = data.get("pageSize", BaseConfig.PAGE_SIZE, type=int)
+        totalMode = data.get("totalMode", "exact")
+        if totalMode not in TOTAL_MODES:
+            return {"success": False, "code": "TOTAL_MODE_INVALID", "message": f"Invalid total mode, valid modes are {', '.join(TOTAL_MODES)}."}, HTTPStatus.BAD_REQUEST
+        if not 1 <= pageSize <= BaseConfig.MAX_PAGE_SIZE:
+            return {"success": False, "code": "PAGE_SIZE_INVALID", "message": f"Invalid page size, valid sizes are 1 to {BaseConfig.MAX_PAGE_SIZE}."}, HTTPStatus.BAD_REQUEST
+
+        # keyset pagination, every page costs the same
+        if "cursor" in data:
+            filters = {"request_type": request_type, "request_status": request_status}
+            try:
+                requests, nextCursor = Request.get_requests_keyset(filters, data.get("cursor"), pageSize, desc_order)
+            except InvalidCursor as e:
+                return {"success": False, "code": "CURSOR_INVALID", "message": str(e)}, HTTPStatus.BAD_REQUEST
+            return {"success": True, "code": "SUCCESS", "message": "Requests found.", "data": {"requests": [request.to_dict() for request in requests], "pagination": {"pageSize": pageSize, "nextCursor": nextCursor}}}, HTTPStatus.OK
 
         if request_type and request_status:
-            requests, total = Request.get_requests_by_type_and_status_paginated(request_type, request_status, current, pageSize, desc_order)
+            requests, total, hasMore = Request.get_requests_by_type_and_status_paginated(request_type, request_status, current, pageSize, desc_order, total_mode=totalMode)
         elif request_type:
-            requests, total = Request.get_requests_by_type_paginated(request_type, current, pageSize, desc_order)
+            requests, total, hasMore = Request.get_requests_by_type_paginated(request_type, current, pageSize, desc_order, total_mode=totalMode)
         elif request_status:
-            requests, total = Request.get_requests_by_status_paginated(request_status, current, pageSize, desc_order)
+            requests, total, hasMore = Request.get_requests_by_status_paginated(request_status, current, pageSize, desc_order, total_mode=totalMode)
         else:
-            requests, total = Request.get_requests_paginated(current, pageSize, desc_order)
+            requests, total, hasMore = Request.get_requests_paginated(current, pageSize, desc_order, total_mode=totalMode)
 
-        return {"success": True, "code": "SUCCESS", "message": "Requests found.", "data": {"requests": [request.to_dict() for request in requests], "pagination": {"total": total, "current": current, "pageSize": pageSize}}}, HTTPStatus.OK
+        return {"success": True, "code": "SUCCESS", "message": "Requests found.", "data": {"requests": [request.to_dict() for request in requests], "pagination": {"total": total, "current": current, "pageSize": pageSize, "totalMode": totalMode, "hasMore": hasMore}}}, HTTPStatus.OK
 
 
 @request_ns.route("s/myrequests")
@@ -87,8 +104,10 @@ class MyRequestsApi(Resource):
     @request_ns.param("request_type", description="Request type", required=False, type="string", default=None)
     @request_ns.param("request_status", description="Request status", required=False, type="string", default=None)
     @request_ns.param("desc_order", description="Order by ID desc", required=False, type="boolean", default="true")
+    @request_ns.param("cursor", "Keyset cursor, pass an empty value for the first page and nextCursor afterwards (overrides current)", type=str)
     @request_ns.param("current", description="Current page number", required=False, type="integer", default=1)
     @request_ns.param("pageSize", description="Page size", required=False, type="integer", default=BaseConfig.PAGE_SIZE)
+    @request_ns.param("totalMode", "How the total is counted: exact, estimate (exact up to COUNT_ESTIMATE_LIMIT rows, extrapolated beyond) or none (total is null, see hasMore)", type=str, default="exact")
     @jwt_token_required
     @teacher_required
     def get(self, cls):
@@ -98,21 +117,35 @@ class MyRequestsApi(Resource):
         request_status = data.get("request_status")
         desc_order = True if data.get("desc_order") == "true" else False
 
-        current = int(data.get("current", 1))
-        pageSize = int(data.get("pageSize", BaseConfig.PAGE_SIZE))
+        current = data.get("current", 1, type=int)
+        pageSize = data.get("pageSize", BaseConfig.PAGE_SIZE, type=int)
+        totalMode = data.get("totalMode", "exact")
+        if totalMode not in TOTAL_MODES:
+            return {"success": False, "code": "TOTAL_MODE_INVALID", "message": f"Invalid total mode, valid modes are {', '.join(TOTAL_MODES)}."}, HTTPStatus.BAD_REQUEST
+        if not 1 <= pageSize <= BaseConfig.MAX_PAGE_SIZE:
+            return {"success": False, "code": "PAGE_SIZE_INVALID", "message": f"Invalid page size, valid sizes are 1 to {BaseConfig.MAX_PAGE_SIZE}."}, HTTPStatus.BAD_REQUEST
 
         user_id = self.id
 
+        # keyset pagination, every page costs the same
+        if "cursor" in data:
+            filters = {"user_id": user_id, "request_type": request_type, "request_status": request_status}
+            try:
+                requests, nextCursor = Request.get_requests_keyset(filters, data.get("cursor"), pageSize, desc_order)
+            except InvalidCursor as e:
+                return {"success": False, "code": "CURSOR_INVALID", "message": str(e)}, HTTPStatus.BAD_REQUEST
+            return {"success": True, "code": "SUCCESS", "message": "Requests found.", "data": {"requests": [request.to_dict() for request in requests], "pagination": {"pageSize": pageSize, "nextCursor": nextCursor}}}, HTTPStatus.OK
+
         if request_type and request_status:
-            requests, total = Request.get_user_requests_by_type_and_status_paginated(user_id, request_type, request_status, current, pageSize, desc_order)
+            requests, total, hasMore = Request.get_user_requests_by_type_and_status_paginated(user_id, request_type, request_status, current, pageSize, desc_order, total_mode=totalMode)
         elif request_type:
-            requests, total = Request.get_user_requests_by_type_paginated(user_id, request_type, current, pageSize, desc_order)
+            requests, total, hasMore = Request.get_user_requests_by_type_paginated(user_id, request_type, current, pageSize, desc_order, total_mode=totalMode)
         elif request_status:
-            requests, total = Request.get_user_requests_by_status_paginated(user_id, request_status, current, pageSize, desc_order)
+            requests, total, hasMore = Request.get_user_requests_by_status_paginated(user_id, request_status, current, pageSize, desc_order, total_mode=totalMode)
         else:
-            requests, total = Request.get_user_requests_paginated(user_id, current, pageSize, desc_order)
+            requests, total, hasMore = Request.get_user_requests_paginated(user_id, current, pageSize, desc_order, total_mode=totalMode)
 
-        return {"success": True, "code": "SUCCESS", "message": "Requests found.", "data": {"requests": [request.to_dict() for request in requests], "pagination": {"total": total, "current": current, "pageSize": pageSize}}}, HTTPStatus.OK
+        return {"success": True, "code": "SUCCESS", "message": "Requests found.", "data": {"requests": [request.to_dict() for request in requests], "pagination": {"total": total, "current": current, "pageSize": pageSize, "totalMode": totalMode, "hasMore": hasMore}}}, HTTPStatus.OK
     
 @request_ns.route("/myrequest")
 class MyRequestApi(Resource):
@@ -0,0 +1,90 @@
+# -*- encoding: utf-8 -*-
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from flask import request, Response
+
+
+class SpecCache():
+    """
+        Serves swagger.json as prebuilt bytes (plain and gzip, each with its own ETag), instead of
+        rebuilding and re-serializing the spec from every namespace model on each request.
+        The spec comes from API_SPEC_FILE when it exists (`flask --app app build-spec`),
+        otherwise it is generated once per process.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.api = None
+        self.spec_file = None
+        self.body = None
+        self.gzip_body = None
+        self.etag = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, api):
+        self.app = app
+        self.api = api
+        self.spec_file = app.config.get('API_SPEC_FILE')
+        if app.config.get('API_DOCS_ENABLED', True):
+            # same URL and endpoint the Swagger UI links to, served from the cache
+            app.view_functions["specs"] = self.serve
+
+    def generate(self):
+        """
+            Build the spec from the namespaces, returns the JSON bytes
+        """
+        with self.app.test_request_context():
+            return json.dumps(self.api.__schema__, separators=(",", ":"), sort_keys=True).encode()
+
+    def build(self, path=None):
+        """
+            Write the spec and its gzip next to it, returns the path of the spec
+        """
+        path = path or self.spec_file
+        body = self.generate()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as spec:
+            spec.write(body)
+        with open(path + ".gz", "wb") as spec:
+            spec.write(gzip.compress(body, 9, mtime=0))
+        return path
+
+    def load(self):
+        if self.body is not None:
+            return
+        with self._lock:
+            if self.body is not None:
+                return
+            gzip_body = None
+            if self.spec_file and os.path.exists(self.spec_file):
+                with open(self.spec_file, "rb") as spec:
+                    body = spec.read()
+                if os.path.exists(self.spec_file + ".gz"):
+                    with open(self.spec_file + ".gz", "rb") as spec:
+                        gzip_body = spec.read()
+            else:
+                body = self.generate()
+            self.gzip_body = gzip_body or gzip.compress(body, 9, mtime=0)
+            self.etag = hashlib.sha256(body).hexdigest()[:32]
+            self.body = body
+
+    def serve(self):
+        self.load()
+        headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        # the gzip body is a different representation, it gets its own strong ETag
+        if "gzip" in request.accept_encodings:
+            body, etag, headers = self.gzip_body, self.etag + "-gz", dict(headers, **{"Content-Encoding": "gzip"})
+        else:
+            body, etag = self.body, self.etag
+        if etag in request.if_none_match:
+            response = Response(status=304, headers=headers)
+        else:
+            response = Response(body, mimetype="application/json", headers=headers)
+        response.set_etag(etag)
+        return response
+
+api_spec = SpecCache()
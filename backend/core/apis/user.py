@@ -1,18 +1,28 @@
 # -*- encoding: utf-8 -*-
 
+import csv
 from datetime import datetime
 from http import HTTPStatus
+import io
+import json
 import re
-from flask import request, render_template
-from flask_mail import Message
-from flask_restx import Namespace, Resource, fields
+from email.utils import formataddr
+from flask import g, request
+from flask_restx import Namespace, Resource, fields, reqparse
 from functools import wraps
+from werkzeug.datastructures import FileStorage
 import jwt
 
+from core.cache import principal_cache
 from core.config import BaseConfig
+from core.hashing import PasswordHasherBusy, password_hasher
 from core.models import User, JWTTokenBlocklist
 
-from core.utils import mail
+from core.outbox import outbox
+from core.pagination import InvalidCursor, TOTAL_MODES
+from core.presence import presence_buffer
+from core.ratelimit import rate_limiter
+from core.utils import render_cached_template
 
 user_ns = Namespace(name="User", description="User related APIs")
 
@@ -40,6 +50,10 @@ register_old_model = user_ns.model("RegisterOld", {
     "password": fields.String(required=True, max_length=128, description="Password")
 })
 
+refresh_token_model = user_ns.model("RefreshToken", {
+    "refreshToken": fields.String(required=True, description="Refresh token")
+})
+
 login_model = user_ns.model("Login", {
     "email": fields.String(required=True, max_length=128, description="Email"),
     "password": fields.String(required=True, max_length=128, description="Password")
@@ -75,50 +89,220 @@ change_user_type_model = user_ns.model("ChangeUserType", {
     "user_type": fields.String(required=True, description="User type", example="TEACHER")
 })
 
+roster_parser = reqparse.RequestParser()
+roster_parser.add_argument("file", location="files", type=FileStorage, required=False, help="Roster file (.csv with a username,email,password header, or .jsonl)")
+
+"""
+   Access and refresh tokens
+"""
+def create_access_token(user):
+    """
+       Issue a short-lived access token carrying the identity and role claims
+    """
+    return jwt.encode({"type": "access", "id": user.id, "email": user.email, "user_type": user.user_type, "ver": user.token_version, "exp": datetime.now() + BaseConfig.JWT_ACCESS_TOKEN_EXPIRES}, BaseConfig.JWT_SECRET_KEY, algorithm="HS256")
+
+def create_refresh_token(user):
+    """
+       Issue a long-lived refresh token, only accepted by the refresh endpoint
+    """
+    return jwt.encode({"type": "refresh", "id": user.id, "ver": user.token_version, "exp": datetime.now() + BaseConfig.JWT_REFRESH_TOKEN_EXPIRES}, BaseConfig.JWT_REFRESH_TOKEN_SECRET_KEY, algorithm="HS256")
+
+def get_bearer_token():
+    """
+       Extract the token from the Authorization header, returns (token, error response)
+    """
+    token = request.headers.get("Authorization")
+    
+    if not token:
+        return None, ({"success": False, "code": "NO_TOKEN", "message": "No token provided."}, 401)
+    
+    # check if the token starts with "Bearer "
+    if not token.startswith("Bearer "):
+        return None, ({"success": False, "code": "INVALID_TOKEN", "message": "Invalid token format."}, 401)
+    
+    # extract the token value
+    return token.split(" ")[1], None
+
+def decode_access_token(token):
+    """
+       Verify an access token, returns (claims, error response)
+    """
+    try:
+        token_data = jwt.decode(token, BaseConfig.JWT_SECRET_KEY, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        return None, ({"success": False, "code": "EXPIRED_TOKEN", "message": "Expired token."}, 401)
+    except jwt.InvalidTokenError:
+        return None, ({"success": False, "code": "INVALID_TOKEN", "message": "Invalid token."}, 401)
+    
+    if token_data.get("type") != "access" or "id" not in token_data:
+        return None, ({"success": False, "code": "INVALID_TOKEN", "message": "Invalid token."}, 401)
+    
+    return token_data, None
+
+class TokenPrincipal():
+    """
+       The authenticated user as described by the access token claims, no database row behind it
+    """
+    def __init__(self, token_data):
+        self.id = token_data["id"]
+        self.email = token_data.get("email")
+        self.user_type = token_data.get("user_type")
+
+    def get_id(self):
+        return self.id
+
+    def get_email(self):
+        return self.email
+
+    def get_user_type(self):
+        return self.user_type
+
 """
    JWT token required
 """
 def jwt_token_required(func):
     """
        Decorator function to check if the user is authenticated
+       The user is loaded from the database, use it for writes and sensitive reads
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        token = request.headers.get("Authorization")
-        
-        if not token:
-            return {"success": False, "code": "NO_TOKEN", "message": "No token provided."}, 401
-        
-        # check if the token starts with "Bearer "
-        if not token.startswith("Bearer "):
-            return {"success": False, "code": "INVALID_TOKEN", "message": "Invalid token format."}, 401
+        token, error = get_bearer_token()
+        if error:
+            return error
+        
+        # reuse the principal if this token was verified recently
+        principal = principal_cache.get(token)
+        if principal is not None:
+            # another worker process may have revoked, deactivated or demoted the user since
+            state = User.get_auth_state(principal["id"])
+            if state is not None and tuple(state) == (principal["token_version"], principal["account_status"], principal["user_type"]):
+                g.user_id = principal["id"]
+                presence_buffer.touch(principal["id"])
+                return func(User.from_snapshot(principal), *args, **kwargs)
+            principal_cache.invalidate_user(principal["id"])
+        
+        token_data, error = decode_access_token(token)
+        if error:
+            return error
         
-        # extract the token value
-        token = token.split(" ")[1]
-        
-        try:
-            token_data = jwt.decode(token, BaseConfig.JWT_SECRET_KEY, algorithms=["HS256"])
-        except jwt.ExpiredSignatureError:
-            return {"success": False, "code": "EXPIRED_TOKEN", "message": "Expired token."}, 401
-        except jwt.InvalidTokenError:
-            return {"success": False, "code": "INVALID_TOKEN", "message": "Invalid token."}, 401
-        
-        # check if the token is in the blocklist
-        user = User.get_by_email(token_data["email"])
+        # get the user
+        user = User.get_by_id(token_data["id"])
         
         # check if the user exists
         if not user:
             return {"success": False, "code": "INVALID_TOKEN", "message": "Invalid user."}, 401
-        # check if the token is in the blocklist
-        if JWTTokenBlocklist.is_token_blocklisted(token):
-            return {"success": False, "code": "INVALID_TOKEN", "message": "Token is in the blocklist. The user has already logged out."}, 401
-        # check if the user is active
-        if not user.check_jwt_auth_active():
+        # check if the token has been revoked (logout, password change, deactivation)
+        if token_data.get("ver") != user.get_token_version():
             return {"success": False, "code": "INVALID_TOKEN", "message": "Token is invalid. The user has already logged out."}, 401
+        g.user_id = user.id
+        
+        # cache the verified principal, never beyond the token expiry
+        principal_cache.set(token, user.id, user.to_snapshot(), token_data.get("exp"))
+        
+        # record the activity, written behind by the presence buffer
+        user.set_last_online()
         
         return func(user, *args, **kwargs)
     return wrapper
 
+"""
+   JWT claims required
+"""
+def jwt_claims_required(func):
+    """
+       Decorator function to check if the user is authenticated using the token claims only
+       No database access, a revoked token stays usable until it expires, so use it for read-only endpoints
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token, error = get_bearer_token()
+        if error:
+            return error
+        
+        token_data, error = decode_access_token(token)
+        if error:
+            return error
+        
+        g.user_id = token_data["id"]
+        presence_buffer.touch(token_data["id"])
+        
+        return func(TokenPrincipal(token_data), *args, **kwargs)
+    return wrapper
+
+"""
+    Password hashing
+"""
+def password_hashing_guard(func):
+    """
+       Decorator function to answer 503 right away when the password hashing pool is saturated
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except PasswordHasherBusy:
+            return {"success": False, "code": "SERVER_BUSY", "message": "Server is busy. Please try again later."}, HTTPStatus.SERVICE_UNAVAILABLE, {"Retry-After": "1"}
+    return wrapper
+
+"""
+    Rate limiting
+"""
+def rate_limit(scope, keys=("ip", "email", "user")):
+    """
+       Decorator function to answer 429 before any hashing, mail or database work once a bucket of `scope` is empty
+       Buckets are keyed by client IP, the email in the request body and, below jwt_token_required, the user id,
+       restricted to `keys` for endpoints where a key is not what the request authenticates with
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            identities = {"ip": request.remote_addr}
+            email = (request.get_json(silent=True) or {}).get("email")
+            if isinstance(email, str) and email:
+                identities["email"] = email.strip().lower()
+            if args and hasattr(args[0], "get_id"):
+                identities["user"] = args[0].get_id()
+            identities = {key: value for key, value in identities.items() if key in keys}
+
+            retry_after = rate_limiter.hit(scope, identities)
+            if retry_after:
+                return {"success": False, "code": "TOO_MANY_REQUESTS", "message": "Too many requests. Please try again later."}, HTTPStatus.TOO_MANY_REQUESTS, {"Retry-After": str(retry_after)}
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+"""
+    Registration rules
+"""
+def derive_user_type(email, password):
+    """
+       Decide the user type from the UIC email domain, returns None for a non-UIC email
+    """
+    if not ((email.endswith("uic.edu.cn") or email.endswith("uic.edu.hk")) and re.match(r"[^@]+@[^@]+\.[^@]+", email)):
+        return None
+    if password == BaseConfig.ADMIN_PASSWORD:
+        return "ADMIN"
+    elif email.endswith("@uic.edu.cn") or email.endswith("@uic.edu.hk"):
+        return "TEACHER"
+    elif email.endswith("@mail.uic.edu.cn") or email.endswith("@mail.uic.edu.hk"):
+        return "STUDENT"
+    return ""
+
+def check_password_strength(password):
+    """
+       Returns the reason why the password is too weak, or None
+    """
+    if len(password) < 8:
+        return "Password is too short."
+    elif not any(char.isdigit() for char in password):
+        return "Password must contain at least one digit."
+    elif not any(char.isupper() for char in password):
+        return "Password must contain at least one uppercase letter."
+    elif not any(char.islower() for char in password):
+        return "Password must contain at least one lowercase letter."
+    return None
+
 """
     Admin required
 """
@@ -176,12 +360,14 @@ def student_required(func):
 
 @user_ns.route("/email-verification")
 class EmailVerificationApi(Resource):
-    @user_ns.expect(email_verification_model, validate=True)
+    @user_ns.expect(email_verification_model)
     @user_ns.response(200, "Registration link sent successfully")
     @user_ns.response(400, "Failed to send registration link due to invalid email")
     @user_ns.response(404, "User not found")
     @user_ns.response(409, "Email already exists")
     @user_ns.response(500, "Failed to send registration link due to internal server error")
+    @user_ns.response(429, "Too many requests")
+    @rate_limit("email_verification")
     def post(self):
         """
            Get registration link
@@ -206,26 +392,25 @@ class EmailVerificationApi(Resource):
         # generate a registration link using the email
         vCode = jwt.encode({"email": email, "exp": datetime.now() + BaseConfig.JWT_REGISTRATION_TOKEN_EXPIRES}, BaseConfig.JWT_REGISTRATION_TOKEN_SECRET_KEY, algorithm="HS256")
 
-        # send the registration link
-        msg = Message("Registration Link", sender=("LLM Homework", BaseConfig.MAIL_USERNAME), recipients=[email])
-
         # HTML template for the email
-        html_content = render_template('email_template.html', registration_url=f"{BaseConfig.FRONTEND_URL}/register?code={vCode}")
+        html_content = render_cached_template('email_template.html', registration_url=f"{BaseConfig.FRONTEND_URL}/register?code={vCode}")
 
-        msg.html = html_content
-        mail.send(msg)
+        # queue the registration link, the outbox sender delivers it in the background
+        outbox.enqueue("Registration Link", formataddr(("LLM Homework", BaseConfig.MAIL_USERNAME)), [email], html_content)
         
         return {"success": True, "code": "REGISTRATION_LINK_SENT", "message": "Registration link sent successfully."}, HTTPStatus.OK
 
 
 @user_ns.route("/vcode-verification")
 class VCodeVerificationApi(Resource):
-    @user_ns.expect(vcode_verification_model, validate=True)
+    @user_ns.expect(vcode_verification_model)
     @user_ns.response(200, "vCode verified successfully")
     @user_ns.response(400, "vCode verification failed due to invalid input")
     @user_ns.response(404, "vCode not found")
     @user_ns.response(500, "vCode verification failed due to internal server error")
+    @user_ns.response(429, "Too many requests")
     @user_ns.doc(security=None)
+    @rate_limit("vcode_verification")
     def post(self):
         """
            Verify vCode
@@ -257,12 +442,16 @@ class VCodeVerificationApi(Resource):
 
 @user_ns.route("/register")
 class RegisterApi(Resource):
-    @user_ns.expect(register_model, validate=True)
+    @user_ns.expect(register_model)
     @user_ns.response(201, "User registered successfully")
     @user_ns.response(400, "Registration failed due to invalid input")
     @user_ns.response(409, "Username already exists")
     @user_ns.response(500, "Registration failed due to internal server error")
+    @user_ns.response(503, "Server is busy")
+    @user_ns.response(429, "Too many requests")
     @user_ns.doc(security=None)
+    @password_hashing_guard
+    @rate_limit("register", keys=("ip",))
     def post(self):
         """
            Register a new user
@@ -277,8 +466,8 @@ class RegisterApi(Resource):
         if not vCode:
             return {"success": False, "code": "VCODE_MISSING", "message": "vCode missing."}, HTTPStatus.BAD_REQUEST
         
-        # check whether the vCode is in the blocklist
-        if JWTTokenBlocklist.is_token_blocklisted(vCode):
+        # check whether the vCode is in the blocklist, including the vCodes other worker processes have just used up
+        if JWTTokenBlocklist.is_token_blocklisted(vCode, sync=True):
             return {"success": False, "code": "VCODE_USED", "message": "vCode has already been used."}, HTTPStatus.BAD_REQUEST
 
         try:
@@ -297,26 +486,13 @@ class RegisterApi(Resource):
             return {"success": False, "code": "USERNAME_ALREADY_EXISTS", "message": "Username already exists."}, HTTPStatus.CONFLICT
         
         # check if the password is strong enough
-        if len(password) < 8:
-            return {"success": False, "code": "PASSWORD_INVALID", "message": "Password is too short."}, HTTPStatus.BAD_REQUEST
-        elif not any(char.isdigit() for char in password):
-            return {"success": False, "code": "PASSWORD_INVALID", "message": "Password must contain at least one digit."}, HTTPStatus.BAD_REQUEST
-        elif not any(char.isupper() for char in password):
-            return {"success": False, "code": "PASSWORD_INVALID", "message": "Password must contain at least one uppercase letter."}, HTTPStatus.BAD_REQUEST
-        elif not any(char.islower() for char in password):
-            return {"success": False, "code": "PASSWORD_INVALID", "message": "Password must contain at least one lowercase letter."}, HTTPStatus.BAD_REQUEST
+        password_error = check_password_strength(password)
+        if password_error:
+            return {"success": False, "code": "PASSWORD_INVALID", "message": password_error}, HTTPStatus.BAD_REQUEST
         
-        user_type = ""
-
         # check if the email valid and decide the user type
-        if (email.endswith("uic.edu.cn") or email.endswith("uic.edu.hk")) and re.match(r"[^@]+@[^@]+\.[^@]+", email):
-            if password == BaseConfig.ADMIN_PASSWORD:
-                user_type = "ADMIN"
-            elif email.endswith("@uic.edu.cn") or email.endswith("@uic.edu.hk"):
-                user_type = "TEACHER"
-            elif email.endswith("@mail.uic.edu.cn") or email.endswith("@mail.uic.edu.hk"):
-                user_type = "STUDENT"
-        else:
+        user_type = derive_user_type(email, password)
+        if user_type is None:
             return {"success": False, "code": "EMAIL_INVALID", "message": "Invalid email. Please use a valid UIC email."}, HTTPStatus.BAD_REQUEST
         
         # set the account status
@@ -325,8 +501,7 @@ class RegisterApi(Resource):
         # create the user
         if User.register(username, email, password, user_type, account_status):
             # make vCode invalid
-            jwt_block = JWTTokenBlocklist(jwt_token=vCode, token_type="vCode")
-            jwt_block.save()
+            JWTTokenBlocklist.block_token(vCode, "vCode", vCode_data["exp"])
             return {"success": True, "code": "REGISTRATION_SUCCESSFUL", "message": "User registered successfully."}, HTTPStatus.CREATED
         else:
             return {"success": False, "code": "REGISTRATION_FAILED", "message": "User registration failed."}, HTTPStatus.INTERNAL_SERVER_ERROR
@@ -334,12 +509,16 @@ class RegisterApi(Resource):
 
 @user_ns.route("/register-old")
 class RegisterOldApi(Resource):
-    @user_ns.expect(register_old_model, validate=True)
+    @user_ns.expect(register_old_model)
     @user_ns.response(201, "User registered successfully")
     @user_ns.response(400, "Registration failed due to invalid input")
     @user_ns.response(409, "Email or username already exists")
     @user_ns.response(500, "Registration failed due to internal server error")
+    @user_ns.response(503, "Server is busy")
+    @user_ns.response(429, "Too many requests")
     @user_ns.doc(security=None)
+    @password_hashing_guard
+    @rate_limit("register")
     def post(self):
         """
            Register a new user
@@ -374,25 +553,14 @@ class RegisterOldApi(Resource):
             return {"success": False, "code": "USERNAME_ALREADY_EXISTS", "message": "Username already exists."}, HTTPStatus.CONFLICT
                 
         # check if the email valid and decide the user type
-        if (email.endswith("uic.edu.cn") or email.endswith("uic.edu.hk")) and re.match(r"[^@]+@[^@]+\.[^@]+", email):
-            if password == BaseConfig.ADMIN_PASSWORD:
-                user_type = "ADMIN"
-            elif email.endswith("@uic.edu.cn") or email.endswith("@uic.edu.hk"):
-                user_type = "TEACHER"
-            elif email.endswith("@mail.uic.edu.cn") or email.endswith("@mail.uic.edu.hk"):
-                user_type = "STUDENT"
-        else:
+        user_type = derive_user_type(email, password)
+        if user_type is None:
             return {"success": False, "code": "EMAIL_INVALID", "message": "Invalid email. Please use a valid UIC email."}, HTTPStatus.BAD_REQUEST
         
         # check if the password is strong enough
-        if len(password) < 8:
-            return {"success": False, "code": "PASSWORD_INVALID", "message": "Password is too short."}, HTTPStatus.BAD_REQUEST
-        elif not any(char.isdigit() for char in password):
-            return {"success": False, "code": "PASSWORD_INVALID", "message": "Password must contain at least one digit."}, HTTPStatus.BAD_REQUEST
-        elif not any(char.isupper() for char in password):
-            return {"success": False, "code": "PASSWORD_INVALID", "message": "Password must contain at least one uppercase letter."}, HTTPStatus.BAD_REQUEST
-        elif not any(char.islower() for char in password):
-            return {"success": False, "code": "PASSWORD_INVALID", "message": "Password must contain at least one lowercase letter."}, HTTPStatus.BAD_REQUEST
+        password_error = check_password_strength(password)
+        if password_error:
+            return {"success": False, "code": "PASSWORD_INVALID", "message": password_error}, HTTPStatus.BAD_REQUEST
         
         # set the account status
         account_status = 'ACTIVE'
@@ -406,10 +574,14 @@ class RegisterOldApi(Resource):
 
 @user_ns.route("/login")
 class LoginApi(Resource):
-    @user_ns.expect(login_model, validate=True)
+    @user_ns.expect(login_model)
     @user_ns.response(200, "User logged in successfully")
     @user_ns.response(400, "Login failed due to invalid email or password")
+    @user_ns.response(503, "Server is busy")
+    @user_ns.response(429, "Too many requests")
     @user_ns.doc(security=None)
+    @password_hashing_guard
+    @rate_limit("login")
     def post(self):
         """
            Login a user
@@ -427,24 +599,73 @@ class LoginApi(Resource):
         # check if the password is correct
         if not user.check_password(password):
             return {"success": False, "code": "PASSWORD_INVALID", "message": "Invalid password."}, HTTPStatus.BAD_REQUEST
+        g.user_id = user.id
         
         # check if the user is active
         if user.get_account_status() == 'INACTIVE':
             return {"success": False, "code": "ACCOUNT_INACTIVE", "message": "Account is inactive."}, HTTPStatus.BAD_REQUEST
         
-        # create access token using JWT
-        token = jwt.encode({"email": email, "exp": datetime.now() + BaseConfig.JWT_ACCESS_TOKEN_EXPIRES}, BaseConfig.JWT_SECRET_KEY, algorithm="HS256")
+        # upgrade the stored hash if the hash parameters changed, best effort
+        rehashed = False
+        if user.password_needs_rehash():
+            try:
+                user.set_password(password)
+                rehashed = True
+            except PasswordHasherBusy:
+                pass
         
-        # set the last online time
+        # create access and refresh tokens using JWT
+        token = create_access_token(user)
+        refresh_token = create_refresh_token(user)
+        
+        # set the last online time, written behind by the presence buffer
         user.set_last_online()
         
-        # set the jwt auth active status
-        user.set_jwt_auth_active(True)
+        # login the user, only commit when a column actually changes
+        if rehashed or not user.check_jwt_auth_active():
+            user.set_jwt_auth_active(True)
+            user.save()
         
-        # login the user
-        user.save()
+        return {"success": True, "code": "LOGIN_SUCCESSFUL", "message": "User logged in successfully.", "data": {"token": "Bearer " + token, "refreshToken": refresh_token, "user": user.to_dict()}}, HTTPStatus.OK
+
+
+@user_ns.route("/token/refresh")
+class RefreshTokenApi(Resource):
+    @user_ns.expect(refresh_token_model)
+    @user_ns.response(200, "Token refreshed successfully")
+    @user_ns.response(401, "Refresh failed due to invalid or revoked refresh token")
+    @user_ns.response(429, "Too many requests")
+    @user_ns.doc(security=None)
+    @rate_limit("token_refresh")
+    def post(self):
+        """
+           Get a new access token using a refresh token
+        """
+        data = request.json
+        refresh_token = data.get("refreshToken")
+        
+        try:
+            token_data = jwt.decode(refresh_token, BaseConfig.JWT_REFRESH_TOKEN_SECRET_KEY, algorithms=["HS256"])
+        except jwt.ExpiredSignatureError:
+            return {"success": False, "code": "EXPIRED_TOKEN", "message": "Expired refresh token."}, HTTPStatus.UNAUTHORIZED
+        except jwt.InvalidTokenError:
+            return {"success": False, "code": "INVALID_TOKEN", "message": "Invalid refresh token."}, HTTPStatus.UNAUTHORIZED
         
-        return {"success": True, "code": "LOGIN_SUCCESSFUL", "message": "User logged in successfully.", "data": {"token": "Bearer " + token, "user": user.to_dict()}}, HTTPStatus.OK
+        if token_data.get("type") != "refresh":
+            return {"success": False, "code": "INVALID_TOKEN", "message": "Invalid refresh token."}, HTTPStatus.UNAUTHORIZED
+        
+        # re-validate against the database, the role may have changed since the last token
+        user = User.get_by_id(token_data.get("id"))
+        if not user:
+            return {"success": False, "code": "INVALID_TOKEN", "message": "Invalid user."}, HTTPStatus.UNAUTHORIZED
+        if token_data.get("ver") != user.get_token_version():
+            return {"success": False, "code": "INVALID_TOKEN", "message": "Token is invalid. The user has already logged out."}, HTTPStatus.UNAUTHORIZED
+        if user.get_account_status() == 'INACTIVE':
+            return {"success": False, "code": "ACCOUNT_INACTIVE", "message": "Account is inactive."}, HTTPStatus.UNAUTHORIZED
+        
+        token = create_access_token(user)
+        
+        return {"success": True, "code": "TOKEN_REFRESHED", "message": "Token refreshed successfully.", "data": {"token": "Bearer " + token}}, HTTPStatus.OK
 
 
 @user_ns.route("/logout")
@@ -456,21 +677,8 @@ class LogoutApi(Resource):
         """
            Logout a user
         """
-        _jwt_token = request.headers.get("Authorization")
-        
-        if not _jwt_token:
-            return {"success": False, "code": "TOKEN_MISSING", "message": "Token missing."}, HTTPStatus.BAD_REQUEST
-                
-        # check if the token starts with "Bearer "
-        if not _jwt_token.startswith("Bearer "):
-            return {"success": False, "code": "TOKEN_INVALID", "message": "Invalid token format."}, HTTPStatus.BAD_REQUEST
-        
-        # extract the token value
-        _jwt_token = _jwt_token.split(" ")[1]
-        
-        # put the jwt token in the blocklist
-        jwt_block = JWTTokenBlocklist(jwt_token=_jwt_token, token_type="token")
-        jwt_block.save()
+        # revoke all tokens of the user
+        self.bump_token_version()
         
         # set the jwt auth active status
         self.set_jwt_auth_active(False)
@@ -505,7 +713,7 @@ class UserApi(Resource):
     @user_ns.response(400, "Update user failed due to invalid input")
     @user_ns.response(401, "Unauthorized")
     @user_ns.response(500, "Update user failed due to internal server error")
-    @user_ns.expect(change_user_model, validate=True)
+    @user_ns.expect(change_user_model)
     @jwt_token_required
     @admin_required
     def patch(self, cls):
@@ -552,6 +760,9 @@ class UserApi(Resource):
         if user_type:
             user.set_user_type(user_type)
         if account_status:
+            if account_status == "INACTIVE" and user.get_account_status() != "INACTIVE":
+                # revoke all tokens of the deactivated user
+                user.bump_token_version()
             user.set_account_status(account_status)
 
         user.save()
@@ -562,7 +773,7 @@ class UserApi(Resource):
     @user_ns.response(401, "Unauthorized")
     @user_ns.response(404, "User not found")
     @user_ns.response(500, "Delete user failed due to internal server error")
-    @user_ns.expect(delete_user_model, validate=True)
+    @user_ns.expect(delete_user_model)
     @jwt_token_required
     @admin_required
     def delete(self, cls):
@@ -601,7 +812,7 @@ class UserByIdApi(Resource):
         
         return {"success": True, "code": "USER_FOUND", "message": "User found.", "data": user.to_dict()}, HTTPStatus.OK
     
-    @user_ns.expect(change_user_by_id_model, validate=True)
+    @user_ns.expect(change_user_by_id_model)
     @user_ns.response(200, "User updated successfully")
     @user_ns.response(400, "Update user failed due to invalid input")
     @user_ns.response(401, "Unauthorized")
@@ -653,6 +864,9 @@ class UserByIdApi(Resource):
         if user_type:
             user.set_user_type(user_type)
         if account_status:
+            if account_status == "INACTIVE" and user.get_account_status() != "INACTIVE":
+                # revoke all tokens of the deactivated user
+                user.bump_token_version()
             user.set_account_status(account_status)
         
         user.save()
@@ -685,13 +899,17 @@ class UserByIdApi(Resource):
 
 @user_ns.route("/<int:id>/password")
 class ChangePasswordApi(Resource):
-    @user_ns.expect(change_password_model, validate=True)
+    @user_ns.expect(change_password_model)
     @user_ns.response(200, "Password changed successfully")
     @user_ns.response(400, "Change password failed due to invalid input")
     @user_ns.response(401, "Unauthorized")
     @user_ns.response(404, "User not found")
     @user_ns.response(500, "Change password failed due to internal server error")
+    @user_ns.response(503, "Server is busy")
+    @user_ns.response(429, "Too many requests")
     @jwt_token_required
+    @password_hashing_guard
+    @rate_limit("password_change")
     def patch(self, cls, id):
         """
            Change password
@@ -719,11 +937,16 @@ class ChangePasswordApi(Resource):
         elif not any(char.islower() for char in new_password):
             return {"success": False, "code": "PASSWORD_INVALID", "message": "New password must contain at least one lowercase letter."}, HTTPStatus.BAD_REQUEST
         
-        # set the new password
+        # set the new password and revoke all existing tokens
         self.set_password(new_password)
+        self.bump_token_version()
         self.save()
         
-        return {"success": True, "code": "PASSWORD_CHANGED", "message": "Password changed successfully."}, HTTPStatus.OK
+        # issue new tokens so the current session stays logged in
+        token = create_access_token(self)
+        refresh_token = create_refresh_token(self)
+        
+        return {"success": True, "code": "PASSWORD_CHANGED", "message": "Password changed successfully.", "data": {"token": "Bearer " + token, "refreshToken": refresh_token}}, HTTPStatus.OK
 
 @user_ns.route("/<int:id>/account-status")
 class AccountStatusApi(Resource):
@@ -732,7 +955,7 @@ class AccountStatusApi(Resource):
     @user_ns.response(401, "Unauthorized")
     @user_ns.response(404, "User not found")
     @user_ns.response(500, "Update account status failed due to internal server error")
-    @user_ns.expect(change_account_status_model, validate=True)
+    @user_ns.expect(change_account_status_model)
     @jwt_token_required
     @admin_required
     def patch(self, cls, id):
@@ -752,6 +975,10 @@ class AccountStatusApi(Resource):
         if account_status not in ["ACTIVE", "INACTIVE"]:
             return {"success": False, "code": "ACCOUNT_STATUS_INVALID", "message": "Invalid account status."}, HTTPStatus.BAD_REQUEST
         
+        # revoke all tokens of the deactivated user
+        if account_status == "INACTIVE" and user.get_account_status() != "INACTIVE":
+            user.bump_token_version()
+        
         # set the account status
         user.set_account_status(account_status)
         user.save()
@@ -765,7 +992,7 @@ class UserTypeApi(Resource):
     @user_ns.response(401, "Unauthorized")
     @user_ns.response(404, "User not found")
     @user_ns.response(500, "Update user type failed due to internal server error")
-    @user_ns.expect(change_user_type_model, validate=True)
+    @user_ns.expect(change_user_type_model)
     @jwt_token_required
     @admin_required
     def patch(self, cls, id):
@@ -795,25 +1022,196 @@ class UserTypeApi(Resource):
 @user_ns.route("s")
 class UserListApi(Resource):
     @user_ns.response(200, "Users found")
+    @user_ns.response(400, "Invalid filter, sort or cursor")
     @user_ns.response(404, "Users not found")
     @user_ns.response(500, "Get users failed due to internal server error")
+    @user_ns.param("userType", "Filter by user type (ADMIN, TEACHER, STUDENT)", type=str)
+    @user_ns.param("accountStatus", "Filter by account status (ACTIVE, INACTIVE)", type=str)
+    @user_ns.param("username", "Username prefix", type=str)
+    @user_ns.param("email", "Email prefix", type=str)
+    @user_ns.param("lastOnlineFrom", "Last online at or after (YYYY-MM-DD HH:MM:SS)", type=str)
+    @user_ns.param("lastOnlineTo", "Last online at or before (YYYY-MM-DD HH:MM:SS)", type=str)
+    @user_ns.param("sortBy", "Sort field (id, username, email, last_online)", type=str, default="id")
+    @user_ns.param("order", "Sort order (asc, desc)", type=str, default="asc")
+    @user_ns.param("cursor", "Keyset cursor, pass an empty value for the first page and nextCursor afterwards (overrides current)", type=str)
     @user_ns.param("current", "Current page", type=int, default=1)
     @user_ns.param("pageSize", "Page size", type=int, default=BaseConfig.PAGE_SIZE)
+    @user_ns.param("totalMode", "How the total is counted: exact, estimate (exact up to COUNT_ESTIMATE_LIMIT rows, extrapolated beyond) or none (total is null, see hasMore)", type=str, default="exact")
     @jwt_token_required
     @admin_required
     def get(self, cls):
         """
-           Get all users
+           Get all users, filtered and sorted
         """
         data = request.args
 
         current = data.get("current", 1, type=int)
         pageSize = data.get("pageSize", BaseConfig.PAGE_SIZE, type=int)
-
-        # get all users
-        users, total = User.get_all_users_paginated(current, pageSize)
+        totalMode = data.get("totalMode", "exact")
+        if totalMode not in TOTAL_MODES:
+            return {"success": False, "code": "TOTAL_MODE_INVALID", "message": f"Invalid total mode, valid modes are {', '.join(TOTAL_MODES)}."}, HTTPStatus.BAD_REQUEST
+        if not 1 <= pageSize <= BaseConfig.MAX_PAGE_SIZE:
+            return {"success": False, "code": "PAGE_SIZE_INVALID", "message": f"Invalid page size, valid sizes are 1 to {BaseConfig.MAX_PAGE_SIZE}."}, HTTPStatus.BAD_REQUEST
+        sortBy = data.get("sortBy", "id")
+        order = data.get("order", "asc")
+        
+        if sortBy not in User.sortable_fields:
+            return {"success": False, "code": "SORT_INVALID", "message": f"Invalid sort field, valid fields are {', '.join(User.sortable_fields)}."}, HTTPStatus.BAD_REQUEST
+        if order not in ["asc", "desc"]:
+            return {"success": False, "code": "ORDER_INVALID", "message": "Invalid order, valid orders are asc, desc."}, HTTPStatus.BAD_REQUEST
+        if data.get("userType") and data.get("userType") not in ["ADMIN", "TEACHER", "STUDENT"]:
+            return {"success": False, "code": "USER_TYPE_INVALID", "message": "Invalid user type, valid user types are ADMIN, TEACHER, STUDENT."}, HTTPStatus.BAD_REQUEST
+        if data.get("accountStatus") and data.get("accountStatus") not in ["ACTIVE", "INACTIVE"]:
+            return {"success": False, "code": "ACCOUNT_STATUS_INVALID", "message": "Invalid account status, valid account statuses are ACTIVE, INACTIVE."}, HTTPStatus.BAD_REQUEST
+        
+        filters = {
+            "user_type": data.get("userType"),
+            "account_status": data.get("accountStatus"),
+            "username": data.get("username"),
+            "email": data.get("email")
+        }
+        try:
+            filters["last_online_from"] = datetime.fromisoformat(data["lastOnlineFrom"]) if data.get("lastOnlineFrom") else None
+            filters["last_online_to"] = datetime.fromisoformat(data["lastOnlineTo"]) if data.get("lastOnlineTo") else None
+        except ValueError:
+            return {"success": False, "code": "DATE_INVALID", "message": "Invalid date, use YYYY-MM-DD HH:MM:SS."}, HTTPStatus.BAD_REQUEST
+        
+        # keyset pagination, every page costs the same
+        if "cursor" in data:
+            try:
+                users, nextCursor = User.get_users_keyset(filters, sortBy, order == "desc", data.get("cursor"), pageSize)
+            except InvalidCursor as e:
+                return {"success": False, "code": "CURSOR_INVALID", "message": str(e)}, HTTPStatus.BAD_REQUEST
+            return {"success": True, "code": "USERS_FOUND", "message": "Users found.", "data": {"users": [user.to_dict() for user in users], "pagination": {"pageSize": pageSize, "nextCursor": nextCursor}}}, HTTPStatus.OK
+        
+        users, total, hasMore = User.get_users_paginated(filters, sortBy, order == "desc", current, pageSize, total_mode=totalMode)
         if not users:
             return {"success": False, "code": "USERS_NOT_FOUND", "message": "Users not found."}, HTTPStatus.NOT_FOUND
         
-        return {"success": True, "code": "USERS_FOUND", "message": "Users found.", "data": {"users": [user.to_dict() for user in users], "pagination": {"total": total, "current": current, "pageSize": pageSize}}}, HTTPStatus.OK
-    
+        return {"success": True, "code": "USERS_FOUND", "message": "Users found.", "data": {"users": [user.to_dict() for user in users], "pagination": {"total": total, "current": current, "pageSize": pageSize, "totalMode": totalMode, "hasMore": hasMore}}}, HTTPStatus.OK
+
+
+@user_ns.route("/principal-cache")
+class PrincipalCacheApi(Resource):
+    @user_ns.response(200, "Principal cache statistics")
+    @user_ns.response(401, "Unauthorized")
+    @jwt_token_required
+    @admin_required
+    def get(self, cls):
+        """
+           Get principal cache statistics
+        """
+        return {"success": True, "code": "PRINCIPAL_CACHE_STATS", "message": "Principal cache statistics.", "data": principal_cache.stats()}, HTTPStatus.OK
+
+
+def parse_roster(content, format):
+    """
+       Parse a CSV (username,email,password header) or JSONL roster into a list of dicts
+    """
+    if format == "jsonl":
+        return [json.loads(line) for line in content.splitlines() if line.strip()]
+    return list(csv.DictReader(io.StringIO(content)))
+
+
+@user_ns.route("s/roster")
+class UserRosterApi(Resource):
+    @user_ns.expect(roster_parser)
+    @user_ns.param("format", "Roster format, csv or jsonl (default: from the file name or content type)", type=str)
+    @user_ns.response(200, "Roster imported, see the per-row results")
+    @user_ns.response(400, "Import failed due to invalid roster")
+    @user_ns.response(401, "Unauthorized")
+    @user_ns.response(413, "Roster too large")
+    @user_ns.response(503, "Server is busy")
+    @jwt_token_required
+    @admin_required
+    @password_hashing_guard
+    def post(self, cls):
+        """
+           Register a class roster in bulk
+        """
+        # the roster is either an uploaded file or the raw request body
+        upload = request.files.get("file")
+        name = (upload.filename or "") if upload else ""
+        
+        format = request.args.get("format")
+        if not format:
+            content_type = request.content_type or ""
+            format = "jsonl" if name.endswith((".jsonl", ".ndjson")) or "ndjson" in content_type or "jsonl" in content_type else "csv"
+        if format not in ["csv", "jsonl"]:
+            return {"success": False, "code": "ROSTER_FORMAT_INVALID", "message": "Invalid roster format, valid formats are csv, jsonl."}, HTTPStatus.BAD_REQUEST
+        
+        try:
+            content = upload.read().decode("utf-8-sig") if upload else request.get_data().decode("utf-8-sig")
+            rows = parse_roster(content, format)
+        except (ValueError, csv.Error) as e:
+            return {"success": False, "code": "ROSTER_INVALID", "message": f"Invalid roster: {e}"}, HTTPStatus.BAD_REQUEST
+        
+        if not rows:
+            return {"success": False, "code": "ROSTER_EMPTY", "message": "Roster is empty."}, HTTPStatus.BAD_REQUEST
+        if len(rows) > BaseConfig.ROSTER_MAX_ROWS:
+            return {"success": False, "code": "ROSTER_TOO_LARGE", "message": f"Roster is too large, at most {BaseConfig.ROSTER_MAX_ROWS} rows."}, HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+        
+        # validate every row first, without touching the database
+        results = []
+        candidates = []
+        seen_emails = set()
+        seen_usernames = set()
+        for index, row in enumerate(rows, start=1):
+            row = row if isinstance(row, dict) else {}
+            username = row.get("username") or ""
+            email = row.get("email") or ""
+            password = row.get("password") or ""
+            if not all(isinstance(value, str) for value in (username, email, password)):
+                results.append({"row": index, "username": str(username), "email": str(email), "code": "FIELD_INVALID", "message": "username, email and password must be strings."})
+                continue
+            username = username.strip()
+            email = email.strip()
+            result = {"row": index, "username": username, "email": email}
+            results.append(result)
+            
+            if not username or not email or not password:
+                result.update(code="FIELD_MISSING", message="username, email and password are required.")
+            elif len(username) > 32 or len(email) > 128:
+                result.update(code="FIELD_TOO_LONG", message="Username or email is too long.")
+            elif not derive_user_type(email, password):
+                result.update(code="EMAIL_INVALID", message="Invalid email. Please use a valid UIC email.")
+            elif check_password_strength(password):
+                result.update(code="PASSWORD_INVALID", message=check_password_strength(password))
+            elif email in seen_emails:
+                result.update(code="EMAIL_DUPLICATED", message="Email appears more than once in the roster.")
+            elif username in seen_usernames:
+                result.update(code="USERNAME_DUPLICATED", message="Username appears more than once in the roster.")
+            else:
+                seen_emails.add(email)
+                seen_usernames.add(username)
+                candidates.append((result, password))
+        
+        # check the remaining rows against existing users in bulk
+        existing_emails = User.get_existing_emails(result["email"] for result, _ in candidates)
+        existing_usernames = User.get_existing_usernames(result["username"] for result, _ in candidates)
+        accepted = []
+        for result, password in candidates:
+            if result["email"] in existing_emails:
+                result.update(code="EMAIL_ALREADY_EXISTS", message="Email already exists.")
+            elif result["username"] in existing_usernames:
+                result.update(code="USERNAME_ALREADY_EXISTS", message="Username already exists.")
+            else:
+                accepted.append((result, password))
+        
+        # hash across the process pool, then insert everything in one transaction
+        hashes = password_hasher.hash_many([password for _, password in accepted])
+        users = []
+        for (result, password), password_hash in zip(accepted, hashes):
+            user_type = derive_user_type(result["email"], password)
+            users.append({"username": result["username"], "email": result["email"], "password": password_hash, "user_type": user_type, "account_status": "ACTIVE"})
+            result.update(code="REGISTRATION_SUCCESSFUL", message="User registered successfully.", user_type=user_type)
+        
+        try:
+            User.bulk_register(users, BaseConfig.ROSTER_INSERT_BATCH_SIZE)
+        except Exception:
+            return {"success": False, "code": "ROSTER_IMPORT_FAILED", "message": "Roster import failed, no user was registered."}, HTTPStatus.INTERNAL_SERVER_ERROR
+        
+        for result in results:
+            result["success"] = result["code"] == "REGISTRATION_SUCCESSFUL"
+        
+        return {"success": True, "code": "ROSTER_IMPORTED", "message": f"{len(users)} of {len(rows)} users registered.", "data": {"total": len(rows), "registered": len(users), "failed": len(rows) - len(users), "results": results}}, HTTPStatus.OK
@@ -0,0 +1,250 @@
+# -*- encoding: utf-8 -*-
+
+import math
+import re
+from http import HTTPStatus
+from flask_restx import abort
+from flask_restx.model import ModelBase
+
+"""
+    Request body validators compiled from the flask-restx models
+
+    restx validates a payload by building a jsonschema Draft4Validator and walking the
+    schema on every call. Each model is compiled here once, at import, into a plain Python
+    function (the fastjsonschema approach: the schema becomes straight-line code), and
+    the models this app's endpoints expect validate with it instead of jsonschema.
+
+    The errors keep the restx format, {"field" or "items.0.field": "message"}.
+    Like the handlers, numeric fields also accept numeric strings (form inputs send "4.5"),
+    and an optional field set to null counts as missing.
+"""
+
+INTEGER_STRING = re.compile(r"-?\d+")
+NUMBER_STRING = re.compile(r"-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?")
+
+# documentation keywords, nothing to validate
+ANNOTATIONS = {"description", "example", "default", "title", "readOnly", "format", "discriminator", "x-mask"}
+
+
+def as_integer(value):
+    """
+        The integer value of an integer field, None when it is not one
+    """
+    if type(value) is int:
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and INTEGER_STRING.fullmatch(value):
+        return int(value)
+    return None
+
+
+def as_number(value):
+    """
+        The numeric value of a number field, None when it is not one
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value if math.isfinite(value) else None
+    if isinstance(value, str) and NUMBER_STRING.fullmatch(value):
+        return float(value)
+    return None
+
+
+class SchemaCompiler():
+    """
+        Generates the source of one function per model definition:
+        `validate_<Model>(value, path, errors)` fills `errors` and returns nothing
+    """
+
+    def __init__(self, definitions):
+        self.definitions = definitions
+        self.lines = []
+        self.constants = {}
+        self.compiled = set()
+        self.pending = []
+        self.counter = 0
+
+    def function_name(self, name):
+        if name not in self.compiled:
+            self.compiled.add(name)
+            self.pending.append(name)
+        return "validate_" + re.sub(r"\W", "_", name)
+
+    def variable(self, prefix):
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def constant(self, value):
+        name = self.variable("constant")
+        self.constants[name] = value
+        return name
+
+    def emit(self, indent, line):
+        self.lines.append("    " * indent + line)
+
+    def compile(self, name):
+        entry = self.function_name(name)
+        while self.pending:
+            definition = self.pending.pop()
+            self.emit(0, f"def {self.function_name(definition)}(value, path, errors):")
+            self.schema(self.definitions[definition].__schema__, "value", "path", 1)
+            self.emit(1, "return errors")
+            self.emit(0, "")
+        namespace = {"as_integer": as_integer, "as_number": as_number, **self.constants}
+        exec(compile("\n".join(self.lines), f"<validator {name}>", "exec"), namespace)
+        return namespace[entry]
+
+    @staticmethod
+    def join(path, key):
+        # "" + "email" -> "email", "messages" + 0 -> "messages.0"
+        return f"({path} + '.' if {path} else '') + {key}"
+
+    def error(self, indent, path, message):
+        self.emit(indent, f"errors[{path}] = {message}")
+
+    def schema(self, schema, value, path, indent):
+        unknown = set(schema) - ANNOTATIONS - {"$ref", "allOf", "type", "properties", "required", "additionalProperties",
+                                               "items", "enum", "minLength", "maxLength", "pattern", "minimum", "maximum",
+                                               "exclusiveMinimum", "exclusiveMaximum", "multipleOf", "minItems", "maxItems"}
+        if unknown:
+            raise ValueError(f"Cannot compile schema keywords {sorted(unknown)}")
+
+        if "$ref" in schema:
+            name = schema["$ref"].rsplit("/", 1)[-1]
+            self.emit(indent, f"{self.function_name(name)}({value}, {path}, errors)")
+        for part in schema.get("allOf", []):
+            self.schema(part, value, path, indent)
+
+        kind = schema.get("type")
+        if kind == "object":
+            self.object(schema, value, path, indent)
+        elif kind == "array":
+            self.array(schema, value, path, indent)
+        elif kind == "string":
+            self.string(schema, value, path, indent)
+        elif kind in ("integer", "number"):
+            self.number(schema, kind, value, path, indent)
+        elif kind == "boolean":
+            self.emit(indent, f"if not isinstance({value}, bool):")
+            self.error(indent + 1, path, f"f\"{{{value}!r}} is not of type 'boolean'\"")
+        elif kind is not None:
+            raise ValueError(f"Cannot compile schema type {kind!r}")
+
+        if "enum" in schema:
+            self.emit(indent, f"if {value} not in {self.constant(list(schema['enum']))}:")
+            self.error(indent + 1, path, f"f\"{{{value}!r}} is not one of \" + {self.constant(repr(schema['enum']))}")
+
+    def object(self, schema, value, path, indent):
+        properties = schema.get("properties", {})
+        required = schema.get("required", [])
+        self.emit(indent, f"if not isinstance({value}, dict):")
+        self.error(indent + 1, path, f"f\"{{{value}!r}} is not of type 'object'\"")
+        self.emit(indent, "else:")
+        self.emit(indent + 1, "pass")
+        for name in required:
+            self.emit(indent + 1, f"if {name!r} not in {value}:")
+            self.error(indent + 2, self.join(path, repr(name)), repr(f"'{name}' is a required property"))
+        for name, field in properties.items():
+            field_value = self.variable("value")
+            self.emit(indent + 1, f"{field_value} = {value}.get({name!r})")
+            if name in required:
+                # a required field set to null fails its type check
+                self.emit(indent + 1, f"if {name!r} in {value}:")
+            else:
+                self.emit(indent + 1, f"if {field_value} is not None:")
+            self.schema(field, field_value, self.join(path, repr(name)), indent + 2)
+        if schema.get("additionalProperties") is False:
+            key = self.variable("key")
+            self.emit(indent + 1, f"for {key} in {value}:")
+            self.emit(indent + 2, f"if {key} not in {self.constant(frozenset(properties))}:")
+            self.error(indent + 3, path, f"f\"Additional properties are not allowed ({{{key}!r}} was unexpected)\"")
+
+    def array(self, schema, value, path, indent):
+        self.emit(indent, f"if not isinstance({value}, list):")
+        self.error(indent + 1, path, f"f\"{{{value}!r}} is not of type 'array'\"")
+        self.emit(indent, "else:")
+        self.emit(indent + 1, "pass")
+        if "minItems" in schema:
+            self.emit(indent + 1, f"if len({value}) < {schema['minItems']}:")
+            self.error(indent + 2, path, f"f\"{{{value}!r}} is too short\"")
+        if "maxItems" in schema:
+            self.emit(indent + 1, f"if len({value}) > {schema['maxItems']}:")
+            self.error(indent + 2, path, f"f\"{{{value}!r}} is too long\"")
+        if "items" in schema:
+            index, item = self.variable("index"), self.variable("item")
+            self.emit(indent + 1, f"for {index}, {item} in enumerate({value}):")
+            self.schema(schema["items"], item, self.join(path, f"str({index})"), indent + 2)
+
+    def string(self, schema, value, path, indent):
+        self.emit(indent, f"if not isinstance({value}, str):")
+        self.error(indent + 1, path, f"f\"{{{value}!r}} is not of type 'string'\"")
+        if "minLength" in schema:
+            self.emit(indent, f"elif len({value}) < {schema['minLength']}:")
+            self.error(indent + 1, path, f"f\"{{{value}!r}} is too short\"")
+        if "maxLength" in schema:
+            self.emit(indent, f"elif len({value}) > {schema['maxLength']}:")
+            self.error(indent + 1, path, f"f\"{{{value}!r}} is too long\"")
+        if "pattern" in schema:
+            pattern = self.constant(re.compile(schema["pattern"]))
+            self.emit(indent, f"elif not {pattern}.search({value}):")
+            self.error(indent + 1, path, f"f\"{{{value}!r}} does not match \" + {self.constant(repr(schema['pattern']))}")
+
+    def number(self, schema, kind, value, path, indent):
+        number = self.variable("number")
+        self.emit(indent, f"{number} = as_{kind}({value})")
+        self.emit(indent, f"if {number} is None:")
+        self.error(indent + 1, path, f"f\"{{{value}!r}} is not of type '{kind}'\"")
+        bounds = [("minimum", "<", "less than the minimum of"), ("maximum", ">", "greater than the maximum of")]
+        for keyword, operator, text in bounds:
+            if keyword not in schema:
+                continue
+            exclusive = schema.get("exclusive" + keyword.capitalize())
+            if exclusive:
+                operator += "="
+                text = text.replace("the", "or equal to the")
+            self.emit(indent, f"elif {number} {operator} {schema[keyword]!r}:")
+            self.error(indent + 1, path, f"f\"{{{value}!r}} is {text} {schema[keyword]!r}\"")
+        if "multipleOf" in schema:
+            self.emit(indent, f"elif {number} % {schema['multipleOf']!r}:")
+            self.error(indent + 1, path, f"f\"{{{value}!r}} is not a multiple of {schema['multipleOf']!r}\"")
+
+
+def compile_model(model, definitions):
+    """
+        Compile `model` into `validator(data) -> errors`, an empty dict when the payload is valid
+    """
+    function = SchemaCompiler(definitions).compile(model.name)
+
+    def validator(data):
+        return function(data, "", {})
+
+    return validator
+
+
+def compile_validators(api):
+    """
+        Compile every model of `api` and make its endpoints validate payloads with the compiled functions.
+        Call it after the namespaces are added: each model an endpoint expects (@expect keeps deep copies)
+        gets its own `validate`, the models of other Api instances keep restx's.
+    """
+    validators = {name: compile_model(model, api.models) for name, model in api.models.items()}
+    for resource, namespace, urls, kwargs in api.resources:
+        for method in resource.methods or ():
+            for expect in getattr(getattr(resource, method.lower(), None), "__apidoc__", {}).get("expect", []):
+                # [model] expects a list of them, restx validates each item
+                model = expect[0] if isinstance(expect, list) and len(expect) == 1 else expect
+                if isinstance(model, ModelBase) and model.name in validators:
+                    bind_validator(model, validators[model.name])
+    return validators
+
+
+def bind_validator(model, validator):
+    """
+        Replace restx's jsonschema validation of this model instance by `validator`
+    """
+    def validate(data, resolver=None, format_checker=None):
+        errors = validator(data)
+        if errors:
+            abort(HTTPStatus.BAD_REQUEST, message="Input payload validation failed", errors=errors)
+
+    model.validate = validate
@@ -0,0 +1,252 @@
+# -*- encoding: utf-8 -*-
+
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+class PrincipalCache():
+    """
+        Process-local LRU cache of authenticated principals, keyed by JWT token.
+        Each entry lives for at most `ttl` seconds and never outlives the token's `exp`.
+        NOTE: the cache is per worker process, invalidation only affects the current process.
+        jwt_token_required checks the auth state of the user (User.get_auth_state) on every hit,
+        so changes made by other processes are seen on the next request.
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # token -> (expires_at, user_id, principal)
+        self._tokens_by_user = {}  # user_id -> set of tokens
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_size = app.config.get('PRINCIPAL_CACHE_SIZE', self.max_size)
+        self.ttl = app.config.get('PRINCIPAL_CACHE_TTL', self.ttl)
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user_id, principal = entry
+            if expires_at <= time.time():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return principal
+
+    def set(self, token, user_id, principal, token_exp=None):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (expires_at, user_id, principal)
+            self._tokens_by_user.setdefault(user_id, set()).add(token)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_token(self, token):
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for token in self._tokens_by_user.pop(user_id, set()):
+                self._entries.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxSize": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0
+            }
+
+    def _remove(self, token):
+        # caller must hold the lock
+        _, user_id, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+
+
+class BloomFilter():
+    """
+        Fixed-size Bloom filter over hex digests.
+        `might_contain` never returns a false negative, so a miss can skip the database.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.num_bits = max(int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.num_bits / self.capacity * math.log(2))), 1)
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, digest):
+        # double hashing, both halves taken from the (already uniform) digest
+        h1 = int(digest[:16], 16)
+        h2 = int(digest[16:32], 16) | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, digest):
+        for position in self._positions(digest):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def might_contain(self, digest):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+
+
+class CourseIndex():
+    """
+        In-memory index of course codes and names, matched case-insensitively like ILIKE '%keyword%'.
+        Every trigram of the lowercase codes and names maps to the ids of the courses containing it, so a
+        keyword intersects the sets of its trigrams and checks the few candidates (shorter keywords scan).
+        Sorted (code, id) and (name word, id) lists answer prefix lookups by bisection.
+    """
+
+    def __init__(self, courses=()):
+        self._courses = {}  # id -> (code, name, category)
+        self._texts = {}  # id -> (lowercase code, lowercase name)
+        self._trigrams = {}  # trigram -> set of ids
+        self._codes = []  # sorted (lowercase code, id)
+        self._words = []  # sorted (lowercase word of the name, id)
+        self._lock = threading.Lock()
+        # built in bulk, sorted once
+        for course_id, code, name, category in courses:
+            self._index(course_id, code, name, category)
+            for sorted_list, key in self._keys_of(course_id):
+                sorted_list.append(key)
+        self._codes.sort()
+        self._words.sort()
+
+    def __len__(self):
+        return len(self._courses)
+
+    def add(self, course_id, code, name, category):
+        with self._lock:
+            self._remove(course_id)
+            self._index(course_id, code, name, category)
+            for sorted_list, key in self._keys_of(course_id):
+                bisect.insort(sorted_list, key)
+
+    def remove(self, course_id):
+        with self._lock:
+            self._remove(course_id)
+
+    def search(self, keyword):
+        """
+            Ids of the courses whose code or name contains `keyword`
+        """
+        keyword = (keyword or "").lower()
+        with self._lock:
+            if not keyword:
+                return set(self._courses)
+            return set(self._containing(keyword))
+
+    def complete(self, prefix, limit=10):
+        """
+            At most `limit` courses as (id, code, name, category): codes starting with `prefix` first (by code),
+            then names with a word starting with it (by word), then codes or names containing it (by code)
+        """
+        prefix = (prefix or "").lower()
+        found = []
+        seen = set()
+
+        def take(course_ids):
+            for course_id in course_ids:
+                if len(found) >= limit:
+                    return
+                if course_id not in seen:
+                    seen.add(course_id)
+                    found.append(course_id)
+
+        with self._lock:
+            for sorted_list in (self._codes, self._words):
+                take(self._prefixed(sorted_list, prefix))
+            if len(found) < limit and prefix:
+                rest = heapq.nsmallest(limit - len(found), ((self._texts[course_id][0], course_id)
+                                                            for course_id in self._containing(prefix) if course_id not in seen))
+                take(course_id for _, course_id in rest)
+            return [(course_id, *self._courses[course_id]) for course_id in found]
+
+    def _containing(self, keyword):
+        if len(keyword) < 3:
+            candidates = self._texts
+        else:
+            postings = sorted((self._trigrams.get(keyword[i:i + 3], set()) for i in range(len(keyword) - 2)), key=len)
+            candidates = postings[0].intersection(*postings[1:])
+        return (course_id for course_id in candidates if keyword in self._texts[course_id][0] or keyword in self._texts[course_id][1])
+
+    @staticmethod
+    def _prefixed(sorted_list, prefix):
+        # ids of the keys starting with `prefix`, lazily, `take` stops reading once it has enough
+        for position in range(bisect.bisect_left(sorted_list, (prefix,)), len(sorted_list)):
+            key, course_id = sorted_list[position]
+            if not key.startswith(prefix):
+                return
+            yield course_id
+
+    def _index(self, course_id, code, name, category):
+        self._courses[course_id] = (code, name, category)
+        self._texts[course_id] = (code.lower(), name.lower())
+        for trigram in self._trigrams_of(course_id):
+            self._trigrams.setdefault(trigram, set()).add(course_id)
+
+    def _trigrams_of(self, course_id):
+        return {text[i:i + 3] for text in self._texts[course_id] for i in range(len(text) - 2)}
+
+    def _keys_of(self, course_id):
+        code, name = self._texts[course_id]
+        yield self._codes, (code, course_id)
+        for word in set(re.findall(r"\w+", name)):
+            yield self._words, (word, course_id)
+
+    def _remove(self, course_id):
+        if course_id not in self._courses:
+            return
+        for trigram in self._trigrams_of(course_id):
+            ids = self._trigrams.get(trigram)
+            if ids is not None:
+                ids.discard(course_id)
+                if not ids:
+                    del self._trigrams[trigram]
+        for sorted_list, key in self._keys_of(course_id):
+            position = bisect.bisect_left(sorted_list, key)
+            if position < len(sorted_list) and sorted_list[position] == key:
+                del sorted_list[position]
+        del self._courses[course_id]
+        del self._texts[course_id]
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,66 @@
+# -*- encoding: utf-8 -*-
+
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional, only gzip is offered without it
+    brotli = None
+
+
+class ResponseCompressor():
+    """
+        Compresses buffered responses with brotli or gzip, whichever the client prefers
+        in Accept-Encoding. Streamed responses (the LLM proxy) are passed through as they are,
+        neither buffered nor compressed, and so are small bodies below COMPRESS_MIN_SIZE.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.min_size = 1024
+        self.gzip_level = 6
+        self.brotli_quality = 4
+        self.mimetypes = set()
+        self.encodings = []
+
+    def init_app(self, app):
+        self.enabled = app.config.get('COMPRESS_ENABLED', self.enabled)
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', self.min_size)
+        self.gzip_level = app.config.get('COMPRESS_GZIP_LEVEL', self.gzip_level)
+        self.brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', self.brotli_quality)
+        self.mimetypes = set(app.config.get('COMPRESS_MIMETYPES', ['application/json']))
+        # server preference when the client accepts both equally
+        self.encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+        if self.enabled:
+            app.after_request(self.compress)
+
+    def compress(self, response):
+        if response.mimetype not in self.mimetypes:
+            return response
+        # the body depends on Accept-Encoding, caches must key on it
+        response.vary.add("Accept-Encoding")
+        if (response.is_streamed or response.direct_passthrough
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or "Content-Encoding" in response.headers):
+            return response
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(body, self.gzip_level, mtime=0)
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        if response.headers.get("ETag"):
+            # the compressed body is a different representation of the same resource
+            response.set_etag(response.get_etag()[0], weak=True)
+        return response
+
+
+response_compressor = ResponseCompressor()
@@ -1,6 +1,7 @@
 # -*- encoding: utf-8 -*-
 
 import os
+import tempfile
 from datetime import timedelta
 
 
@@ -15,7 +16,9 @@ GRANT ALL PRIVILEGES ON `llmhomework`.* TO 'llmhomework'@'%';
 
 class BaseConfig():
 
-    USE_SQLITE = True
+    # sqlite or mysql (MYSQL* settings below), SQLALCHEMY_DATABASE_URI overrides both
+    DATABASE_BACKEND = os.getenv('DATABASE_BACKEND', 'sqlite').lower()
+    USE_SQLITE = DATABASE_BACKEND == 'sqlite'
     BASE_DIR = os.path.dirname(os.path.realpath(__file__))
     FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
 
@@ -31,14 +34,101 @@ class BaseConfig():
         SQLALCHEMY_DATABASE_URI = 'mysql+pymysql://{}:{}@{}:{}/{}?charset={}'.format(
             USERNAME, PASSWORD, HOSTNAME, PORT, DATABASE, CHARSET)
 
+    SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI', SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # engine tuning (core/engine.py), "auto" picks the profile of the URI's backend, "none" keeps SQLAlchemy's defaults
+    DATABASE_ENGINE_PROFILE = os.getenv('DATABASE_ENGINE_PROFILE', 'auto')
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),  # ms
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),  # bytes
+        'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64 * 1024)),  # negative: KiB, 64 MiB
+    }
+    MYSQL_POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', 10))
+    MYSQL_MAX_OVERFLOW = int(os.getenv('MYSQL_MAX_OVERFLOW', 20))
+    MYSQL_POOL_RECYCLE = int(os.getenv('MYSQL_POOL_RECYCLE', 280))  # seconds, below the server's wait_timeout
+    MYSQL_POOL_TIMEOUT = int(os.getenv('MYSQL_POOL_TIMEOUT', 30))
+    MYSQL_POOL_PRE_PING = os.getenv('MYSQL_POOL_PRE_PING', 'true').lower() == 'true'
+
+    # production server (python serve.py), 0 workers serves from one process with threads only.
+    # Several workers each keep their own caches, see "Running several workers" in the README
+    SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
+    SERVER_PORT = int(os.getenv('PORT', 8000))
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', 0))
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', 8))
+    SERVER_BACKLOG = int(os.getenv('SERVER_BACKLOG', 2048))
+    SERVER_CONNECTION_LIMIT = int(os.getenv('SERVER_CONNECTION_LIMIT', 1000))
+    SERVER_KEEPALIVE = int(os.getenv('SERVER_KEEPALIVE', 30))
+    SERVER_GRACEFUL_TIMEOUT = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', 30))
+
+    # reverse proxies in front of the server whose X-Forwarded-For/-Proto headers are trusted (werkzeug ProxyFix),
+    # the client IP rate limits are keyed on comes from them, 0 trusts none
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 0))
+    PROXY_FIX_X_PROTO = int(os.getenv('PROXY_FIX_X_PROTO', 0))
+
+    # schema bootstrap at boot: create the tables of a fresh database, fail on a fingerprint mismatch if strict
+    SCHEMA_AUTO_CREATE = os.getenv('SCHEMA_AUTO_CREATE', 'true').lower() == 'true'
+    SCHEMA_STRICT = os.getenv('SCHEMA_STRICT', 'false').lower() == 'true'
+
+    # Swagger UI and /api/v1/swagger.json, off in production so the spec is never built in a worker.
+    # The spec is served from API_SPEC_FILE when it exists (flask --app app build-spec), else built once per process
+    API_DOCS_ENABLED = os.getenv('API_DOCS_ENABLED', 'true').lower() == 'true'
+    API_SPEC_FILE = os.getenv('API_SPEC_FILE', os.path.join(BASE_DIR, 'static', 'swagger.json'))
+
+    # encoder of the API responses: orjson (when installed) or json (the stdlib module flask-restx uses)
+    JSON_ENCODER = os.getenv('JSON_ENCODER', 'orjson')
+
+    # gzip/brotli (brotli when the package is installed) of buffered JSON responses, streamed ones are never compressed
+    COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 4))
+    COMPRESS_MIMETYPES = ['application/json']
+
+    # structured access log, JSON lines written by a background thread, "-" is stderr
+    ACCESS_LOG_ENABLED = os.getenv('ACCESS_LOG_ENABLED', 'true').lower() == 'true'
+    ACCESS_LOG_FILE = os.getenv('ACCESS_LOG_FILE', '-')
+    ACCESS_LOG_QUEUE_SIZE = int(os.getenv('ACCESS_LOG_QUEUE_SIZE', 10000))  # records beyond it are dropped and counted
+
     PAGE_SIZE = 10
+    MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 100))  # larger pageSize values are answered with 400
+    # totals of list pages (totalMode), cached per query in each worker process
+    COUNT_CACHE_SIZE = int(os.getenv('COUNT_CACHE_SIZE', 4096))
+    COUNT_CACHE_TTL = int(os.getenv('COUNT_CACHE_TTL', 30))
+    COUNT_ESTIMATE_LIMIT = int(os.getenv('COUNT_ESTIMATE_LIMIT', 1000))  # totalMode=estimate is exact up to it
+
+    # in-memory index of course codes and names (course search, autocomplete), rebuilt to pick up other workers' changes
+    COURSE_INDEX_SYNC_INTERVAL = int(os.getenv('COURSE_INDEX_SYNC_INTERVAL', 30))  # seconds
+    COURSE_AUTOCOMPLETE_MAX_LIMIT = 50
+
+    # bulk roster registration
+    ROSTER_MAX_ROWS = int(os.getenv('ROSTER_MAX_ROWS', 5000))
+    ROSTER_INSERT_BATCH_SIZE = int(os.getenv('ROSTER_INSERT_BATCH_SIZE', 500))
 
     ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', 'ADMIN_PASSWORD')
     SECRET_KEY = os.getenv('SECRET_KEY', 'SECRET_KEY')
+    # password hashing, done in a process pool, PASSWORD_HASH_WORKERS=0 hashes inline
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 0))  # 0: 4 per worker
+    PASSWORD_HASH_TIMEOUT = int(os.getenv('PASSWORD_HASH_TIMEOUT', 30))
+
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'JWT_SECRET_KEY')
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=12)
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES_MINUTES', 15)))
+
+    JWT_REFRESH_TOKEN_SECRET_KEY = os.getenv('JWT_REFRESH_TOKEN_SECRET_KEY', 'JWT_REFRESH_TOKEN_SECRET_KEY')
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(hours=12)
+
+    # in-process cache of verified principals (per worker process)
+    PRINCIPAL_CACHE_SIZE = int(os.getenv('PRINCIPAL_CACHE_SIZE', 1024))
+    PRINCIPAL_CACHE_TTL = int(os.getenv('PRINCIPAL_CACHE_TTL', 60))
+
+    # Bloom filter in front of the JWT blocklist table
+    BLOCKLIST_BLOOM_CAPACITY = int(os.getenv('BLOCKLIST_BLOOM_CAPACITY', 100000))
+    BLOCKLIST_BLOOM_ERROR_RATE = float(os.getenv('BLOCKLIST_BLOOM_ERROR_RATE', 0.001))
+    BLOCKLIST_BLOOM_SYNC_INTERVAL = int(os.getenv('BLOCKLIST_BLOOM_SYNC_INTERVAL', 5))
 
     JWT_REGISTRATION_TOKEN_SECRET_KEY = os.getenv('JWT_REGISTRATION_TOKEN_SECRET_KEY', 'JWT_REGISTRATION_TOKEN_SECRET_KEY')
     JWT_REGISTRATION_TOKEN_EXPIRES = timedelta(hours=1)
@@ -50,5 +140,32 @@ class BaseConfig():
     MAIL_USERNAME=os.getenv('MAIL_USERNAME', 'SAMPLE@EMAIL.COM')
     MAIL_PASSWORD=os.getenv('MAIL_PASSWORD', 'SAMPLEPASSWORD')
 
+    # email outbox, delivered by a background thread over one reused SMTP connection (disabled: sent on the request thread)
+    MAIL_OUTBOX_ENABLED = os.getenv('MAIL_OUTBOX_ENABLED', 'true').lower() == 'true'
+    MAIL_OUTBOX_BATCH_SIZE = int(os.getenv('MAIL_OUTBOX_BATCH_SIZE', 50))
+    MAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('MAIL_OUTBOX_MAX_ATTEMPTS', 5))
+    MAIL_OUTBOX_RETRY_BASE = int(os.getenv('MAIL_OUTBOX_RETRY_BASE', 30))
+    MAIL_OUTBOX_POLL_INTERVAL = int(os.getenv('MAIL_OUTBOX_POLL_INTERVAL', 10))
+    MAIL_OUTBOX_IDLE_TIMEOUT = int(os.getenv('MAIL_OUTBOX_IDLE_TIMEOUT', 60))
+    MAIL_OUTBOX_RETENTION_DAYS = int(os.getenv('MAIL_OUTBOX_RETENTION_DAYS', 7))  # sent messages are deleted after it, 0 keeps them
+
+    # token-bucket rate limits per scope, "memory" keeps the buckets per worker process
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_STORAGE = os.getenv('RATE_LIMIT_STORAGE', os.path.join(tempfile.gettempdir(), 'llmhomework-ratelimit.db'))
+    RATE_LIMIT_PURGE_INTERVAL = int(os.getenv('RATE_LIMIT_PURGE_INTERVAL', 3600))  # seconds between drops of buckets idle for a day
+    RATE_LIMITS = {
+        'LOGIN': os.getenv('RATE_LIMIT_LOGIN', 'ip=30/minute, email=10/minute'),
+        'REGISTER': os.getenv('RATE_LIMIT_REGISTER', 'ip=10/minute, email=5/minute'),
+        'EMAIL_VERIFICATION': os.getenv('RATE_LIMIT_EMAIL_VERIFICATION', 'ip=5/minute, email=5/hour'),
+        'VCODE_VERIFICATION': os.getenv('RATE_LIMIT_VCODE_VERIFICATION', 'ip=30/minute'),
+        'TOKEN_REFRESH': os.getenv('RATE_LIMIT_TOKEN_REFRESH', 'ip=60/minute'),
+        'PASSWORD_CHANGE': os.getenv('RATE_LIMIT_PASSWORD_CHANGE', 'user=5/minute'),
+    }
+
+    # last_online write-behind, 0 writes every update through
+    PRESENCE_FLUSH_INTERVAL = int(os.getenv('PRESENCE_FLUSH_INTERVAL', 30))
+    PRESENCE_MAX_PENDING = int(os.getenv('PRESENCE_MAX_PENDING', 10000))
+    PRESENCE_MAX_RETRIES = int(os.getenv('PRESENCE_MAX_RETRIES', 3))  # failed flushes before the pending timestamps are dropped
+
     LLM_API_ENDPOINT = os.getenv('LLM_API_ENDPOINT', 'https://api.openai.com/v1/chat/completions')
     LLM_API_KEY = os.getenv('LLM_API_KEY', 'SAMPLEAPIKEY')
\ No newline at end of file
@@ -0,0 +1,82 @@
+# -*- encoding: utf-8 -*-
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+class EngineProfile():
+    """
+        Engine tuning for one database backend:
+        engine options (pool) given to Flask-SQLAlchemy, and what to set on each new connection
+    """
+
+    def engine_options(self, config):
+        return {}
+
+    def on_connect(self, config, dbapi_connection, connection_record):
+        pass
+
+    def init_app(self, app):
+        """
+            Call before db.init_app(app), the engine options are read when the engine is created
+        """
+        options = self.engine_options(app.config)
+        options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    def configure_engines(self, app, db):
+        """
+            Call after db.init_app(app)
+        """
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, "connect", lambda *args: self.on_connect(app.config, *args))
+
+
+class SQLiteProfile(EngineProfile):
+    """
+        WAL so readers never wait for the writer, a busy timeout instead of "database is locked",
+        synchronous=NORMAL (durable with WAL up to the last checkpoint), larger page cache and mmap reads
+    """
+
+    def on_connect(self, config, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in config['SQLITE_PRAGMAS'].items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+
+class MySQLProfile(EngineProfile):
+    """
+        A sized pool, connections recycled before the server's wait_timeout closes them,
+        and checked with a ping when taken from the pool
+    """
+
+    def engine_options(self, config):
+        return {
+            "pool_size": config['MYSQL_POOL_SIZE'],
+            "max_overflow": config['MYSQL_MAX_OVERFLOW'],
+            "pool_recycle": config['MYSQL_POOL_RECYCLE'],
+            "pool_timeout": config['MYSQL_POOL_TIMEOUT'],
+            "pool_pre_ping": config['MYSQL_POOL_PRE_PING'],
+        }
+
+
+ENGINE_PROFILES = {
+    "none": EngineProfile,
+    "sqlite": SQLiteProfile,
+    "mysql": MySQLProfile,
+}
+
+
+def select_engine_profile(config):
+    """
+        DATABASE_ENGINE_PROFILE, or with "auto" the profile of the database URI's backend
+    """
+    name = config.get('DATABASE_ENGINE_PROFILE', 'auto')
+    if name == "auto":
+        # other backends keep SQLAlchemy's defaults
+        return ENGINE_PROFILES.get(make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name(), EngineProfile)()
+    if name not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DATABASE_ENGINE_PROFILE {name!r}, expected auto or one of {', '.join(ENGINE_PROFILES)}")
+    return ENGINE_PROFILES[name]()
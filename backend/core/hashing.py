@@ -0,0 +1,123 @@
+# -*- encoding: utf-8 -*-
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+
+def full_method(method):
+    """
+        The method as werkzeug writes it in the hash, with its default parameters filled in:
+        "scrypt" -> "scrypt:32768:8:1", "pbkdf2:sha256" -> "pbkdf2:sha256:600000"
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        args = [2**15, 8, 1]
+    elif name == 'pbkdf2':
+        args = args + ['sha256', DEFAULT_PBKDF2_ITERATIONS][len(args):]
+    return ':'.join([name, *map(str, args)])
+
+
+class PasswordHasherBusy(Exception):
+    """
+        Raised when too many hash jobs are already queued, or a job did not finish in time, answered with 503
+    """
+
+
+class PasswordHasher():
+    """
+        Runs password hashing and verification in a bounded process pool,
+        so bursts of logins and registrations do not pin the request threads on KDF CPU.
+        With `workers=0` the work is done inline (development, CLI).
+    """
+
+    def __init__(self, method='scrypt:32768:8:1', workers=0, max_pending=None, timeout=30):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = None
+        self._executor_pid = None
+        self._slots = None
+        self._slot_count = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', self.method)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', self.workers)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', self.max_pending)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', self.timeout)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords):
+        """
+            Hash a batch of passwords (bulk imports) through the same queue limit as `hash`, in chunks of at most
+            half of the slots, so logins and registrations keep the other half while a roster is hashed.
+            Waits for free slots, raises PasswordHasherBusy when a slot or a hash takes longer than `timeout`.
+        """
+        if not self.workers:
+            return [generate_password_hash(password, self.method) for password in passwords]
+        self._get_executor()
+        chunk_size = max(1, self._slot_count // 2)
+        hashes = []
+        for start in range(0, len(passwords), chunk_size):
+            futures = []
+            try:
+                for password in passwords[start:start + chunk_size]:
+                    futures.append(self._submit(True, generate_password_hash, password, self.method))
+                hashes.extend(future.result(timeout=self.timeout) for future in futures)
+            except (PasswordHasherBusy, FutureTimeoutError):
+                for future in futures:
+                    future.cancel()
+                raise PasswordHasherBusy()
+        return hashes
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        # werkzeug hashes look like "<method>$<salt>$<hash>", compare with the defaults filled in on both sides
+        return full_method(pwhash.split('$', 1)[0]) != full_method(self.method)
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        future = self._submit(False, func, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # a job still queued is dropped, a running one finishes in the pool and is discarded
+            future.cancel()
+            raise PasswordHasherBusy()
+
+    def _submit(self, wait, func, *args):
+        # takes a queue slot (waiting at most `timeout` for one if `wait`), held until the job leaves the pool,
+        # not until the caller stops waiting
+        executor = self._get_executor()
+        if not self._slots.acquire(blocking=wait, timeout=self.timeout if wait else None):
+            raise PasswordHasherBusy()
+        try:
+            future = executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _get_executor(self):
+        # created lazily, and once per process so it survives a prefork server
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._slot_count = self.max_pending or self.workers * 4
+                    self._slots = threading.BoundedSemaphore(self._slot_count)
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+
+password_hasher = PasswordHasher()
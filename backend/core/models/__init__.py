@@ -5,6 +5,7 @@ from flask_sqlalchemy import SQLAlchemy
 db = SQLAlchemy()
 
 from .course import Course
+from .email_outbox import EmailOutbox
 from .help_topic import HelpTopic
 from .jwt_token_blocklist import JWTTokenBlocklist
 from .answer import Answer
@@ -14,4 +15,5 @@ from .request import Request
 from .request_add_course import RequestAddCourse
 from .request_add_experiment import RequestAddExperiment
 from .request_update_score import RequestUpdateScore
+from .schema_fingerprint import SchemaFingerprint
 from .user import User
\ No newline at end of file
@@ -2,6 +2,7 @@
 
 from . import db
 from .base import Base
+from ..pagination import keyset_page, paginate
 
 class Answer(Base):
 
@@ -14,6 +15,11 @@ class Answer(Base):
     score = db.Column(db.Float())
     score_update_count = db.Column(db.Integer, default=1)
 
+    # answers of a question, in id order
+    __table_args__ = (
+        db.Index('ix_answer_question_id', 'question_id', 'id'),
+    )
+
     def __init__(self, question_id, llm_name, answer_text, comment, score):
         super(Answer, self).__init__()
         self.question_id = question_id
@@ -43,9 +49,16 @@ class Answer(Base):
         return cls.query.filter_by(question_id=question_id).all()
     
     @classmethod
-    def get_answers_by_question_id_paginated(cls, question_id, page, per_page):
-        result = cls.query.filter_by(question_id=question_id).paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
+    def get_answers_by_question_id_paginated(cls, question_id, page, per_page, total_mode='exact'):
+        return paginate(cls.query.filter_by(question_id=question_id), page, per_page, total_mode)
+    
+    @classmethod
+    def get_answers_by_question_id_keyset(cls, question_id, cursor=None, per_page=10):
+        """
+            Keyset page in id order: answers after `cursor`, returns (answers, next cursor or None)
+            Raises InvalidCursor for an invalid cursor
+        """
+        return keyset_page(cls.query.filter_by(question_id=question_id), [cls.id], cursor, False, per_page)
     
     @classmethod
     def get_question_id_by_answer_id(cls, answer_id):
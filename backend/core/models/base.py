@@ -2,6 +2,7 @@
 
 from datetime import datetime
 from . import db
+from ..pagination import total_counter
 
 class Base(db.Model):
     __abstract__ = True
@@ -17,10 +18,12 @@ class Base(db.Model):
     def save(self):
         db.session.add(self)
         db.session.commit()
+        total_counter.invalidate(table.name for table in self.__mapper__.tables)
 
     def delete(self):
         db.session.delete(self)
         db.session.commit()
+        total_counter.invalidate(table.name for table in self.__mapper__.tables)
 
     def to_dict(self):
         return {column.name: str(getattr(self, column.name)) for column in self.__table__.columns}
\ No newline at end of file
@@ -1,7 +1,11 @@
 # -*- encoding: utf-8 -*-
 
+import threading
+import time
 from . import db
 from .base import Base
+from ..cache import CourseIndex
+from ..pagination import keyset_page, paginate
 
 class Course(Base):
 
@@ -11,6 +15,16 @@ class Course(Base):
     course_name = db.Column(db.String(255), nullable=False)
     course_category = db.Column(db.String(255), nullable=False)
 
+    # questions by course category start from the courses of the category
+    __table_args__ = (
+        db.Index('ix_course_category_id', 'course_category', 'id'),
+    )
+
+    index_sync_interval = 30
+    _index = None
+    _index_synced_at = 0.0
+    _index_rebuild_lock = threading.Lock()
+
     def __init__(self, course_code, course_name, course_category):
         super(Course, self).__init__()
         self.course_code = course_code
@@ -25,6 +39,43 @@ class Course(Base):
             "course_category": self.course_category
         }
 
+    @classmethod
+    def init_app(cls, app):
+        cls.index_sync_interval = app.config.get('COURSE_INDEX_SYNC_INTERVAL', cls.index_sync_interval)
+
+    @classmethod
+    def rebuild_index(cls):
+        cls._index = CourseIndex(db.session.query(cls.id, cls.course_code, cls.course_name, cls.course_category).all())
+        cls._index_synced_at = time.monotonic()
+
+    @classmethod
+    def course_index(cls):
+        # other worker processes change courses too, rebuilt from the table every `index_sync_interval` seconds
+        # by one thread, the others keep reading the previous index meanwhile
+        if cls._index is None:
+            cls.rebuild_index()
+        elif time.monotonic() - cls._index_synced_at >= cls.index_sync_interval and cls._index_rebuild_lock.acquire(blocking=False):
+            try:
+                cls.rebuild_index()
+            finally:
+                cls._index_rebuild_lock.release()
+        return cls._index
+
+    @classmethod
+    def search_course_ids(cls, keyword):
+        """
+            Sorted ids of the courses whose name or code contains `keyword` (case-insensitive), from the in-memory index
+        """
+        return sorted(cls.course_index().search(keyword))
+
+    @classmethod
+    def autocomplete(cls, prefix, limit=10):
+        """
+            Course suggestions for a search box, answered from the in-memory index without a query, see CourseIndex.complete
+        """
+        return [{"id": course_id, "course_code": course_code, "course_name": course_name, "course_category": course_category}
+                for course_id, course_code, course_name, course_category in cls.course_index().complete(prefix, limit)]
+
     @classmethod
     def get_course_by_id(cls, course_id):
         return cls.query.filter_by(id=course_id).first()
@@ -45,21 +96,30 @@ class Course(Base):
     
     @classmethod
     def get_courses_by_name_or_code(cls, keyword):
-        return cls.query.filter(cls.course_name.ilike(f"%{keyword}%") | cls.course_code.ilike(f"%{keyword}%")).all()
+        return cls.query.filter(cls.id.in_(cls.search_course_ids(keyword))).all()
 
     @classmethod
-    def get_courses_by_name_or_code_paginated(cls, course_name_or_code, page, per_page):
-        result = cls.query.filter(cls.course_name.ilike(f"%{course_name_or_code}%") | cls.course_code.ilike(f"%{course_name_or_code}%")).paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
+    def get_courses_by_name_or_code_paginated(cls, course_name_or_code, page, per_page, total_mode='exact'):
+        return paginate(cls.query.filter(cls.id.in_(cls.search_course_ids(course_name_or_code))), page, per_page, total_mode)
     
     @classmethod
     def get_all_courses(cls):
         return cls.query.all()
     
     @classmethod
-    def get_all_courses_paginated(cls, page, per_page):
-        result = cls.query.paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
+    def get_all_courses_paginated(cls, page, per_page, total_mode='exact'):
+        return paginate(cls.query, page, per_page, total_mode)
+    
+    @classmethod
+    def get_courses_keyset(cls, keyword=None, cursor=None, per_page=10):
+        """
+            Keyset page in id order: courses (whose name or code contains `keyword`) after `cursor`, returns (courses, next cursor or None)
+            Raises InvalidCursor for an invalid cursor
+        """
+        query = cls.query
+        if keyword:
+            query = query.filter(cls.id.in_(cls.search_course_ids(keyword)))
+        return keyset_page(query, [cls.id], cursor, False, per_page)
     
     @classmethod
     def get_courses_by_ids(cls, ids):
@@ -69,6 +129,7 @@ class Course(Base):
     def add_course(cls, course_code, course_name, course_category):
         course = cls(course_code, course_name, course_category)
         cls.save(course)
+        cls.course_index().add(course.id, course.course_code, course.course_name, course.course_category)
         return course
 
     @classmethod
@@ -76,6 +137,7 @@ class Course(Base):
         course = cls.query.filter_by(id=course_id).first()
         if course:
             cls.delete(course)
+            cls.course_index().remove(course_id)
             return True
         return False
     
@@ -87,6 +149,7 @@ class Course(Base):
             course.course_name = course_name
             course.course_category = course_category
             cls.save(course)
+            cls.course_index().add(course.id, course.course_code, course.course_name, course.course_category)
             return course.to_dict()
         return None
     
@@ -0,0 +1,90 @@
+# -*- encoding: utf-8 -*-
+
+from datetime import datetime, timedelta
+from . import db
+from .base import Base
+
+outbox_status_enum = db.Enum('PENDING', 'SENDING', 'SENT', 'FAILED', name='outbox_status_enum')
+
+class EmailOutbox(Base):
+
+    __tablename__ = 'email_outbox'
+
+    subject = db.Column(db.String(255), nullable=False)
+    sender = db.Column(db.String(255), nullable=False)
+    recipients = db.Column(db.Text(), nullable=False)  # comma separated
+    html = db.Column(db.Text())
+    status = db.Column(outbox_status_enum, nullable=False, default='PENDING')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # when PENDING: earliest time to (re)try, when SENDING: end of the claim lease
+    next_attempt_at = db.Column(db.DateTime(), nullable=False)
+    last_error = db.Column(db.Text())
+    created_at = db.Column(db.DateTime(), nullable=False)
+    sent_at = db.Column(db.DateTime())
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def __init__(self, subject, sender, recipients, html):
+        super(EmailOutbox, self).__init__()
+        self.subject = subject
+        self.sender = sender
+        self.recipients = ",".join(recipients)
+        self.html = html
+        self.status = 'PENDING'
+        self.attempts = 0
+        self.created_at = datetime.now()
+        self.next_attempt_at = self.created_at
+
+    def get_recipients(self):
+        return self.recipients.split(",")
+
+    def mark_sent(self):
+        self.status = 'SENT'
+        self.sent_at = datetime.now()
+        self.last_error = None
+
+    def mark_failed(self, error, max_attempts, retry_base):
+        # exponential backoff, gives up after max_attempts
+        self.attempts += 1
+        self.last_error = str(error)
+        if self.attempts >= max_attempts:
+            self.status = 'FAILED'
+        else:
+            self.status = 'PENDING'
+            self.next_attempt_at = datetime.now() + timedelta(seconds=retry_base * 2 ** (self.attempts - 1))
+
+    @classmethod
+    def enqueue(cls, subject, sender, recipients, html):
+        message = cls(subject, sender, recipients, html)
+        cls.save(message)
+        return message
+
+    @classmethod
+    def claim_due(cls, limit, lease):
+        """
+            Claim up to `limit` due messages for this sender, safe with several worker processes.
+            A claim that is not completed within `lease` seconds (crashed sender) becomes due again.
+        """
+        now = datetime.now()
+        candidates = cls.query.filter(cls.status.in_(['PENDING', 'SENDING']), cls.next_attempt_at <= now).order_by(cls.id).limit(limit).all()
+        claimed_ids = []
+        for message in candidates:
+            updated = cls.query.filter_by(id=message.id, status=message.status, next_attempt_at=message.next_attempt_at).update(
+                {"status": 'SENDING', "next_attempt_at": now + timedelta(seconds=lease)}, synchronize_session=False)
+            if updated:
+                claimed_ids.append(message.id)
+        db.session.commit()
+        if not claimed_ids:
+            return []
+        return cls.query.filter(cls.id.in_(claimed_ids)).order_by(cls.id).all()
+
+    @classmethod
+    def purge_sent(cls, before):
+        """
+            Delete the messages sent before `before`, returns the number of deleted rows
+        """
+        deleted = cls.query.filter(cls.status == 'SENT', cls.sent_at < before).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
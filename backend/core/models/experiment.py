@@ -2,6 +2,7 @@
 
 from . import db
 from .base import Base
+from ..pagination import keyset_page, paginate
 
 class Experiment(Base):
 
@@ -12,6 +13,13 @@ class Experiment(Base):
     experiment_text = db.Column(db.Text())
     is_answer = db.Column(db.Boolean, default=False)
 
+    # a user's experiments, optionally for one question, and the experiments of a question, in id order
+    __table_args__ = (
+        db.Index('ix_experiment_user_id', 'user_id', 'id'),
+        db.Index('ix_experiment_user_question_id', 'user_id', 'question_id', 'id'),
+        db.Index('ix_experiment_question_id', 'question_id', 'id'),
+    )
+
     def __init__(self, user_id, question_id, experiment_text, is_answer):
         super(Experiment, self).__init__()
         self.user_id = user_id
@@ -37,28 +45,35 @@ class Experiment(Base):
         return cls.query.filter_by(user_id=user_id).all()
     
     @classmethod
-    def get_experiments_by_user_id_paginated(cls, user_id, page, per_page):
-        result = cls.query.filter_by(user_id=user_id).paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
+    def get_experiments_by_user_id_paginated(cls, user_id, page, per_page, total_mode='exact'):
+        return paginate(cls.query.filter_by(user_id=user_id), page, per_page, total_mode)
     
     @classmethod
     def get_experiments_by_question_id(cls, question_id):
         return cls.query.filter_by(question_id=question_id).all()
     
     @classmethod
-    def get_experiments_by_question_id_paginated(cls, question_id, page, per_page):
-        result = cls.query.filter_by(question_id=question_id).paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
+    def get_experiments_by_question_id_paginated(cls, question_id, page, per_page, total_mode='exact'):
+        return paginate(cls.query.filter_by(question_id=question_id), page, per_page, total_mode)
+    
+    @classmethod
+    def get_user_experiments_by_question_id_paginated(cls, user_id, question_id, page, per_page, total_mode='exact'):
+        return paginate(cls.query.filter_by(user_id=user_id, question_id=question_id), page, per_page, total_mode)
     
     @classmethod
-    def get_user_experiments_by_question_id_paginated(cls, user_id, question_id, page, per_page):
-        result = cls.query.filter_by(user_id=user_id, question_id=question_id).paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
+    def get_user_experiments_paginated(cls, user_id, page, per_page, total_mode='exact'):
+        return paginate(cls.query.filter_by(user_id=user_id), page, per_page, total_mode)
     
     @classmethod
-    def get_user_experiments_paginated(cls, user_id, page, per_page):
-        result = cls.query.filter_by(user_id=user_id).paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
+    def get_user_experiments_keyset(cls, user_id, question_id=None, cursor=None, per_page=10):
+        """
+            Keyset page in id order: the user's experiments (for one question) after `cursor`, returns (experiments, next cursor or None)
+            Raises InvalidCursor for an invalid cursor
+        """
+        query = cls.query.filter_by(user_id=user_id)
+        if question_id is not None:
+            query = query.filter_by(question_id=question_id)
+        return keyset_page(query, [cls.id], cursor, False, per_page)
     
     @classmethod
     def add_experiment(cls, user_id, question_id, experiment_text, is_answer):
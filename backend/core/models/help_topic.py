@@ -2,6 +2,8 @@
 
 from . import db
 from .base import Base
+from ..pagination import keyset_page, paginate
+from ..search import help_topic_search
 
 # Enum for topic type, including 'NORMAL' and 'QNA' for question and answer type topics
 help_topic_enum = db.Enum('NORMAL', 'QNA', name='help_topic_enum')
@@ -17,6 +19,10 @@ class HelpTopic(Base):
     llm_answer = db.Column(db.Text())  # LLM's answer to the topic help question
     human_score = db.Column(db.Float())  # Human-evaluated score on the helpfulness of the LLM's answer
 
+    __table_args__ = (
+        db.Index('ix_help_topic_course_id', 'course_id', 'id'),  # Topics of a course, in id order
+    )
+
     def __init__(self, topic_title, topic_content, topic_type, course_id, llm_name=None, llm_answer=None, human_score=None):
         super(HelpTopic, self).__init__()
         self.topic_title = topic_title
@@ -43,19 +49,28 @@ class HelpTopic(Base):
         return cls.query.filter_by(course_id=course_id).all()
     
     @classmethod
-    def get_all_topics_paginated(cls, page, per_page):
-        result = cls.query.paginate(page=page, per_page=per_page)
-        return result.items, result.total
+    def get_all_topics_paginated(cls, page, per_page, total_mode='exact'):
+        return paginate(cls.query, page, per_page, total_mode)
+    
+    @classmethod
+    def get_topics_by_course_id_paginated(cls, course_id, page, per_page, total_mode='exact'):
+        return paginate(cls.query.filter_by(course_id=course_id), page, per_page, total_mode)
     
     @classmethod
-    def get_topics_by_course_id_paginated(cls, course_id, page, per_page):
-        result = cls.query.filter_by(course_id=course_id).paginate(page=page, per_page=per_page)
-        return result.items, result.total
+    def search_topics_paginated(cls, keyword, page, per_page, total_mode='exact'):
+        """
+            Full-text search of the titles, contents and LLM answers, best matches first, returns ([(topic, snippet)], total, has_more)
+        """
+        return paginate(help_topic_search.search(cls, cls.query, keyword), page, per_page, total_mode)
     
     @classmethod
-    def get_topics_by_keyword_paginated(cls, keyword, page, per_page):
-        result = cls.query.filter(cls.topic_title.ilike(f'%{keyword}%')).paginate(page=page, per_page=per_page)
-        return result.items, result.total
+    def get_topics_keyset(cls, keyword=None, cursor=None, per_page=10):
+        """
+            Keyset page in id order: topics (matching `keyword`, see search_topics_paginated) after `cursor`, returns (topics, next cursor or None)
+            Raises InvalidCursor for an invalid cursor
+        """
+        query = cls.query.filter(help_topic_search.match(cls, keyword)) if keyword else cls.query
+        return keyset_page(query, [cls.id], cursor, False, per_page)
     
     @classmethod
     def add_topic(cls, topic_title, topic_content, topic_type, course_id, llm_name=None, llm_answer=None, human_score=None):
@@ -1,21 +1,122 @@
 # -*- encoding: utf-8 -*-
 
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
 from . import db
 from .base import Base
+from ..cache import BloomFilter
 
 token_type_enum = db.Enum('token', 'vCode', name='token_type_enum')
 
+
+def token_digest(token):
+    # fixed-width digest, the raw token is never stored
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def utc_now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def exp_to_datetime(exp):
+    # JWT `exp` (seconds since epoch) -> naive UTC datetime
+    return datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)
+
+
 class JWTTokenBlocklist(Base):
 
-    __tablename__ = 'jwt_token_blocklist'
+    __tablename__ = 'jwt_token_digest_blocklist'
 
-    jwt_token = db.Column(db.Text(), unique=True, nullable=False)
+    token_digest = db.Column(db.String(64), unique=True, nullable=False)
     token_type = db.Column(token_type_enum, nullable=False)
+    expires_at = db.Column(db.DateTime(), nullable=False)
+
+    __table_args__ = (
+        # covering index for is_token_blocklisted
+        db.Index('ix_jwt_token_digest_blocklist_digest_expires', 'token_digest', 'expires_at'),
+        db.Index('ix_jwt_token_digest_blocklist_expires', 'expires_at'),
+    )
 
-    def __init__(self, jwt_token, token_type):
-        self.jwt_token = jwt_token
+    # in-memory Bloom filter in front of the table, synced incrementally by id (ids only grow, see purge_expired)
+    bloom_capacity = 100000
+    bloom_error_rate = 0.001
+    bloom_sync_interval = 5
+    _bloom = None
+    _bloom_last_id = 0
+    _bloom_synced_at = 0.0
+    _bloom_lock = threading.Lock()
+
+    def __init__(self, jwt_token, token_type, expires_at):
+        self.token_digest = token_digest(jwt_token)
         self.token_type = token_type
+        self.expires_at = expires_at
+
+    @classmethod
+    def init_app(cls, app):
+        cls.bloom_capacity = app.config.get('BLOCKLIST_BLOOM_CAPACITY', cls.bloom_capacity)
+        cls.bloom_error_rate = app.config.get('BLOCKLIST_BLOOM_ERROR_RATE', cls.bloom_error_rate)
+        cls.bloom_sync_interval = app.config.get('BLOCKLIST_BLOOM_SYNC_INTERVAL', cls.bloom_sync_interval)
+
+    @classmethod
+    def block_token(cls, token, token_type, exp):
+        jwt_block = cls(token, token_type, exp_to_datetime(exp))
+        jwt_block.save()
+        with cls._bloom_lock:
+            if cls._bloom is not None:
+                cls._bloom.add(jwt_block.token_digest)
+        return jwt_block
+
+    @classmethod
+    def is_token_blocklisted(cls, token, sync=False):
+        """
+            sync: pick up the entries other worker processes added since the last sync first,
+            for checks that must not be stale by up to `bloom_sync_interval` (using up a vCode)
+        """
+        digest = token_digest(token)
+        cls._sync_bloom(force=sync)
+        if not cls._bloom.might_contain(digest):
+            return False
+        return db.session.query(db.exists().where(cls.token_digest == digest, cls.expires_at > utc_now())).scalar()
+
+    @classmethod
+    def purge_expired(cls):
+        """
+            Delete entries whose tokens have already expired, returns the number of deleted rows
+        """
+        # the newest entry is kept even when expired, so ids never go back to or below the sync watermark
+        # of a worker's filter (SQLite hands out max(id) + 1, MySQL restarts AUTO_INCREMENT at max(id) + 1)
+        newest = db.session.query(db.func.max(cls.id)).scalar()
+        deleted = cls.query.filter(cls.expires_at <= utc_now(), cls.id != newest).delete(synchronize_session=False)
+        db.session.commit()
+        cls.rebuild_bloom()
+        return deleted
+
+    @classmethod
+    def rebuild_bloom(cls):
+        rows = db.session.query(cls.id, cls.token_digest).filter(cls.expires_at > utc_now()).all()
+        bloom = BloomFilter(max(cls.bloom_capacity, 2 * len(rows)), cls.bloom_error_rate)
+        for _, digest in rows:
+            bloom.add(digest)
+        with cls._bloom_lock:
+            cls._bloom = bloom
+            cls._bloom_last_id = max((row_id for row_id, _ in rows), default=cls._bloom_last_id)
+            cls._bloom_synced_at = time.monotonic()
 
     @classmethod
-    def is_token_blocklisted(cls, token):
-        return db.session.query(db.exists().where(cls.jwt_token == token)).scalar()
\ No newline at end of file
+    def _sync_bloom(cls, force=False):
+        # other worker processes add entries too, pick them up every `bloom_sync_interval` seconds
+        if cls._bloom is None:
+            cls.rebuild_bloom()
+            return
+        if not force and time.monotonic() - cls._bloom_synced_at < cls.bloom_sync_interval:
+            return
+        rows = db.session.query(cls.id, cls.token_digest).filter(cls.id > cls._bloom_last_id).all()
+        with cls._bloom_lock:
+            for row_id, digest in rows:
+                cls._bloom.add(digest)
+                cls._bloom_last_id = max(cls._bloom_last_id, row_id)
+            cls._bloom_synced_at = time.monotonic()
+        if cls._bloom.count > 2 * cls._bloom.capacity:
+            cls.rebuild_bloom()
@@ -3,6 +3,8 @@
 from . import db
 from .base import Base
 from .course import Course
+from ..pagination import keyset_page, paginate
+from ..search import question_search
 
 question_category_enum = db.Enum('MATH', 'PROG', 'WRITING', name='question_category_enum')
 
@@ -15,6 +17,12 @@ class Question(Base):
     question_score = db.Column(db.Float())
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'))
 
+    # questions of a course (joined from the course filters) and by score, in id order
+    __table_args__ = (
+        db.Index('ix_question_course_id', 'course_id', 'id'),
+        db.Index('ix_question_score_id', 'question_score', 'id'),
+    )
+
     def __init__(self, question_text, question_category, question_score, course_id):
         super(Question, self).__init__()
         self.question_text = question_text
@@ -54,32 +62,56 @@ class Question(Base):
         return cls.query.filter_by(id=question_id).first()
     
     @classmethod
-    def get_questions_by_course_name_or_code_paginated(cls, course_name_or_code, page, per_page):
-        result = cls.query.join(Course).filter(
-            Course.course_code.ilike(f"%{course_name_or_code}%") |
-            Course.course_name.ilike(f"%{course_name_or_code}%")
-        ).paginate(page=page, per_page=per_page)
-        return result.items, result.total
+    def get_questions_by_course_name_or_code_paginated(cls, course_name_or_code, page, per_page, total_mode='exact'):
+        return paginate(cls.query.filter(cls.course_id.in_(Course.search_course_ids(course_name_or_code))), page, per_page, total_mode)
+    
+    @classmethod
+    def get_questions_by_course_category_paginated(cls, course_category, page, per_page, total_mode='exact'):
+        return paginate(cls.query.join(Course).filter(Course.course_category==course_category), page, per_page, total_mode)
+    
+    @classmethod
+    def get_questions_by_score_paginated(cls, question_score, page, per_page, total_mode='exact'):
+        return paginate(cls.query.filter_by(question_score=question_score), page, per_page, total_mode)
+    
+    @classmethod
+    def search_questions_paginated(cls, keyword, page, per_page, total_mode='exact', filters=None):
+        """
+            Full-text search of the question texts, best matches first, returns ([(question, snippet)], total, has_more)
+            filters: only search the questions matching them (see filter_questions, without the keyword)
+        """
+        return paginate(question_search.search(cls, cls.filter_questions(**(filters or {})), keyword), page, per_page, total_mode)
     
     @classmethod
-    def get_questions_by_course_category_paginated(cls, course_category, page, per_page):
-        result = cls.query.join(Course).filter(Course.course_category==course_category).paginate(page=page, per_page=per_page)
-        return result.items, result.total
+    def get_all_questions_paginated(cls, page, per_page, total_mode='exact'):
+        return paginate(cls.query, page, per_page, total_mode)
     
     @classmethod
-    def get_questions_by_score_paginated(cls, question_score, page, per_page):
-        result = cls.query.filter_by(question_score=question_score).paginate(page=page, per_page=per_page)
-        return result.items, result.total
+    def filter_questions(cls, course_name_or_code=None, course_category=None, question_score=None, keyword=None):
+        query = cls.query
+        if course_name_or_code:
+            query = query.filter(cls.course_id.in_(Course.search_course_ids(course_name_or_code)))
+        if course_category:
+            query = query.join(Course).filter(Course.course_category == course_category)
+        if question_score:
+            query = query.filter(cls.question_score == question_score)
+        if keyword:
+            query = query.filter(question_search.match(cls, keyword))
+        return query
     
     @classmethod
-    def get_questions_by_keyword_paginated(cls, keyword, page, per_page):
-        result = cls.query.filter(cls.question_text.ilike(f"%{keyword}%")).paginate(page=page, per_page=per_page)
-        return result.items, result.total
+    def get_questions_paginated(cls, filters, page, per_page, total_mode='exact'):
+        """
+            OFFSET page in id order of the questions matching `filters` (see filter_questions), the same filters as get_questions_keyset
+        """
+        return paginate(cls.filter_questions(**filters).order_by(cls.id), page, per_page, total_mode)
     
     @classmethod
-    def get_all_questions_paginated(cls, page, per_page):
-        result = cls.query.paginate(page=page, per_page=per_page)
-        return result.items, result.total
+    def get_questions_keyset(cls, filters, cursor=None, per_page=10):
+        """
+            Keyset page in id order: questions matching `filters` (see filter_questions) after `cursor`, returns (questions, next cursor or None)
+            Raises InvalidCursor for an invalid cursor
+        """
+        return keyset_page(cls.filter_questions(**filters), [cls.id], cursor, False, per_page)
     
     @classmethod
     def add_question(cls, question_text, question_category, question_score, course_id):
@@ -1,5 +1,6 @@
 from . import db
 from .base import Base
+from ..pagination import keyset_page, paginate
 
 request_status_enum = db.Enum('PENDING', 'APPROVED', 'REJECTED', 'REVOKED', name='request_status_enum', default='PENDING')
 request_type_enum = db.Enum('ADD_COURSE', 'UPDATE_SCORE', 'ADD_EXPERIMENT', name='request_type_enum', default=None)
@@ -13,6 +14,14 @@ class Request(Base):
     request_status = db.Column(request_status_enum, nullable=False)
     request_explanation = db.Column(db.Text())
 
+    # a user's requests filtered by type and/or status, and the admin queues by type and/or status, newest first.
+    # A user's requests without a type are few enough to sort after the user_id range
+    __table_args__ = (
+        db.Index('ix_request_user_type_status_id', 'user_id', 'request_type', 'request_status', 'id'),
+        db.Index('ix_request_type_status_id', 'request_type', 'request_status', 'id'),
+        db.Index('ix_request_status_id', 'request_status', 'id'),
+    )
+
     __mapper_args__ = {
         'polymorphic_identity': 'request',
         'polymorphic_on': request_type
@@ -30,68 +39,80 @@ class Request(Base):
         return cls.query.filter_by(id=request_id).first()
 
     @classmethod
-    def get_requests_paginated(cls, page, per_page, desc=False):
+    def get_requests_paginated(cls, page, per_page, desc=False, total_mode='exact'):
         if desc:
-            result = cls.query.order_by(cls.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+            return paginate(cls.query.order_by(cls.id.desc()), page, per_page, total_mode)
         else:
-            result = cls.query.paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
+            return paginate(cls.query, page, per_page, total_mode)
     
     @classmethod
-    def get_requests_by_type_paginated(cls, request_type, page, per_page, desc=False):
+    def get_requests_by_type_paginated(cls, request_type, page, per_page, desc=False, total_mode='exact'):
         if desc:
-            result = cls.query.filter_by(request_type=request_type).order_by(cls.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+            return paginate(cls.query.filter_by(request_type=request_type).order_by(cls.id.desc()), page, per_page, total_mode)
         else:
-            result = cls.query.filter_by(request_type=request_type).paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
+            return paginate(cls.query.filter_by(request_type=request_type), page, per_page, total_mode)
     
     @classmethod
-    def get_requests_by_status_paginated(cls, request_status, page, per_page, desc=False):
+    def get_requests_by_status_paginated(cls, request_status, page, per_page, desc=False, total_mode='exact'):
         if desc:
-            result = cls.query.filter_by(request_status=request_status).order_by(cls.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+            return paginate(cls.query.filter_by(request_status=request_status).order_by(cls.id.desc()), page, per_page, total_mode)
         else:
-            result = cls.query.filter_by(request_status=request_status).paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
+            return paginate(cls.query.filter_by(request_status=request_status), page, per_page, total_mode)
     
     @classmethod
-    def get_requests_by_type_and_status_paginated(cls, request_type, request_status, page, per_page, desc=False):
+    def get_requests_by_type_and_status_paginated(cls, request_type, request_status, page, per_page, desc=False, total_mode='exact'):
         if desc:
-            result = cls.query.filter_by(request_type=request_type, request_status=request_status).order_by(cls.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+            return paginate(cls.query.filter_by(request_type=request_type, request_status=request_status).order_by(cls.id.desc()), page, per_page, total_mode)
         else:
-            result = cls.query.filter_by(request_type=request_type, request_status=request_status).paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
+            return paginate(cls.query.filter_by(request_type=request_type, request_status=request_status), page, per_page, total_mode)
     
     @classmethod
-    def get_user_requests_paginated(cls, user_id, page, per_page, desc=False):
+    def get_user_requests_paginated(cls, user_id, page, per_page, desc=False, total_mode='exact'):
         if desc:
-            result = cls.query.filter_by(user_id=user_id).order_by(cls.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+            return paginate(cls.query.filter_by(user_id=user_id).order_by(cls.id.desc()), page, per_page, total_mode)
         else:
-            result = cls.query.filter_by(user_id=user_id).paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
+            return paginate(cls.query.filter_by(user_id=user_id), page, per_page, total_mode)
     
     @classmethod
-    def get_user_requests_by_type_paginated(cls, user_id, request_type, page, per_page, desc=False):
+    def get_user_requests_by_type_paginated(cls, user_id, request_type, page, per_page, desc=False, total_mode='exact'):
         if desc:
-            result = cls.query.filter_by(user_id=user_id, request_type=request_type).order_by(cls.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+            return paginate(cls.query.filter_by(user_id=user_id, request_type=request_type).order_by(cls.id.desc()), page, per_page, total_mode)
         else:
-            result = cls.query.filter_by(user_id=user_id, request_type=request_type).paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
+            return paginate(cls.query.filter_by(user_id=user_id, request_type=request_type), page, per_page, total_mode)
     
     @classmethod
-    def get_user_requests_by_status_paginated(cls, user_id, status, page, per_page, desc=False):
+    def get_user_requests_by_status_paginated(cls, user_id, status, page, per_page, desc=False, total_mode='exact'):
         if desc:
-            result = cls.query.filter_by(user_id=user_id, request_status=status).order_by(cls.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+            return paginate(cls.query.filter_by(user_id=user_id, request_status=status).order_by(cls.id.desc()), page, per_page, total_mode)
         else:
-            result = cls.query.filter_by(user_id=user_id, request_status=status).paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
+            return paginate(cls.query.filter_by(user_id=user_id, request_status=status), page, per_page, total_mode)
     
     @classmethod
-    def get_user_requests_by_type_and_status_paginated(cls, user_id, request_type, request_status, page, per_page, desc=False):
+    def get_user_requests_by_type_and_status_paginated(cls, user_id, request_type, request_status, page, per_page, desc=False, total_mode='exact'):
         if desc:
-            result = cls.query.filter_by(user_id=user_id, request_type=request_type, request_status=request_status).order_by(cls.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+            return paginate(cls.query.filter_by(user_id=user_id, request_type=request_type, request_status=request_status).order_by(cls.id.desc()), page, per_page, total_mode)
         else:
-            result = cls.query.filter_by(user_id=user_id, request_type=request_type, request_status=request_status).paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
+            return paginate(cls.query.filter_by(user_id=user_id, request_type=request_type, request_status=request_status), page, per_page, total_mode)
+    
+    @classmethod
+    def filter_requests(cls, user_id=None, request_type=None, request_status=None):
+        query = cls.query
+        if user_id is not None:
+            query = query.filter_by(user_id=user_id)
+        if request_type:
+            query = query.filter_by(request_type=request_type)
+        if request_status:
+            query = query.filter_by(request_status=request_status)
+        return query
+    
+    @classmethod
+    def get_requests_keyset(cls, filters, cursor=None, per_page=10, desc=False):
+        """
+            Keyset page in id order: requests matching `filters` (see filter_requests) after `cursor`, returns (requests, next cursor or None).
+            Uses the (..., id) request indexes, every page costs the same however deep it is.
+            Raises InvalidCursor for an invalid cursor
+        """
+        return keyset_page(cls.filter_requests(**filters), [cls.id], cursor, desc, per_page)
     
     @classmethod
     def delete_request(cls, request_id):
@@ -12,6 +12,10 @@ class RequestAddExperiment(Request):
     comment = db.Column(db.Text())
     score = db.Column(db.Float())
 
+    __table_args__ = (
+        db.Index('ix_request_add_experiment_experiment', 'experiment_id'),
+    )
+
     __mapper_args__ = {
         'polymorphic_identity': 'ADD_EXPERIMENT',
     }
@@ -10,6 +10,10 @@ class RequestUpdateScore(Request):
     answer_id = db.Column(db.Integer, db.ForeignKey('answer.id'), nullable=False)
     new_score = db.Column(db.Float(), nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_request_update_score_answer', 'answer_id'),
+    )
+
     __mapper_args__ = {
         'polymorphic_identity': 'UPDATE_SCORE',
     }
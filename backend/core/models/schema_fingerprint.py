@@ -0,0 +1,44 @@
+# -*- encoding: utf-8 -*-
+
+import hashlib
+from datetime import datetime
+from sqlalchemy.schema import CreateIndex, CreateTable
+from . import db
+from .base import Base
+
+class SchemaFingerprint(Base):
+    """
+        Fingerprint of the schema the database was created with, one row per bootstrap
+    """
+
+    __tablename__ = 'schema_fingerprint'
+
+    fingerprint = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime(), nullable=False)
+
+    def __init__(self, fingerprint):
+        super(SchemaFingerprint, self).__init__()
+        self.fingerprint = fingerprint
+        self.created_at = datetime.now()
+
+    @classmethod
+    def compute(cls):
+        """
+            SHA-256 over the DDL of every table and index, as compiled for the current database
+        """
+        dialect = db.engine.dialect
+        statements = []
+        for table in sorted(db.metadata.tables.values(), key=lambda table: table.name):
+            statements.append(str(CreateTable(table).compile(dialect=dialect)).strip())
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                statements.append(str(CreateIndex(index).compile(dialect=dialect)).strip())
+        return hashlib.sha256("\n".join(statements).encode()).hexdigest()
+
+    @classmethod
+    def get_stored(cls):
+        latest = cls.query.order_by(cls.id.desc()).first()
+        return latest.fingerprint if latest else None
+
+    @classmethod
+    def store(cls, fingerprint):
+        cls(fingerprint).save()
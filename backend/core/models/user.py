@@ -1,9 +1,14 @@
 # -*- encoding: utf-8 -*-
 
-from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+import sys
+
+from sqlalchemy.orm import make_transient_to_detached
 from . import db
 from .base import Base
+from ..cache import principal_cache
+from ..pagination import keyset_order, keyset_page, paginate, total_counter
+from ..hashing import password_hasher
+from ..presence import presence_buffer
 
 user_type_enum = db.Enum('ADMIN', 'TEACHER', 'STUDENT', name='user_type_enum', default='STUDENT')
 account_status_enum = db.Enum('ACTIVE', 'INACTIVE', name='account_status_enum', default='ACTIVE')
@@ -18,15 +23,26 @@ class User(Base):
     user_type = db.Column(user_type_enum, nullable=False)
     account_status = db.Column(account_status_enum, nullable=False)
     jwt_auth_active = db.Column(db.Boolean())
+    token_version = db.Column(db.Integer, nullable=False, default=0)
     last_online = db.Column(db.DateTime())
 
+    # admin user directory: filter by type/status, sort by last_online, every index ends with id for keyset pagination
+    __table_args__ = (
+        db.Index('ix_user_type_status_id', 'user_type', 'account_status', 'id'),
+        db.Index('ix_user_last_online_id', 'last_online', 'id'),
+        db.Index('ix_user_type_last_online_id', 'user_type', 'last_online', 'id'),
+    )
+
+    sortable_fields = ['id', 'username', 'email', 'last_online']
+
     def __init__(self, username, email, password, user_type, account_status):
         super(User, self).__init__()
         self.username = username
         self.email = email
-        self.password = generate_password_hash(password)
+        self.password = password_hasher.hash(password)
         self.user_type = user_type
         self.account_status = account_status
+        self.token_version = 0
 
     def get_id(self):
         return self.id
@@ -44,10 +60,14 @@ class User(Base):
         self.email = email
         
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return password_hasher.verify(self.password, password)
 
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        self.password = password_hasher.hash(password)
+
+    def password_needs_rehash(self):
+        # stored with different hash parameters than the configured ones
+        return password_hasher.needs_rehash(self.password)
         
     def get_user_type(self):
         return self.user_type
@@ -67,12 +87,43 @@ class User(Base):
     def set_jwt_auth_active(self, set_status):
         self.jwt_auth_active = set_status
 
+    def get_token_version(self):
+        return self.token_version
+
+    def bump_token_version(self):
+        # revokes every token issued so far (logout everywhere)
+        self.token_version = (self.token_version or 0) + 1
+
     def get_last_online(self):
-        return self.last_online
+        # a buffered timestamp is always newer than the stored one
+        return presence_buffer.get(self.id) or self.last_online
 
     def set_last_online(self):
-        self.last_online = datetime.now()
+        # written behind by the presence buffer, not by save()
+        presence_buffer.touch(self.id)
+
+    def save(self):
+        super(User, self).save()
+        # drop cached principals so the next request sees the new state
+        principal_cache.invalidate_user(self.id)
+
+    def delete(self):
+        user_id = self.id
+        super(User, self).delete()
+        principal_cache.invalidate_user(user_id)
 
+    def to_snapshot(self):
+        # plain column values, safe to share between requests and threads
+        return {column.name: getattr(self, column.name) for column in self.__table__.columns}
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        # rebuild a persistent instance in the current session without issuing a query
+        user = cls.__mapper__.class_manager.new_instance()
+        for key, value in snapshot.items():
+            setattr(user, key, value)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
     
     def to_dict(self):
         return {
@@ -82,7 +133,7 @@ class User(Base):
             'user_type': self.user_type,
             'account_status': self.account_status,
             # last_online format: 'YYYY-MM-DD HH:MM:SS'
-            'last_online': self.last_online.strftime('%Y-%m-%d %H:%M:%S') if self.last_online else None
+            'last_online': self.get_last_online().strftime('%Y-%m-%d %H:%M:%S') if self.get_last_online() else None
         }
 
     @classmethod
@@ -95,6 +146,112 @@ class User(Base):
             print(e)
             return False
         
+    @classmethod
+    def bulk_register(cls, users, batch_size=500):
+        """
+            Insert already hashed users with multi-row INSERTs in a single transaction
+            users: list of dicts with username, email, password (hash), user_type, account_status
+        """
+        rows = [dict(user, token_version=0) for user in users]
+        try:
+            for start in range(0, len(rows), batch_size):
+                db.session.execute(db.insert(cls), rows[start:start + batch_size])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        # like Base.save, so cached page totals of the user lists count the new users
+        total_counter.invalidate(table.name for table in cls.__mapper__.tables)
+
+    @classmethod
+    def update_last_online_bulk(cls, last_online_by_id):
+        """
+            Write buffered presence timestamps with one executemany UPDATE by primary key
+            last_online_by_id: dict of user id -> datetime
+            Users deleted in the meantime are skipped (a Core UPDATE, the ORM bulk UPDATE fails on their row count)
+            A timestamp never replaces a later one, several worker processes flush their own buffers in any order
+        """
+        table = cls.__table__
+        statement = (db.update(table)
+                     .where(table.c.id == db.bindparam("user_id"),
+                            db.or_(table.c.last_online.is_(None), table.c.last_online < db.bindparam("last_online")))
+                     .values(last_online=db.bindparam("last_online")))
+        rows = [{"user_id": user_id, "last_online": last_online} for user_id, last_online in last_online_by_id.items()]
+        try:
+            db.session.execute(statement, rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @classmethod
+    def get_existing_emails(cls, emails, batch_size=500):
+        emails = list(emails)
+        existing = set()
+        for start in range(0, len(emails), batch_size):
+            existing.update(email for email, in db.session.query(cls.email).filter(cls.email.in_(emails[start:start + batch_size])))
+        return existing
+
+    @classmethod
+    def get_existing_usernames(cls, usernames, batch_size=500):
+        usernames = list(usernames)
+        existing = set()
+        for start in range(0, len(usernames), batch_size):
+            existing.update(username for username, in db.session.query(cls.username).filter(cls.username.in_(usernames[start:start + batch_size])))
+        return existing
+        
+    @classmethod
+    def filter_users(cls, user_type=None, account_status=None, username=None, email=None, last_online_from=None, last_online_to=None):
+        """
+            Directory query, prefixes are matched as index ranges instead of LIKE
+        """
+        query = cls.query
+        if user_type:
+            query = query.filter(cls.user_type == user_type)
+        if account_status:
+            query = query.filter(cls.account_status == account_status)
+        if username:
+            query = query.filter(*prefix_range(cls.username, username))
+        if email:
+            query = query.filter(*prefix_range(cls.email, email))
+        if last_online_from:
+            query = query.filter(cls.last_online >= last_online_from)
+        if last_online_to:
+            query = query.filter(cls.last_online <= last_online_to)
+        return query
+
+    @classmethod
+    def get_sort_columns(cls, sort_by):
+        # id is the tiebreaker, every sort key is unique
+        return [cls.id] if sort_by == 'id' else [getattr(cls, sort_by), cls.id]
+
+    @classmethod
+    def flush_presence(cls, sort_by, filters):
+        """
+            Write this worker's buffered last_online timestamps before a query that sorts or filters on the column,
+            so the order matches the overlaid values it returns. Other workers' buffers land within their flush interval.
+        """
+        if sort_by != 'last_online' and not filters.get('last_online_from') and not filters.get('last_online_to'):
+            return
+        if presence_buffer.flush():
+            # the buffer writes in its own session, end the read transaction so the query sees the new values
+            db.session.commit()
+
+    @classmethod
+    def get_users_paginated(cls, filters, sort_by='id', descending=False, page=1, per_page=10, total_mode='exact'):
+        cls.flush_presence(sort_by, filters)
+        query = cls.filter_users(**filters).order_by(*keyset_order(cls.get_sort_columns(sort_by), descending))
+        return paginate(query, page, per_page, total_mode)
+
+    @classmethod
+    def get_users_keyset(cls, filters, sort_by='id', descending=False, cursor=None, per_page=10):
+        """
+            Keyset page: rows after `cursor`, returns (users, next cursor or None)
+            Raises InvalidCursor for a cursor that does not match the sort
+        """
+        cls.flush_presence(sort_by, filters)
+        return keyset_page(cls.filter_users(**filters), cls.get_sort_columns(sort_by), cursor, descending, per_page)
+
     @classmethod
     def delete_user(cls, id):
         user = cls.get_by_id(id)
@@ -107,6 +264,14 @@ class User(Base):
     def get_by_email(cls, email):
         return cls.query.filter_by(email=email).first()
     
+    @classmethod
+    def get_auth_state(cls, user_id):
+        """
+            (token_version, account_status, user_type) of the user, None if it no longer exists.
+            One primary key lookup, checked against cached principals that other processes cannot invalidate.
+        """
+        return db.session.query(cls.token_version, cls.account_status, cls.user_type).filter(cls.id == user_id).first()
+    
     @classmethod
     def get_by_id(cls, user_id):
         return cls.query.filter_by(id=user_id).first()
@@ -114,8 +279,15 @@ class User(Base):
     @classmethod
     def get_by_username(cls, username):
         return cls.query.filter_by(username=username).first()
-    
-    @classmethod
-    def get_all_users_paginated(cls, page, per_page):
-        result = cls.query.paginate(page=page, per_page=per_page, error_out=False)
-        return result.items, result.total
\ No newline at end of file
+
+
+
+def prefix_range(column, prefix):
+    """
+        `column LIKE 'prefix%'` as a range, usable with a plain index on both SQLite and MySQL
+    """
+    # the last code point has no successor, the upper bound comes from the prefix without the trailing ones
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return (column >= prefix,)
+    return column >= prefix, column < stem[:-1] + chr(ord(stem[-1]) + 1)
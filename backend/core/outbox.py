@@ -0,0 +1,139 @@
+# -*- encoding: utf-8 -*-
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from .models import db, EmailOutbox
+from .utils import mail
+
+
+class OutboxSender():
+    """
+        Background sender for the email outbox table.
+        Requests only insert a row, a daemon thread per worker process delivers the messages
+        in batches over one reused SMTP connection, retrying failures with exponential backoff.
+        Sent messages are deleted after `retention_days`.
+        Disabled, there is no thread and `enqueue` sends the message on the request thread.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = True
+        self.batch_size = 50
+        self.max_attempts = 5
+        self.retry_base = 30
+        self.poll_interval = 10
+        self.idle_timeout = 60
+        self.lease = 300
+        self.retention_days = 7
+        self.purge_interval = 3600
+        self._next_purge = 0.0
+        self._thread = None
+        self._thread_pid = None
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_used_at = 0.0
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config.get('MAIL_OUTBOX_BATCH_SIZE', self.batch_size)
+        self.max_attempts = app.config.get('MAIL_OUTBOX_MAX_ATTEMPTS', self.max_attempts)
+        self.retry_base = app.config.get('MAIL_OUTBOX_RETRY_BASE', self.retry_base)
+        self.poll_interval = app.config.get('MAIL_OUTBOX_POLL_INTERVAL', self.poll_interval)
+        self.idle_timeout = app.config.get('MAIL_OUTBOX_IDLE_TIMEOUT', self.idle_timeout)
+        self.retention_days = app.config.get('MAIL_OUTBOX_RETENTION_DAYS', self.retention_days)
+        self.enabled = app.config.get('MAIL_OUTBOX_ENABLED', self.enabled)
+        if self.enabled:
+            # started lazily, threads do not survive the fork of a prefork server
+            app.before_request(self.ensure_started)
+
+    def enqueue(self, subject, sender, recipients, html):
+        """
+            Queue a message, returns its outbox row.
+            With the outbox disabled the message is sent right away instead, returns None
+        """
+        if not self.enabled:
+            from flask_mail import Message
+            mail.send(Message(subject, sender=sender, recipients=recipients, html=html))
+            return None
+        message = EmailOutbox.enqueue(subject, sender, recipients, html)
+        self._wakeup.set()
+        return message
+
+    def ensure_started(self):
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid != os.getpid():
+                self._connection = None
+                self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+                self._thread.start()
+                self._thread_pid = os.getpid()
+
+    def flush(self):
+        """
+            Send all due messages, returns the number of messages sent
+        """
+        # imported here so the mail stack is only loaded by the sender thread
+        from flask_mail import Message
+        sent = 0
+        while True:
+            messages = EmailOutbox.claim_due(self.batch_size, self.lease)
+            if not messages:
+                break
+            for message in messages:
+                try:
+                    self._get_connection().send(Message(message.subject, sender=message.sender, recipients=message.get_recipients(), html=message.html))
+                    self._connection_used_at = time.monotonic()
+                    message.mark_sent()
+                    sent += 1
+                except Exception as e:
+                    # the connection may be broken, reconnect for the next message
+                    self._close_connection()
+                    message.mark_failed(e, self.max_attempts, self.retry_base)
+                db.session.commit()
+        return sent
+
+    def purge(self):
+        """
+            Delete the messages sent more than `retention_days` ago, returns the number of deleted messages
+        """
+        if not self.retention_days:
+            return 0
+        return EmailOutbox.purge_sent(datetime.now() - timedelta(days=self.retention_days))
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    self.flush()
+                    if time.monotonic() >= self._next_purge:
+                        self._next_purge = time.monotonic() + self.purge_interval
+                        self.purge()
+            except Exception as e:
+                self.app.logger.exception(e)
+            if self._connection is not None and time.monotonic() - self._connection_used_at > self.idle_timeout:
+                self._close_connection()
+
+    def _get_connection(self):
+        if self._connection is None:
+            connection = mail.connect()
+            self._connection = connection.__enter__()
+            self._connection_used_at = time.monotonic()
+        return self._connection
+
+    def _close_connection(self):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except Exception:
+                pass
+
+
+outbox = OutboxSender()
@@ -0,0 +1,251 @@
+# -*- encoding: utf-8 -*-
+
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import and_, func, or_
+from sqlalchemy.sql.util import find_tables
+
+TOTAL_MODES = ("exact", "estimate", "none")
+
+
+class InvalidCursor(ValueError):
+    """
+        Raised for a cursor that cannot be decoded or does not match the requested sort
+    """
+
+
+def encode_cursor(values):
+    """
+        Opaque cursor for the last row of a page: the values of its sort key, in order
+    """
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, columns):
+    """
+        Decode a cursor produced by `encode_cursor` for the same sort columns.
+        Every value must fit its column (type, NULL only in a nullable column), a tampered cursor never reaches the query
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor.") from e
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursor("Invalid cursor.")
+    return [decode_cursor_value(column, value) for column, value in zip(columns, values)]
+
+
+def decode_cursor_value(column, value):
+    if value is None:
+        if not column.expression.nullable:
+            raise InvalidCursor("Invalid cursor.")
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        python_type = None
+    if python_type is datetime:
+        try:
+            return datetime.fromisoformat(value)
+        except (ValueError, TypeError) as e:
+            raise InvalidCursor("Invalid cursor.") from e
+    # JSON gives int, float, str, bool, list and dict, bool is an int in Python but never a valid key here
+    if isinstance(value, (bool, list, dict)):
+        raise InvalidCursor("Invalid cursor.")
+    if python_type is float and isinstance(value, int):
+        return float(value)
+    if python_type is not None and not isinstance(value, python_type):
+        raise InvalidCursor("Invalid cursor.")
+    return value
+
+
+def keyset_order(columns, descending=False):
+    return [column.desc() if descending else column.asc() for column in columns]
+
+
+def keyset_condition(columns, values, descending=False):
+    """
+        WHERE clause selecting the rows strictly after `values` in (columns...) order, for non-NULL values.
+        Written as `col >= v AND (col > v OR ...)` so the leading column is an index range on both SQLite and MySQL.
+    """
+    column, value = columns[0], values[0]
+    if len(columns) == 1:
+        return column < value if descending else column > value
+    rest = keyset_condition(columns[1:], values[1:], descending)
+    if descending:
+        return and_(column <= value, or_(column < value, rest))
+    return and_(column >= value, or_(column > value, rest))
+
+
+def keyset_page(query, columns, cursor=None, descending=False, limit=10):
+    """
+        Fetch the page after `cursor`, returns (rows, next cursor or None).
+        The last column must be unique and not nullable (the primary key).
+        A nullable leading column is read as two index ranges, NULL rows and the rest, in the order
+        both SQLite and MySQL use (NULL first ascending, last descending), instead of one OR that defeats the index.
+        Raises InvalidCursor for a cursor that does not match the columns
+    """
+    # the page size is checked by the APIs, at least one row so there is a last row for the cursor
+    limit = max(limit, 1)
+    values = decode_cursor(cursor, columns) if cursor else None
+    column = columns[0]
+    if column.expression.nullable and len(columns) > 1:
+        # True for the NULL segment
+        segments = [False, True] if descending else [True, False]
+        if values is not None:
+            # start in the segment holding the cursor row
+            segments = segments[segments.index(values[0] is None):]
+    else:
+        segments = [None]
+    
+    rows = []
+    for is_null in segments:
+        segment_query = query
+        if is_null is not None:
+            segment_query = segment_query.filter(column.is_(None) if is_null else column.isnot(None))
+        if values is not None:
+            segment_query = segment_query.filter(keyset_condition(columns[1:], values[1:], descending) if is_null else keyset_condition(columns, values, descending))
+        rows += segment_query.order_by(*keyset_order(columns, descending)).limit(limit + 1 - len(rows)).all()
+        if len(rows) > limit:
+            break
+        # the next segment is read from its beginning
+        values = None
+    
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([getattr(rows[-1], column.key) for column in columns])
+
+
+
+class TotalCounter():
+    """
+        Totals of OFFSET pages, per total mode:
+        exact counts the matching rows, estimate counts at most `estimate_limit` of them and extrapolates
+        from the share of the id range they span, none does not count.
+        Counts are cached per (mode, query) for at most `ttl` seconds and dropped when Base.save/delete
+        writes one of the tables of the query.
+        NOTE: the cache is per worker process, invalidation only affects the current process.
+    """
+
+    def __init__(self, max_size=4096, ttl=30, estimate_limit=1000):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.estimate_limit = estimate_limit
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, table names, total)
+        self._keys_by_table = {}  # table name -> set of keys
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_size = app.config.get('COUNT_CACHE_SIZE', self.max_size)
+        self.ttl = app.config.get('COUNT_CACHE_TTL', self.ttl)
+        self.estimate_limit = app.config.get('COUNT_ESTIMATE_LIMIT', self.estimate_limit)
+
+    def count(self, query, total_mode="exact"):
+        if total_mode == "none":
+            return None
+        statement = query.order_by(None).statement
+        # SQLAlchemy's statement cache key (structure + bound values), a tenth of the cost of compiling the statement
+        cache_key = statement._generate_cache_key()
+        if cache_key is not None:
+            key = (total_mode, cache_key.key, repr([bind.effective_value for bind in cache_key.bindparams]))
+        else:
+            compiled = statement.compile()
+            key = (total_mode, str(compiled), repr(sorted(compiled.params.items())))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        
+        total = self.estimate(query) if total_mode == "estimate" else query.order_by(None).count()
+        if self.max_size > 0 and self.ttl > 0:
+            tables = {table.name for table in find_tables(statement)}
+            with self._lock:
+                if key in self._entries:
+                    self._remove(key)
+                self._entries[key] = (time.time() + self.ttl, tables, total)
+                for table in tables:
+                    self._keys_by_table.setdefault(table, set()).add(key)
+                while len(self._entries) > self.max_size:
+                    self._remove(next(iter(self._entries)))
+        return total
+
+    def estimate(self, query):
+        """
+            Exact up to `estimate_limit` matching rows. Beyond, the first `estimate_limit` matches in id order
+            are taken as a sample of the id range from the first match to the highest id of the table.
+        """
+        model = query.column_descriptions[0]["entity"]
+        sample = query.with_entities(model.id.label("id")).order_by(None).order_by(model.id).limit(self.estimate_limit).subquery()
+        count, first, last = query.session.query(func.count(sample.c.id), func.min(sample.c.id), func.max(sample.c.id)).one()
+        if count < self.estimate_limit:
+            return count
+        top = query.session.query(func.max(model.id)).scalar()
+        return round(count * (top - first + 1) / (last - first + 1))
+
+    def invalidate(self, tables):
+        with self._lock:
+            for table in tables:
+                for key in self._keys_by_table.pop(table, set()):
+                    if key in self._entries:
+                        self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_table.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxSize": self.max_size,
+                "ttl": self.ttl,
+                "estimateLimit": self.estimate_limit,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0
+            }
+
+    def _remove(self, key):
+        # caller must hold the lock
+        _, tables, _ = self._entries.pop(key)
+        for table in tables:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_table[table]
+
+
+total_counter = TotalCounter()
+
+
+def paginate(query, page=1, per_page=10, total_mode="exact"):
+    """
+        OFFSET page, returns (items, total, has more pages).
+        One row past the page is fetched for `has more`, so the total is only counted when it is not
+        known from the page itself, and never in the "none" mode (total is None)
+    """
+    page = max(page, 1)
+    per_page = max(per_page, 1)
+    items = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if total_mode == "none":
+        return items, None, has_more
+    if not has_more and (items or page == 1):
+        # the last page
+        return items, (page - 1) * per_page + len(items), has_more
+    return items, total_counter.count(query, total_mode), has_more
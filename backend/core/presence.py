@@ -0,0 +1,128 @@
+# -*- encoding: utf-8 -*-
+
+import atexit
+import os
+import threading
+from datetime import datetime
+
+
+class PresenceBuffer():
+    """
+        Write-behind buffer for `last_online`.
+        Authenticated requests only record a timestamp in memory, coalesced per user,
+        a daemon thread per worker process writes the pending timestamps with one bulk UPDATE every `flush_interval` seconds.
+        Reads go through the buffer so they never see an older value than the one recorded.
+    """
+
+    def __init__(self, flush_interval=30, max_pending=10000, max_retries=3):
+        self.app = None
+        self.writer = None
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.flushes = 0
+        self.written = 0
+        self.dropped = 0
+        self._failures = 0  # consecutive failed flushes
+        self._pending = {}  # user_id -> datetime
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+
+    def init_app(self, app, writer):
+        """
+            writer: callable taking a {user_id: last_online} dict, does the bulk UPDATE
+        """
+        self.app = app
+        self.writer = writer
+        self.flush_interval = app.config.get('PRESENCE_FLUSH_INTERVAL', self.flush_interval)
+        self.max_pending = app.config.get('PRESENCE_MAX_PENDING', self.max_pending)
+        self.max_retries = app.config.get('PRESENCE_MAX_RETRIES', self.max_retries)
+        if self.flush_interval > 0:
+            # started lazily, threads do not survive the fork of a prefork server
+            app.before_request(self.ensure_started)
+            atexit.register(self.flush)
+
+    def touch(self, user_id, when=None):
+        when = when or datetime.now()
+        if self.flush_interval <= 0:
+            # buffering disabled, write through
+            self._write({user_id: when})
+            return
+        with self._lock:
+            previous = self._pending.get(user_id)
+            if previous is None or previous < when:
+                self._pending[user_id] = when
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wakeup.set()
+
+    def get(self, user_id):
+        return self._pending.get(user_id)
+
+    def ensure_started(self):
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid != os.getpid():
+                # pending entries inherited from the parent belong to the parent
+                self._pending = {}
+                self._thread = threading.Thread(target=self._run, name="presence-flush", daemon=True)
+                self._thread.start()
+                self._thread_pid = os.getpid()
+
+    def flush(self):
+        """
+            Write all pending timestamps, returns the number of users updated
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            try:
+                self._write(pending)
+            except Exception:
+                self._failures += 1
+                if self._failures > self.max_retries:
+                    # a batch that keeps failing is given up, presence timestamps are not worth blocking every later flush
+                    self._failures = 0
+                    self.dropped += len(pending)
+                    raise
+                # keep the timestamps for the next flush, unless newer ones were recorded meanwhile
+                with self._lock:
+                    for user_id, when in pending.items():
+                        if self._pending.get(user_id, when) <= when:
+                            self._pending[user_id] = when
+                raise
+            self._failures = 0
+            self.flushes += 1
+            self.written += len(pending)
+            return len(pending)
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "flushInterval": self.flush_interval,
+            "flushes": self.flushes,
+            "written": self.written,
+            "dropped": self.dropped
+        }
+
+    def _write(self, pending):
+        with self.app.app_context():
+            self.writer(pending)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.exception(e)
+
+
+presence_buffer = PresenceBuffer()
@@ -0,0 +1,141 @@
+# -*- encoding: utf-8 -*-
+
+import math
+import os
+import sqlite3
+import threading
+import time
+
+
+def parse_limit(limit):
+    """
+        "10/minute" -> (capacity 10, refill rate in tokens per second)
+    """
+    periods = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+    count, period = limit.strip().split("/")
+    return int(count), int(count) / periods[period.strip()]
+
+
+def parse_limits(limits):
+    """
+        "ip=30/minute, email=10/minute" -> {"ip": (30, 0.5), "email": (10, 0.1666)}
+    """
+    return {key.strip(): parse_limit(limit) for key, limit in (part.split("=") for part in limits.split(",") if part.strip())}
+
+
+class MemoryBucketStore():
+    """
+        Token buckets in a dict, enforced per worker process only (development, tests)
+    """
+
+    def __init__(self):
+        self._buckets = {}  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+            return allowed, tokens
+
+    def purge(self, before):
+        with self._lock:
+            for key in [key for key, (_, updated_at) in self._buckets.items() if updated_at < before]:
+                del self._buckets[key]
+
+
+class SQLiteBucketStore():
+    """
+        Token buckets in a small SQLite file shared by every worker process on the host.
+        A take is one atomic UPSERT, so concurrent workers never lose an update.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute("CREATE TABLE IF NOT EXISTS rate_limit_bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, allowed INTEGER NOT NULL)")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def take(self, key, capacity, rate, now):
+        # refill, then take one token if there is one, returns the tokens available before the take
+        refill = "MIN(:capacity, tokens + (:now - updated_at) * :rate)"
+        row = self._connect().execute(
+            "INSERT INTO rate_limit_bucket (key, tokens, updated_at, allowed) VALUES (:key, :capacity - 1, :now, 1) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            f"tokens = CASE WHEN {refill} >= 1 THEN {refill} - 1 ELSE {refill} END, "
+            f"allowed = {refill} >= 1, "
+            "updated_at = :now "
+            "RETURNING allowed, tokens",
+            {"key": key, "capacity": capacity, "rate": rate, "now": now}).fetchone()
+        allowed, tokens = bool(row[0]), row[1]
+        return allowed, tokens + 1 if allowed else tokens
+
+    def purge(self, before):
+        self._connect().execute("DELETE FROM rate_limit_bucket WHERE updated_at < ?", (before,))
+
+
+class RateLimiter():
+    """
+        Token-bucket rate limiter.
+        Each scope (login, registration, ...) has one bucket per IP, email or user,
+        a request goes through only if every one of its buckets has a token left.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.store = None
+        self.limits = {}  # scope -> {"ip": (capacity, rate), ...}
+        self.rejected = 0
+        self.purge_interval = 3600
+        self._next_purge = 0.0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', self.enabled)
+        storage = app.config.get('RATE_LIMIT_STORAGE', 'memory')
+        self.store = MemoryBucketStore() if storage == 'memory' else SQLiteBucketStore(storage)
+        self.limits = {scope.lower(): parse_limits(limits) for scope, limits in app.config.get('RATE_LIMITS', {}).items()}
+        self.purge_interval = app.config.get('RATE_LIMIT_PURGE_INTERVAL', self.purge_interval)
+
+    def hit(self, scope, identities):
+        """
+            Take a token from every bucket of `scope` for the given identities, e.g. {"ip": "1.2.3.4", "email": "a@b"}
+            Returns 0 when allowed, otherwise the number of seconds to wait
+        """
+        if not self.enabled or self.store is None:
+            return 0
+        now = time.time()
+        # idle buckets are dropped every purge_interval, not on each hit
+        if self.purge_interval and now >= self._next_purge:
+            self._next_purge = now + self.purge_interval
+            self.purge()
+        retry_after = 0
+        for kind, (capacity, rate) in self.limits.get(scope, {}).items():
+            identity = identities.get(kind)
+            if identity is None:
+                continue
+            allowed, tokens = self.store.take(f"{scope}:{kind}:{identity}", capacity, rate, now)
+            if not allowed:
+                retry_after = max(retry_after, math.ceil((1 - tokens) / rate))
+        if retry_after:
+            self.rejected += 1
+        return retry_after
+
+    def purge(self, idle=86400):
+        """
+            Drop buckets untouched for `idle` seconds, they are full again anyway
+        """
+        self.store.purge(time.time() - idle)
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,125 @@
+# -*- encoding: utf-8 -*-
+
+from sqlalchemy import inspect, literal, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from .models import db, SchemaFingerprint
+from .search import create_search_indexes
+
+
+class SchemaMismatch(RuntimeError):
+    """
+        Raised at boot when existing tables lack columns of the models (see add_missing_columns),
+        or when the database was created from a different schema (SCHEMA_STRICT)
+    """
+
+
+def create_missing_indexes():
+    """
+        Create the indexes declared in the models that existing tables lack, returns their names.
+        create_all only creates the indexes of the tables it creates, this is the migration for indexes
+        added to the models later. On large tables each CREATE INDEX takes a while and blocks writes to the table.
+        Indexes on columns the table lacks (see missing_columns) are skipped.
+    """
+    inspector = inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in existing and all(column.name in columns for column in index.columns):
+                index.create(db.engine)
+                created.append(index.name)
+    return created
+
+
+def missing_columns():
+    """
+        Columns declared in the models that existing tables lack, as "table.column".
+        create_all never adds them, a table created before a column was added to its model keeps missing it.
+    """
+    inspector = inspect(db.engine)
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing.extend(f"{table.name}.{column.name}" for column in table.columns if column.name not in existing)
+    return missing
+
+
+def add_missing_columns():
+    """
+        Add the columns declared in the models that existing tables lack, returns their names as "table.column".
+        A NOT NULL column needs a scalar default (e.g. user.token_version), the existing rows get it.
+        Columns that cannot be added stay in missing_columns.
+    """
+    dialect = db.engine.dialect
+    quote = dialect.identifier_preparer.quote
+    added = []
+    for name in missing_columns():
+        table_name, column_name = name.split(".", 1)
+        column = db.metadata.tables[table_name].columns[column_name]
+        definition = f"{quote(column.name)} {column.type.compile(dialect=dialect)}"
+        if not column.nullable:
+            if column.default is None or not column.default.is_scalar:
+                continue
+            default = literal(column.default.arg, column.type).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+            definition += f" NOT NULL DEFAULT {default}"
+        with db.engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {quote(table_name)} ADD COLUMN {definition}"))
+        added.append(name)
+    return added
+
+
+def bootstrap_schema():
+    """
+        Create the missing tables, columns, indexes and full-text indexes and record the schema fingerprint, returns the fingerprint
+        NOTE: existing columns are never altered. Missing columns are added (add_missing_columns),
+        SchemaMismatch is raised without recording the fingerprint for those that cannot be
+    """
+    try:
+        db.create_all()
+    except (OperationalError, ProgrammingError):
+        # another worker created the tables at the same time, make sure nothing is missing
+        db.session.rollback()
+        db.create_all()
+    add_missing_columns()
+    missing = missing_columns()
+    if missing:
+        raise SchemaMismatch(f"Existing tables lack the columns {', '.join(missing)}, add them, then run `flask --app app init-db`.")
+    create_missing_indexes()
+    create_search_indexes(db.engine)
+    fingerprint = SchemaFingerprint.compute()
+    if SchemaFingerprint.get_stored() != fingerprint:
+        SchemaFingerprint.store(fingerprint)
+    return fingerprint
+
+
+def check_schema(app):
+    """
+        Run once per process at boot, requests never look at the schema afterwards.
+        A database without a fingerprint is bootstrapped when SCHEMA_AUTO_CREATE is set.
+        Columns of the models that the tables lack (and bootstrap could not add) always raise SchemaMismatch,
+        every query of their model would fail. A fingerprint mismatch is logged, or raised with SCHEMA_STRICT.
+    """
+    with app.app_context():
+        stored = SchemaFingerprint.get_stored() if inspect(db.engine).has_table(SchemaFingerprint.__tablename__) else None
+        if stored is None:
+            if not app.config.get('SCHEMA_AUTO_CREATE', True):
+                raise SchemaMismatch("Database schema is not initialized, run `flask --app app init-db`.")
+            bootstrap_schema()
+            return
+
+        missing = missing_columns()
+        if missing:
+            raise SchemaMismatch(f"Existing tables lack the columns {', '.join(missing)}, run `flask --app app init-db`.")
+        expected = SchemaFingerprint.compute()
+        if stored == expected:
+            return
+        message = f"Database schema fingerprint {stored} does not match the models ({expected}), run `flask --app app init-db` and migrate the changed tables."
+        if app.config.get('SCHEMA_STRICT', False):
+            raise SchemaMismatch(message)
+        app.logger.warning(message)
@@ -0,0 +1,186 @@
+# -*- encoding: utf-8 -*-
+
+import html
+import logging
+import re
+import time
+from sqlalchemy import and_, column, func, inspect, literal, literal_column, or_, select, table, text
+from sqlalchemy.dialects.mysql import match as mysql_match
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_TOKENS = 16
+# marks the matches in database snippets, replaced by <mark> once the row text is HTML-escaped
+MARK_START, MARK_END = "\x02", "\x03"
+# a missing index is looked for again after this many seconds (created by init-db while the workers run)
+RECHECK_INTERVAL = 60
+
+
+def keyword_tokens(keyword):
+    # words only, the search syntax of FTS5 and MySQL is never taken from the user
+    return re.findall(r"\w+", (keyword or "").lower())
+
+
+class SearchIndex():
+    """
+        Full-text index over text columns of one table:
+        an external-content FTS5 table kept in sync by triggers on SQLite, a FULLTEXT index on MySQL.
+        Every keyword is matched as a word prefix, all keywords must match, results are ranked
+        (bm25 on SQLite, with `weights` per column, MATCH ... AGAINST relevance on MySQL).
+        Until the index exists (`create`, run by `flask --app app init-db`) searches fall back to ILIKE.
+    """
+
+    def __init__(self, table_name, columns, weights=None):
+        self.table_name = table_name
+        self.columns = columns
+        self.weights = weights or [1.0] * len(columns)
+        self.name = f"{table_name}_fts"
+        self._available = None
+        self._checked_at = 0.0
+
+    def create(self, engine):
+        """
+            Create the index if it is missing and index the existing rows, returns whether it was created
+        """
+        dialect = engine.dialect.name
+        with engine.begin() as connection:
+            if self.exists(connection) or not inspect(connection).has_table(self.table_name):
+                return False
+            if dialect == "sqlite":
+                self._create_fts5(connection)
+            elif dialect == "mysql":
+                connection.execute(text(f"ALTER TABLE {self.table_name} ADD FULLTEXT INDEX {self.name} ({', '.join(self.columns)})"))
+            else:
+                return False
+        self._available = True
+        return True
+
+    def _create_fts5(self, connection):
+        columns = ", ".join(self.columns)
+        new = ", ".join(f"new.{name}" for name in self.columns)
+        old = ", ".join(f"old.{name}" for name in self.columns)
+        connection.execute(text(f"CREATE VIRTUAL TABLE {self.name} USING fts5({columns}, content='{self.table_name}', "
+                                f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')"))
+        connection.execute(text(f"CREATE TRIGGER {self.name}_insert AFTER INSERT ON {self.table_name} BEGIN "
+                                f"INSERT INTO {self.name}(rowid, {columns}) VALUES (new.id, {new}); END"))
+        connection.execute(text(f"CREATE TRIGGER {self.name}_delete AFTER DELETE ON {self.table_name} BEGIN "
+                                f"INSERT INTO {self.name}({self.name}, rowid, {columns}) VALUES ('delete', old.id, {old}); END"))
+        connection.execute(text(f"CREATE TRIGGER {self.name}_update AFTER UPDATE OF {columns} ON {self.table_name} BEGIN "
+                                f"INSERT INTO {self.name}({self.name}, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+                                f"INSERT INTO {self.name}(rowid, {columns}) VALUES (new.id, {new}); END"))
+        connection.execute(text(f"INSERT INTO {self.name}({self.name}) VALUES ('rebuild')"))
+
+    def drop(self, engine):
+        with engine.begin() as connection:
+            if not self.exists(connection):
+                return
+            if engine.dialect.name == "sqlite":
+                for trigger in ("insert", "delete", "update"):
+                    connection.execute(text(f"DROP TRIGGER IF EXISTS {self.name}_{trigger}"))
+                connection.execute(text(f"DROP TABLE {self.name}"))
+            else:
+                connection.execute(text(f"ALTER TABLE {self.table_name} DROP INDEX {self.name}"))
+        self._available = False
+        self._checked_at = time.monotonic()
+
+    def exists(self, connection):
+        if connection.dialect.name == "sqlite":
+            return connection.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": self.name}).first() is not None
+        if connection.dialect.name == "mysql":
+            return any(index["name"] == self.name for index in inspect(connection).get_indexes(self.table_name))
+        return False
+
+    def available(self, session):
+        if not self._available and time.monotonic() - self._checked_at > RECHECK_INTERVAL:
+            self._available = self.exists(session.connection())
+            self._checked_at = time.monotonic()
+        return self._available
+
+    def search(self, model, query, keyword):
+        """
+            `query` of `model` restricted to the rows matching `keyword`, as (row, snippet) ordered by rank.
+            The snippet is raw row text with the matches between MARK_START and MARK_END, None when the database
+            does not make one. Pass it through `snippet` before sending it
+        """
+        tokens = keyword_tokens(keyword)
+        if not tokens:
+            return query.filter(literal(False)).add_columns(literal(None).label("snippet"))
+        if not self.available(query.session):
+            return self._search_ilike(model, query, tokens).add_columns(literal(None).label("snippet")).order_by(model.id)
+        if query.session.get_bind().dialect.name == "sqlite":
+            fts = table(self.name, column("rowid"))
+            fts_column = literal_column(self.name)
+            snippet = func.snippet(fts_column, -1, MARK_START, MARK_END, "…", SNIPPET_TOKENS)
+            return (query.join(fts, fts.c.rowid == model.id)
+                    .filter(fts_column.op("MATCH")(self.fts5_query(tokens)))
+                    .add_columns(snippet.label("snippet"))
+                    .order_by(func.bm25(fts_column, *self.weights)))
+        relevance = mysql_match(*[getattr(model, name) for name in self.columns], against=self.boolean_query(tokens)).in_boolean_mode()
+        return query.filter(relevance).add_columns(literal(None).label("snippet")).order_by(relevance.desc(), model.id)
+
+    def match(self, model, keyword):
+        """
+            Filter for the rows matching `keyword`, without ranking (keyset pages in id order)
+        """
+        tokens = keyword_tokens(keyword)
+        if not tokens:
+            return literal(False)
+        if not self.available(model.query.session):
+            return and_(*[or_(*[getattr(model, name).ilike(f"%{token}%") for name in self.columns]) for token in tokens])
+        if model.query.session.get_bind().dialect.name == "sqlite":
+            fts = table(self.name, column("rowid"))
+            return model.id.in_(select(fts.c.rowid).where(literal_column(self.name).op("MATCH")(self.fts5_query(tokens))))
+        return mysql_match(*[getattr(model, name) for name in self.columns], against=self.boolean_query(tokens)).in_boolean_mode()
+
+    def _search_ilike(self, model, query, tokens):
+        for token in tokens:
+            query = query.filter(or_(*[getattr(model, name).ilike(f"%{token}%") for name in self.columns]))
+        return query
+
+    def snippet(self, row, keyword, snippet=None, width=120):
+        """
+            HTML excerpt of a search result, the row text is always escaped:
+            the database `snippet` with its matches in <mark>, or for databases without snippets,
+            plain text around the first keyword in the row's columns
+        """
+        if snippet:
+            return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+        tokens = keyword_tokens(keyword)
+        for name in self.columns:
+            value = getattr(row, name) or ""
+            found = min((position for position in (value.lower().find(token) for token in tokens) if position >= 0), default=-1)
+            if found >= 0:
+                start = max(found - width // 3, 0)
+                return ("…" if start else "") + html.escape(value[start:start + width]) + ("…" if start + width < len(value) else "")
+        return None
+
+    @staticmethod
+    def fts5_query(tokens):
+        return " ".join(f'"{token}"*' for token in tokens)
+
+    @staticmethod
+    def boolean_query(tokens):
+        return " ".join(f"+{token}*" for token in tokens)
+
+
+question_search = SearchIndex("question", ["question_text"])
+help_topic_search = SearchIndex("help_topic", ["topic_title", "topic_content", "llm_answer"], weights=[4.0, 1.0, 1.0])
+
+SEARCH_INDEXES = [question_search, help_topic_search]
+
+
+def create_search_indexes(engine):
+    """
+        Create the missing full-text indexes, returns their names.
+        Building them on large tables takes a while and blocks writes to the table.
+    """
+    created = []
+    for index in SEARCH_INDEXES:
+        try:
+            if index.create(engine):
+                created.append(index.name)
+        except OperationalError as e:
+            # e.g. SQLite built without FTS5, searches keep using ILIKE
+            logger.warning("Could not create the full-text index %s: %s", index.name, e)
+    return created
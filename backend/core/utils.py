@@ -1,9 +1,55 @@
 # -*- encoding: utf-8 -*-
 
+import threading
 from datetime import datetime
-from flask_mail import Mail, Message
+from flask import current_app
 
-mail = Mail()
+
+class LazyMail():
+    """
+        Flask-Mail, imported and set up on first use so the mail stack (email.*, smtplib) is not loaded at boot
+    """
+
+    def __init__(self):
+        self.app = None
+        self._mail = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+
+    def connect(self):
+        return self._get_mail().connect()
+
+    def send(self, message):
+        return self._get_mail().send(message)
+
+    def _get_mail(self):
+        if self._mail is None:
+            with self._lock:
+                if self._mail is None:
+                    from flask_mail import Mail
+                    self._mail = Mail(self.app)
+        return self._mail
+
+
+mail = LazyMail()
+
+_templates = {}
+
+
+def render_cached_template(template_name, **context):
+    # load and compile the template once per process, then only render it
+    template = _templates.get(template_name)
+    if template is None:
+        template = _templates[template_name] = current_app.jinja_env.get_template(template_name)
+    return template.render(**context)
+
+
+def preload_templates(app):
+    # compile every template up front, e.g. before a prefork server forks its workers
+    for template_name in app.jinja_env.list_templates():
+        _templates[template_name] = app.jinja_env.get_template(template_name)
 
 
 def utc2local(utc_dtm):
@@ -0,0 +1,236 @@
+# -*- encoding: utf-8 -*-
+
+"""
+    Production server
+
+    Waitress threads in one process, or in prefork worker processes sharing one listening socket (--workers N).
+    The app is imported in the master before forking (models, mappers, templates),
+    so the workers share it copy-on-write and serve right away.
+    Each worker keeps its own in-memory caches, see "Running several workers" in the README.
+    Defaults come from the SERVER_* settings in core/config.py.
+    The graceful drain runs waitress's event loop here and closes its channels itself, which goes beyond
+    waitress's public API: keep waitress pinned in requirements.txt, tests/test_serve.py boots the server.
+
+        python serve.py
+        python serve.py --workers 4 --threads 8
+        kill -HUP <master pid>     graceful reload: the master re-executes itself with the new code,
+                                   starts new workers on the same socket, then drains the old ones
+        kill -TERM <master pid>    graceful shutdown
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+# passed to the re-executed master on reload
+LISTEN_FD_ENV = "LLMHOMEWORK_LISTEN_FD"
+OLD_WORKERS_ENV = "LLMHOMEWORK_OLD_WORKERS"
+
+logger = logging.getLogger("llmhomework.serve")
+
+
+def parse_args(config):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=config["SERVER_HOST"])
+    parser.add_argument("--port", type=int, default=config["SERVER_PORT"])
+    parser.add_argument("--workers", type=int, default=config["SERVER_WORKERS"], help="worker processes, 0 serves from this process")
+    parser.add_argument("--threads", type=int, default=config["SERVER_THREADS"], help="request threads per worker")
+    parser.add_argument("--backlog", type=int, default=config["SERVER_BACKLOG"])
+    parser.add_argument("--connection-limit", type=int, default=config["SERVER_CONNECTION_LIMIT"], help="open connections per worker")
+    parser.add_argument("--keepalive", type=int, default=config["SERVER_KEEPALIVE"], help="seconds an idle keep-alive connection stays open")
+    parser.add_argument("--graceful-timeout", type=int, default=config["SERVER_GRACEFUL_TIMEOUT"], help="seconds a stopping worker may drain")
+    args = parser.parse_args()
+    if not hasattr(os, "fork"):
+        args.workers = 0
+    return args
+
+
+def create_socket(args):
+    fd = os.environ.pop(LISTEN_FD_ENV, None)
+    if fd:
+        # reload, keep the socket of the previous master so no connection is refused
+        sock = socket.socket(fileno=int(fd))
+    else:
+        sock = socket.create_server((args.host, args.port), backlog=args.backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload(app):
+    from sqlalchemy.orm import configure_mappers
+    from core import startup
+    from core.models import db
+    from core.utils import preload_templates
+    from core.apis.spec import api_spec
+
+    # schema check and course index, once here instead of on the first request of every worker
+    startup()
+    configure_mappers()
+    preload_templates(app)
+    if app.config["API_DOCS_ENABLED"]:
+        # build or read swagger.json once here instead of in every worker
+        api_spec.load()
+    # the boot-time schema check opened connections, they must not be shared with the workers
+    with app.app_context():
+        db.engine.dispose()
+
+
+def serve_worker(app, sock, args):
+    """
+        Serve until SIGTERM/SIGINT, then stop accepting and let open requests finish
+    """
+    from waitress import create_server, wasyncore
+    from waitress.channel import HTTPChannel
+
+    # our own socket map, the loop below runs it
+    socket_map = {}
+    server = create_server(app, map=socket_map, sockets=[sock], threads=args.threads, backlog=args.backlog,
+                           connection_limit=args.connection_limit, channel_timeout=args.keepalive, ident="llmhomework")
+    stopping = []
+
+    def stop(signum, frame):
+        # only flag it, the listener is closed between two loop iterations
+        if not stopping:
+            stopping.append(time.monotonic())
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    logger.info("Worker %d serving on %s:%d with %d threads", os.getpid(), *sock.getsockname()[:2], args.threads)
+
+    master = os.getppid() if args.workers > 0 else None
+    while True:
+        wasyncore.loop(timeout=1, map=socket_map, use_poll=server.adj.asyncore_use_poll, count=1)
+        if not stopping and master is not None and os.getppid() != master:
+            # the master died without stopping us
+            stopping.append(time.monotonic())
+        if not stopping:
+            continue
+        if server.accepting:
+            # stop listening, but keep the trigger the request threads use to wake the loop
+            wasyncore.dispatcher.close(server)
+        channels = [channel for channel in list(socket_map.values()) if isinstance(channel, HTTPChannel)]
+        for channel in channels:
+            # close idle keep-alive connections, busy ones once their response is out,
+            # a connection accepted a moment ago gets a second for its request to arrive
+            idle = not channel.requests and not channel.total_outbufs_len and not channel.request
+            if idle and time.time() - channel.last_activity > 1:
+                channel.handle_close()
+        if not channels or time.monotonic() - stopping[0] > args.graceful_timeout:
+            break
+    server.task_dispatcher.shutdown(cancel_pending=True, timeout=5)
+    server.trigger.close()
+
+
+class Master():
+    """
+        Forks the workers, replaces the ones that die, handles reload and shutdown
+    """
+
+    def __init__(self, app, sock, args):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers = set()
+        self.stopping = False
+        self.reloading = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                serve_worker(self.app, self.sock, self.args)
+            except BaseException:
+                logger.exception("Worker %d failed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers.add(pid)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGHUP, self.handle_reload)
+
+        old_workers = [int(pid) for pid in os.environ.pop(OLD_WORKERS_ENV, "").split(",") if pid]
+        for _ in range(self.args.workers):
+            self.spawn()
+        # reload: the new workers accept now, the old ones drain and exit
+        for pid in old_workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        logger.info("Master %d listening on %s:%d with %d workers", os.getpid(), *self.sock.getsockname()[:2], self.args.workers)
+
+        while True:
+            self.reap()
+            if self.stopping:
+                self.shutdown()
+                return
+            if self.reloading:
+                self.reexec()
+            while not self.stopping and len(self.workers) < self.args.workers:
+                self.spawn()
+            time.sleep(0.5)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            if pid in self.workers:
+                self.workers.discard(pid)
+                if not self.stopping:
+                    logger.warning("Worker %d exited with status %d, replacing it", pid, status)
+
+    def shutdown(self):
+        for pid in self.workers:
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in self.workers:
+            os.kill(pid, signal.SIGKILL)
+        logger.info("Master %d stopped", os.getpid())
+
+    def reexec(self):
+        logger.info("Master %d reloading", os.getpid())
+        os.environ[LISTEN_FD_ENV] = str(self.sock.fileno())
+        os.environ[OLD_WORKERS_ENV] = ",".join(str(pid) for pid in self.workers)
+        # ignored dispositions survive exec, a second HUP must not kill the master before it is ready
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    def handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def handle_reload(self, signum, frame):
+        self.reloading = True
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s in %(name)s: %(message)s")
+    from core import app
+
+    args = parse_args(app.config)
+    sock = create_socket(args)
+    preload(app)
+    if args.workers <= 0:
+        serve_worker(app, sock, args)
+    else:
+        Master(app, sock, args).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# -*- encoding: utf-8 -*-
+
+import os
+import sys
+import tempfile
+
+# the app reads its configuration when core is imported: a throwaway database, no background extras
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db"))
+os.environ.setdefault("ACCESS_LOG_ENABLED", "false")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+# the tests create many users, a cheap hash keeps them fast
+os.environ.setdefault("PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from core import app as flask_app, startup
+from core.outbox import outbox
+
+# what serve.py does before serving: create the schema of the throwaway database
+startup()
+# the tests flush the outbox themselves, requests must not start the sender thread
+outbox._thread_pid = os.getpid()
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        yield flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """
+        make_user(username, user_type) -> a saved ACTIVE user, deleted again after the test
+    """
+    from core.models import db, User
+    created = []
+
+    def make(username, user_type="STUDENT", password="Passw0rdTest", **columns):
+        User.query.filter_by(username=username).delete()
+        db.session.commit()
+        user = User(username, f"{username}@uic.edu.cn", password, user_type, "ACTIVE")
+        for name, value in columns.items():
+            setattr(user, name, value)
+        user.save()
+        created.append(user.id)
+        return user
+
+    yield make
+    db.session.rollback()
+    User.query.filter(User.id.in_(created)).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def auth_header(user):
+    from core.apis.user import create_access_token
+    return {"Authorization": "Bearer " + create_access_token(user)}
@@ -0,0 +1,77 @@
+# -*- encoding: utf-8 -*-
+
+import json
+
+import pytest
+from flask import Flask
+
+from core.accesslog import AccessLog
+
+
+@pytest.fixture
+def logged_app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(ACCESS_LOG_ENABLED=True, ACCESS_LOG_FILE=str(tmp_path / "access.log"))
+
+    @app.route("/ok")
+    def ok():
+        return "ok"
+
+    @app.route("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    log = AccessLog()
+    log.init_app(app)
+
+    def records():
+        log.stop()
+        return [json.loads(line) for line in (tmp_path / "access.log").read_text().splitlines()]
+
+    yield app, records
+    log.stop()
+    log.logger.removeHandler(log.handler)
+
+
+def test_every_request_is_logged_once(logged_app):
+    app, records = logged_app
+
+    assert app.test_client().get("/ok").status_code == 200
+    assert app.test_client().get("/missing").status_code == 404
+
+    assert [(record["path"], record["status"]) for record in records()] == [("/ok", 200), ("/missing", 404)]
+
+
+def test_unhandled_exception_is_logged_as_500(logged_app):
+    app, records = logged_app
+
+    assert app.test_client().get("/boom").status_code == 500
+
+    record, = records()
+    assert (record["path"], record["endpoint"], record["status"]) == ("/boom", "boom", 500)
+    assert record["total_ms"] >= 0
+
+
+def test_propagated_exception_is_logged_as_500(logged_app):
+    app, records = logged_app
+    # debug and testing let the exception through to the server, no after_request runs
+    app.testing = True
+
+    with pytest.raises(RuntimeError):
+        app.test_client().get("/boom")
+
+    record, = records()
+    assert (record["path"], record["status"]) == ("/boom", 500)
+
+
+def test_failing_after_request_hook_is_logged_as_500(logged_app):
+    app, records = logged_app
+
+    @app.after_request
+    def fail(response):
+        raise RuntimeError("hook")
+
+    assert app.test_client().get("/ok").status_code == 500
+
+    record, = records()
+    assert (record["path"], record["status"]) == ("/ok", 500)
@@ -0,0 +1,82 @@
+# -*- encoding: utf-8 -*-
+
+import pytest
+
+from conftest import auth_header
+from core.apis.user import create_refresh_token
+from core.models import db
+from core.ratelimit import MemoryBucketStore, parse_limits, rate_limiter
+
+
+def test_bumped_token_version_is_rejected(client, make_user):
+    user = make_user("authver")
+    headers = auth_header(user)
+    # the second request is answered from the principal cache
+    assert client.get(f"/api/v1/user?id={user.id}", headers=headers).status_code == 200
+    assert client.get(f"/api/v1/user?id={user.id}", headers=headers).status_code == 200
+
+    user.bump_token_version()
+    db.session.commit()
+
+    response = client.get(f"/api/v1/user?id={user.id}", headers=headers)
+    assert response.status_code == 401
+    assert response.get_json()["code"] == "INVALID_TOKEN"
+
+
+def test_logout_revokes_access_and_refresh_tokens(client, make_user):
+    user = make_user("authlogout")
+    headers = auth_header(user)
+    refresh_token = create_refresh_token(user)
+
+    assert client.post("/api/v1/user/logout", headers=headers).status_code == 200
+
+    assert client.get(f"/api/v1/user?id={user.id}", headers=headers).status_code == 401
+    response = client.post("/api/v1/user/token/refresh", json={"refreshToken": refresh_token})
+    assert response.status_code == 401
+    assert response.get_json()["code"] == "INVALID_TOKEN"
+
+
+def test_refresh_token_is_not_an_access_token(client, make_user):
+    user = make_user("authrefresh")
+    refresh_token = create_refresh_token(user)
+
+    response = client.get(f"/api/v1/user?id={user.id}", headers={"Authorization": "Bearer " + refresh_token})
+    assert response.status_code == 401
+    assert response.get_json()["code"] == "INVALID_TOKEN"
+
+    # and an access token is not a refresh token
+    access_token = auth_header(user)["Authorization"].split(" ")[1]
+    assert client.post("/api/v1/user/token/refresh", json={"refreshToken": access_token}).status_code == 401
+
+
+def test_refresh_token_issues_a_working_access_token(client, make_user):
+    user = make_user("authrenew")
+
+    response = client.post("/api/v1/user/token/refresh", json={"refreshToken": create_refresh_token(user)})
+    assert response.status_code == 200
+    token = response.get_json()["data"]["token"]
+
+    assert client.get(f"/api/v1/user?id={user.id}", headers={"Authorization": token}).status_code == 200
+
+
+@pytest.fixture
+def login_limit(monkeypatch):
+    """
+        Two logins per minute per IP, in fresh buckets
+    """
+    monkeypatch.setattr(rate_limiter, "enabled", True)
+    monkeypatch.setattr(rate_limiter, "store", MemoryBucketStore())
+    monkeypatch.setitem(rate_limiter.limits, "login", parse_limits("ip=2/minute"))
+
+
+def test_rate_limit_answers_429_with_retry_after(client, login_limit):
+    credentials = {"email": "nobody@uic.edu.cn", "password": "Passw0rdTest"}
+
+    assert client.post("/api/v1/user/login", json=credentials).status_code == 400
+    assert client.post("/api/v1/user/login", json=credentials).status_code == 400
+    response = client.post("/api/v1/user/login", json=credentials)
+
+    assert response.status_code == 429
+    assert response.get_json()["code"] == "TOO_MANY_REQUESTS"
+    # one token refills in 30 seconds at 2/minute
+    assert 1 <= int(response.headers["Retry-After"]) <= 30
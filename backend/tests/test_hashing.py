@@ -0,0 +1,40 @@
+# -*- encoding: utf-8 -*-
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from core.hashing import PasswordHasher, password_hasher
+from core.models import db
+
+
+@pytest.mark.parametrize("method", ["scrypt", "scrypt:32768:8:1", "pbkdf2", "pbkdf2:sha256", "pbkdf2:sha256:600000"])
+def test_hash_made_with_the_configured_method_needs_no_rehash(method):
+    hasher = PasswordHasher(method)
+
+    assert not hasher.needs_rehash(generate_password_hash("Passw0rdTest", method))
+
+
+@pytest.mark.parametrize("method, configured", [
+    ("scrypt:16384:8:1", "scrypt"),
+    ("pbkdf2:sha256:1000", "pbkdf2:sha256"),
+    ("pbkdf2:sha256", "pbkdf2:sha512"),
+    ("pbkdf2:sha256", "scrypt"),
+])
+def test_hash_made_with_other_parameters_needs_a_rehash(method, configured):
+    assert PasswordHasher(configured).needs_rehash(generate_password_hash("Passw0rdTest", method))
+
+
+def test_login_rehashes_only_once(client, make_user, monkeypatch):
+    user = make_user("rehash", password="Passw0rdRehash")
+    # more iterations than the conftest method the user was hashed with
+    monkeypatch.setattr(password_hasher, "method", "pbkdf2:sha256:2000")
+    credentials = {"email": "rehash@uic.edu.cn", "password": "Passw0rdRehash"}
+
+    assert client.post("/api/v1/user/login", json=credentials).status_code == 200
+    db.session.refresh(user)
+    rehashed = user.password
+    assert rehashed.startswith("pbkdf2:sha256:2000$")
+
+    assert client.post("/api/v1/user/login", json=credentials).status_code == 200
+    db.session.refresh(user)
+    assert user.password == rehashed
@@ -0,0 +1,218 @@
+# -*- encoding: utf-8 -*-
+
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.models import db, EmailOutbox
+from core.outbox import outbox
+from core.utils import mail
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    """
+        Local SMTP stand-in: accepts plain SMTP on 127.0.0.1, keeps the delivered messages,
+        and refuses the next `refuse` messages with a temporary error
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubSMTPHandler)
+        self.port = self.server_address[1]
+        self.messages = []  # (mail from, recipients, data)
+        self.connections = 0
+        self.refuse = 0
+        self.lock = threading.Lock()
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 stub ESMTP")
+        mail_from, recipients = None, []
+        for raw in self.rfile:
+            command = raw.decode().rstrip("\r\n")
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 stub")
+            elif verb == "MAIL":
+                with server.lock:
+                    refused = server.refuse > 0
+                    if refused:
+                        server.refuse -= 1
+                if refused:
+                    self.reply("451 4.3.0 try again later")
+                    continue
+                mail_from, recipients = command[10:].strip(" <>"), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command[8:].strip(" <>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 end with <CRLF>.<CRLF>")
+                lines = []
+                for data in self.rfile:
+                    if data in (b".\r\n", b".\n"):
+                        break
+                    lines.append(data)
+                with server.lock:
+                    server.messages.append((mail_from, recipients, b"".join(lines).decode()))
+                self.reply("250 OK queued")
+            elif verb == "RSET":
+                mail_from, recipients = None, []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 not implemented")
+
+
+@pytest.fixture
+def smtp_server(app):
+    server = StubSMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    saved = {key: app.config[key] for key in ("MAIL_SERVER", "MAIL_PORT", "MAIL_USE_TLS", "MAIL_USERNAME", "MAIL_PASSWORD")}
+    settings = {name: getattr(outbox, name) for name in ("retry_base", "max_attempts", "poll_interval", "retention_days")}
+    app.config.update(MAIL_SERVER="127.0.0.1", MAIL_PORT=server.port, MAIL_USE_TLS=False, MAIL_USERNAME=None, MAIL_PASSWORD=None)
+    # Flask-Mail reads the settings when it is first used, start from a fresh instance and connection
+    mail._mail = None
+    outbox._close_connection()
+    EmailOutbox.query.delete()
+    db.session.commit()
+    yield server
+    outbox._close_connection()
+    mail._mail = None
+    app.config.update(saved)
+    for name, value in settings.items():
+        setattr(outbox, name, value)
+    server.shutdown()
+    server.server_close()
+
+
+def enqueue(count):
+    return [outbox.enqueue(f"Subject {i}", "noreply@uic.edu.cn", [f"student{i}@uic.edu.cn"], f"<p>Hello {i}</p>").id for i in range(count)]
+
+
+def test_flush_delivers_over_one_connection_and_marks_sent(smtp_server):
+    ids = enqueue(3)
+
+    assert outbox.flush() == 3
+
+    assert [recipients for _, recipients, _ in smtp_server.messages] == [[f"student{i}@uic.edu.cn"] for i in range(3)]
+    assert all(mail_from == "noreply@uic.edu.cn" for mail_from, _, _ in smtp_server.messages)
+    assert "Hello 0" in smtp_server.messages[0][2]
+    assert smtp_server.connections == 1
+    for message in EmailOutbox.query.filter(EmailOutbox.id.in_(ids)):
+        assert message.status == 'SENT'
+        assert message.sent_at is not None
+        assert message.attempts == 0
+    # nothing is sent twice
+    assert outbox.flush() == 0
+    assert len(smtp_server.messages) == 3
+
+
+def test_failed_delivery_is_retried_with_backoff(smtp_server):
+    outbox.retry_base = 30
+    smtp_server.refuse = 1
+    message_id, = enqueue(1)
+
+    started = datetime.now()
+    assert outbox.flush() == 0
+
+    message = db.session.get(EmailOutbox, message_id)
+    assert message.status == 'PENDING'
+    assert message.attempts == 1
+    assert "try again later" in message.last_error
+    assert started + timedelta(seconds=29) <= message.next_attempt_at <= datetime.now() + timedelta(seconds=31)
+    # not due before the backoff
+    assert outbox.flush() == 0
+    assert smtp_server.messages == []
+
+    message.next_attempt_at = datetime.now()
+    db.session.commit()
+    assert outbox.flush() == 1
+
+    message = db.session.get(EmailOutbox, message_id)
+    assert message.status == 'SENT'
+    assert message.last_error is None
+    assert len(smtp_server.messages) == 1
+
+
+def test_backoff_doubles_and_gives_up_after_max_attempts(smtp_server):
+    outbox.retry_base = 30
+    outbox.max_attempts = 3
+    smtp_server.refuse = 3
+    message_id, = enqueue(1)
+
+    delays = []
+    for _ in range(3):
+        before = datetime.now()
+        outbox.flush()
+        message = db.session.get(EmailOutbox, message_id)
+        delays.append((message.next_attempt_at - before).total_seconds())
+        message.next_attempt_at = datetime.now()
+        db.session.commit()
+
+    assert message.status == 'FAILED'
+    assert message.attempts == 3
+    assert round(delays[0]) == 30 and round(delays[1]) == 60
+    assert smtp_server.messages == []
+
+
+def test_sent_messages_are_purged_after_the_retention_period(smtp_server):
+    outbox.retention_days = 7
+    old, recent, failed = enqueue(3)
+    assert outbox.flush() == 3
+    db.session.get(EmailOutbox, old).sent_at = datetime.now() - timedelta(days=8)
+    message = db.session.get(EmailOutbox, failed)
+    message.status, message.sent_at = 'FAILED', None
+    db.session.commit()
+
+    assert outbox.purge() == 1
+
+    assert db.session.get(EmailOutbox, old) is None
+    assert db.session.get(EmailOutbox, recent).status == 'SENT'
+    assert db.session.get(EmailOutbox, failed).status == 'FAILED'
+
+
+def test_disabled_outbox_sends_on_the_request_thread(smtp_server, monkeypatch):
+    monkeypatch.setattr(outbox, "enabled", False)
+
+    assert outbox.enqueue("Subject", "noreply@uic.edu.cn", ["student@uic.edu.cn"], "<p>Hello</p>") is None
+
+    assert [recipients for _, recipients, _ in smtp_server.messages] == [["student@uic.edu.cn"]]
+    assert EmailOutbox.query.count() == 0
+
+
+def test_background_sender_delivers_enqueued_messages(smtp_server):
+    outbox.poll_interval = 0.05
+    # conftest keeps the requests from starting it
+    outbox._thread_pid = None
+    outbox.ensure_started()
+    message_id, = enqueue(1)
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        db.session.expire_all()
+        if db.session.get(EmailOutbox, message_id).status == 'SENT':
+            break
+        time.sleep(0.05)
+
+    assert db.session.get(EmailOutbox, message_id).status == 'SENT'
+    assert len(smtp_server.messages) == 1
+
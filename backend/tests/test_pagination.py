@@ -0,0 +1,115 @@
+# -*- encoding: utf-8 -*-
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import auth_header
+from core.config import BaseConfig
+from core.models import db, User
+from core.pagination import TotalCounter, encode_cursor, paginate
+
+
+@pytest.fixture
+def directory(make_user):
+    admin = make_user("listadmin", "ADMIN")
+    started = datetime(2026, 1, 1)
+    # two users never online, the others one hour apart, listed by the "pager" prefix
+    users = [make_user(f"pager{i}", last_online=started + timedelta(hours=i) if i > 1 else None) for i in range(7)]
+    return auth_header(admin), users
+
+
+def list_users(client, headers, **params):
+    response = client.get("/api/v1/users", query_string=dict({"username": "pager"}, **params), headers=headers)
+    return response.status_code, response.json
+
+
+@pytest.mark.parametrize("sort_by,order", [("id", "asc"), ("username", "desc"), ("last_online", "asc"), ("last_online", "desc")])
+def test_cursor_pages_match_the_offset_listing(client, directory, sort_by, order):
+    headers, users = directory
+    status, body = list_users(client, headers, sortBy=sort_by, order=order, pageSize=BaseConfig.MAX_PAGE_SIZE)
+    assert status == 200
+    expected = [user["id"] for user in body["data"]["users"]]
+    assert sorted(expected) == sorted(user.id for user in users)
+
+    walked, cursor = [], ""
+    while cursor is not None:
+        status, body = list_users(client, headers, sortBy=sort_by, order=order, pageSize=2, cursor=cursor)
+        assert status == 200
+        assert len(body["data"]["users"]) <= 2
+        walked += [user["id"] for user in body["data"]["users"]]
+        cursor = body["data"]["pagination"]["nextCursor"]
+
+    assert walked == expected
+
+
+@pytest.mark.parametrize("cursor,sort_by", [
+    ("W3t9XQ", "id"),                                     # [{}]
+    ("not a cursor!", "id"),
+    (encode_cursor([None, 1]), "username"),               # username is never NULL
+    (encode_cursor(["3"]), "id"),
+    (encode_cursor([True]), "id"),
+    (encode_cursor([1]), "username"),                     # two sort columns
+    (encode_cursor(["2026-13-01T00:00:00", 1]), "last_online"),
+    (encode_cursor([5, 1]), "last_online"),
+])
+def test_tampered_cursor_is_rejected(client, directory, cursor, sort_by):
+    headers, _ = directory
+
+    status, body = list_users(client, headers, sortBy=sort_by, cursor=cursor)
+
+    assert status == 400
+    assert body["code"] == "CURSOR_INVALID"
+
+
+@pytest.mark.parametrize("page_size", [0, -1, BaseConfig.MAX_PAGE_SIZE + 1])
+@pytest.mark.parametrize("mode", [{"cursor": ""}, {"current": 1}])
+def test_page_size_out_of_range_is_rejected(client, directory, page_size, mode):
+    headers, _ = directory
+
+    status, body = list_users(client, headers, pageSize=page_size, **mode)
+
+    assert status == 400
+    assert body["code"] == "PAGE_SIZE_INVALID"
+
+
+def test_prefix_of_the_last_code_point(client, directory, make_user):
+    headers, _ = directory
+    last = chr(0x10FFFF)
+    user = make_user("pager" + last + "z")
+
+    status, body = list_users(client, headers, username="pager" + last)
+    assert status == 200
+    assert [found["id"] for found in body["data"]["users"]] == [user.id]
+    status, _ = list_users(client, headers, username=last)
+    assert status == 404
+
+
+def test_total_modes_and_cache_invalidation(app, directory):
+    counter = TotalCounter(estimate_limit=3)
+    query = User.query.filter(User.username.like("pager%"))
+
+    assert counter.count(query, "none") is None
+    assert counter.count(query, "exact") == 7
+    # exact below the estimate limit, extrapolated over the id range beyond it
+    assert counter.estimate(query.filter(User.username == "pager3")) == 1
+    assert counter.count(query, "estimate") >= 3
+
+    db.session.add(User("pager7", "pager7@uic.edu.cn", "Passw0rdTest", "STUDENT", "ACTIVE"))
+    db.session.commit()
+    try:
+        assert counter.count(query, "exact") == 7  # cached
+        counter.invalidate(["user"])
+        assert counter.count(query, "exact") == 8
+    finally:
+        User.query.filter_by(username="pager7").delete()
+        db.session.commit()
+
+
+def test_paginate_counts_only_when_needed(app, directory):
+    query = User.query.filter(User.username.like("pager%")).order_by(User.id)
+
+    items, total, has_more = paginate(query, 1, 3, "none")
+    assert (len(items), total, has_more) == (3, None, True)
+    items, total, has_more = paginate(query, 3, 3, "exact")
+    assert (len(items), total, has_more) == (1, 7, False)
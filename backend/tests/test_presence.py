@@ -0,0 +1,95 @@
+# -*- encoding: utf-8 -*-
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import auth_header
+from core.models import db, User
+from core.presence import PresenceBuffer, presence_buffer
+
+
+@pytest.fixture
+def users(app):
+    User.query.filter(User.username.in_(["presence1", "presence2"])).delete(synchronize_session=False)
+    db.session.commit()
+    created = [User(f"presence{i}", f"presence{i}@uic.edu.cn", "Passw0rdPresence", "STUDENT", "ACTIVE") for i in (1, 2)]
+    db.session.add_all(created)
+    db.session.commit()
+    return created
+
+
+def test_flush_skips_deleted_users(app, users):
+    buffer = PresenceBuffer()
+    buffer.app = app
+    buffer.writer = User.update_last_online_bulk
+    when = datetime(2026, 1, 1, 12, 0, 0)
+    kept, deleted = users
+    buffer.touch(kept.id, when)
+    buffer.touch(deleted.id, when)
+    deleted_id = deleted.id
+    db.session.delete(deleted)
+    db.session.commit()
+
+    assert buffer.flush() == 2
+
+    db.session.expire_all()
+    assert db.session.get(User, kept.id).last_online == when
+    assert db.session.get(User, deleted_id) is None
+    assert buffer.stats()["pending"] == 0
+
+
+def test_failing_batch_is_dropped_after_max_retries(app):
+    def failing_writer(pending):
+        raise RuntimeError("database unavailable")
+
+    buffer = PresenceBuffer(max_retries=2)
+    buffer.app = app
+    buffer.writer = failing_writer
+    buffer.touch(1, datetime.now())
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            buffer.flush()
+        assert buffer.stats()["pending"] == 1
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    assert buffer.stats()["pending"] == 0
+    assert buffer.stats()["dropped"] == 1
+
+    # later timestamps are written again
+    written = {}
+    buffer.writer = written.update
+    buffer.touch(2, datetime.now() + timedelta(seconds=1))
+    assert buffer.flush() == 1
+    assert list(written) == [2]
+
+
+def test_earlier_timestamp_does_not_replace_a_later_one(app, users):
+    # another worker process flushed a later timestamp first
+    later, earlier = datetime(2026, 1, 1, 12, 0, 0), datetime(2026, 1, 1, 11, 0, 0)
+    user, other = users
+    User.update_last_online_bulk({user.id: later})
+    User.update_last_online_bulk({user.id: earlier, other.id: earlier})
+
+    db.session.expire_all()
+    assert db.session.get(User, user.id).last_online == later
+    assert db.session.get(User, other.id).last_online == earlier
+
+
+@pytest.mark.parametrize("cursor", ["", None])
+def test_last_online_sort_sees_buffered_timestamps(client, make_user, users, cursor):
+    admin = make_user("lastonlineadmin", "ADMIN")
+    # timestamps buffered for earlier users with the same ids
+    presence_buffer.flush()
+    users[0].last_online, users[1].last_online = datetime(2026, 1, 1, 10, 0, 0), datetime(2026, 1, 1, 11, 0, 0)
+    db.session.commit()
+    # presence1 was active since, only this worker's buffer knows
+    presence_buffer.touch(users[0].id, datetime(2026, 1, 1, 12, 0, 0))
+    query = "/api/v1/users?username=presence&sortBy=last_online&order=desc" + ("" if cursor is None else "&cursor=")
+
+    response = client.get(query, headers=auth_header(admin))
+
+    assert response.status_code == 200
+    listed = response.get_json()["data"]["users"]
+    assert [(user["username"], user["last_online"]) for user in listed] == [("presence1", "2026-01-01 12:00:00"), ("presence2", "2026-01-01 11:00:00")]
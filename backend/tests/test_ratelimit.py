@@ -0,0 +1,55 @@
+# -*- encoding: utf-8 -*-
+
+from core.ratelimit import MemoryBucketStore, RateLimiter, SQLiteBucketStore, parse_limits
+
+
+class CountingStore(MemoryBucketStore):
+
+    def __init__(self):
+        super().__init__()
+        self.purges = 0
+
+    def purge(self, before):
+        self.purges += 1
+        super().purge(before)
+
+
+def limiter(store):
+    rate_limiter = RateLimiter()
+    rate_limiter.store = store
+    rate_limiter.limits = {"login": parse_limits("ip=2/minute, email=5/minute")}
+    return rate_limiter
+
+
+def test_idle_buckets_are_purged_periodically_not_on_each_hit(monkeypatch):
+    store = CountingStore()
+    rate_limiter = limiter(store)
+    now = 1000000.0
+    monkeypatch.setattr("core.ratelimit.time.time", lambda: now)
+
+    for _ in range(5):
+        rate_limiter.hit("login", {"ip": "10.0.0.1"})
+    assert store.purges == 1
+
+    now += rate_limiter.purge_interval
+    rate_limiter.hit("login", {"ip": "10.0.0.2"})
+    assert store.purges == 2
+
+    # a day later only the bucket hit just now is left
+    now += 86401
+    rate_limiter.hit("login", {"ip": "10.0.0.3"})
+    assert list(store._buckets) == ["login:ip:10.0.0.3"]
+
+
+def test_sqlite_store_is_shared_and_purged(tmp_path):
+    path = str(tmp_path / "ratelimit.db")
+    first, second = limiter(SQLiteBucketStore(path)), limiter(SQLiteBucketStore(path))
+    identities = {"ip": "10.0.0.1", "email": "a@uic.edu.cn"}
+
+    assert first.hit("login", identities) == 0
+    assert second.hit("login", identities) == 0
+    # the third login of this IP within the minute, whichever worker takes it
+    assert 1 <= first.hit("login", identities) <= 30
+
+    first.store.purge(float("inf"))
+    assert second.hit("login", identities) == 0
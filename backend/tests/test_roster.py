@@ -0,0 +1,56 @@
+# -*- encoding: utf-8 -*-
+
+import json
+
+import pytest
+
+from conftest import auth_header
+from core.models import db, User
+
+
+@pytest.fixture
+def roster_users(app):
+    usernames = ["rosterone", "rostertwo", "rosterdup"]
+    yield usernames
+    db.session.rollback()
+    User.query.filter(User.username.in_(usernames)).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def test_roster_import_reports_every_row(client, make_user, roster_users):
+    admin = make_user("rosteradmin", "ADMIN")
+    rows = [
+        {"username": "rosterone", "email": "rosterone@mail.uic.edu.cn", "password": "Passw0rdRoster"},
+        {"username": "rostertwo", "email": "rostertwo@mail.uic.edu.cn", "password": 12345678},
+        {"username": "rosterdup", "email": "rosterone@mail.uic.edu.cn", "password": "Passw0rdRoster"},
+        {"username": "rosterweak", "email": "rosterweak@mail.uic.edu.cn", "password": "weak"},
+    ]
+    body = "\n".join(json.dumps(row) for row in rows)
+
+    response = client.post("/api/v1/users/roster?format=jsonl", data=body, headers=auth_header(admin))
+
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert (data["total"], data["registered"], data["failed"]) == (4, 1, 3)
+    assert [result["code"] for result in data["results"]] == ["REGISTRATION_SUCCESSFUL", "FIELD_INVALID", "EMAIL_DUPLICATED", "PASSWORD_INVALID"]
+    user = User.get_by_username("rosterone")
+    assert user.get_user_type() == "STUDENT"
+    assert user.check_password("Passw0rdRoster")
+
+
+def test_roster_import_requires_an_admin(client, make_user):
+    teacher = make_user("rosterteacher", "TEACHER")
+
+    response = client.post("/api/v1/users/roster?format=jsonl", data="{}", headers=auth_header(teacher))
+
+    assert response.status_code == 403
+    assert User.query.filter_by(username="rosterone").first() is None
+
+
+def test_malformed_roster_is_rejected(client, make_user):
+    admin = make_user("rosteradmin", "ADMIN")
+
+    response = client.post("/api/v1/users/roster?format=jsonl", data="{not json", headers=auth_header(admin))
+
+    assert response.status_code == 400
+    assert response.get_json()["code"] == "ROSTER_INVALID"
@@ -0,0 +1,61 @@
+# -*- encoding: utf-8 -*-
+
+import pytest
+from sqlalchemy import text
+
+from core.models import db, SchemaFingerprint, User
+from core.schema import SchemaMismatch, bootstrap_schema, check_schema, missing_columns
+
+
+@pytest.fixture
+def baseline_user_table(app):
+    """
+        The user table as the databases created before token versioning have it: no token_version column
+    """
+    User.query.filter_by(username="baseline").delete()
+    db.session.commit()
+    db.session.add(User("baseline", "baseline@uic.edu.cn", "Passw0rdBaseline", "STUDENT", "ACTIVE"))
+    db.session.commit()
+    db.session.close()
+    with db.engine.begin() as connection:
+        connection.execute(text("ALTER TABLE user DROP COLUMN token_version"))
+    assert missing_columns() == ["user.token_version"]
+    yield
+    db.session.rollback()
+    if missing_columns():
+        bootstrap_schema()
+
+
+def test_baseline_database_is_upgraded_at_boot(app, baseline_user_table):
+    # a baseline database has no fingerprint either
+    SchemaFingerprint.query.delete()
+    db.session.commit()
+
+    check_schema(app)
+
+    assert missing_columns() == []
+    assert SchemaFingerprint.get_stored() == SchemaFingerprint.compute()
+    user = User.get_by_username("baseline")
+    assert user.get_token_version() == 0
+    user.bump_token_version()
+    db.session.commit()
+    db.session.expire_all()
+    assert User.get_by_username("baseline").get_token_version() == 1
+
+
+def test_missing_column_is_fatal_at_boot_without_strict(app, baseline_user_table):
+    assert not app.config["SCHEMA_STRICT"]
+
+    with pytest.raises(SchemaMismatch, match="user.token_version"):
+        check_schema(app)
+
+
+def test_column_that_cannot_be_added_is_fatal_at_boot(app, baseline_user_table, monkeypatch):
+    SchemaFingerprint.query.delete()
+    db.session.commit()
+    # as for a NOT NULL column without a default
+    monkeypatch.setattr("core.schema.add_missing_columns", lambda: [])
+
+    with pytest.raises(SchemaMismatch, match="user.token_version"):
+        check_schema(app)
+    assert SchemaFingerprint.get_stored() is None
@@ -0,0 +1,29 @@
+# -*- encoding: utf-8 -*-
+
+from types import SimpleNamespace
+
+from core.models import db, Course, Question
+from core.search import question_search
+
+
+def test_database_snippet_is_escaped_around_the_marks(app):
+    course = Course.add_course("SNIP1001", "Snippets", "PROG")
+    question = Question.add_question("<script>alert(1)</script> explain recursion & <b>loops</b>", "PROG", 5, course.id)
+    try:
+        (row, snippet), = question_search.search(Question, Question.query.filter(Question.id == question.id), "recursion").all()
+
+        html = question_search.snippet(row, "recursion", snippet)
+
+        assert "<script>" not in html and "<b>" not in html
+        assert "&lt;script&gt;alert(1)&lt;/script&gt;" in html
+        assert "<mark>recursion</mark> &amp; &lt;b&gt;" in html
+    finally:
+        db.session.delete(question)
+        db.session.delete(course)
+        db.session.commit()
+
+
+def test_fallback_snippet_is_escaped():
+    row = SimpleNamespace(question_text="<img src=x onerror=alert(1)> recursion")
+
+    assert question_search.snippet(row, "recursion") == "&lt;img src=x onerror=alert(1)&gt; recursion"
@@ -0,0 +1,46 @@
+# -*- encoding: utf-8 -*-
+
+import os
+import queue
+import re
+import signal
+import subprocess
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_for(lines, pattern, timeout=30):
+    while True:
+        line = lines.get(timeout=timeout)
+        match = re.search(pattern, line)
+        if match:
+            return match
+
+
+@pytest.mark.skipif(os.name != "posix", reason="serve.py forks and stops on POSIX signals")
+@pytest.mark.parametrize("workers", [0, 1])
+def test_server_boots_serves_and_stops(app, workers):
+    # the environment conftest set up: the same throwaway database, already initialized
+    server = subprocess.Popen([sys.executable, "serve.py", "--host", "127.0.0.1", "--port", "0", "--workers", str(workers), "--threads", "2", "--graceful-timeout", "5"],
+                              cwd=BACKEND_DIR, env=os.environ.copy(), stderr=subprocess.PIPE, text=True)
+    lines = queue.Queue()
+    threading.Thread(target=lambda: [lines.put(line) for line in server.stderr], daemon=True).start()
+    try:
+        port = int(wait_for(lines, r"Worker \d+ serving on 127\.0\.0\.1:(\d+)").group(1))
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/api/v1/users", timeout=10)
+        assert error.value.code == 401
+
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=20) == 0
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
@@ -0,0 +1,37 @@
+# -*- encoding: utf-8 -*-
+
+from flask_restx import Model, fields
+
+from core.apis import validators
+from core.apis.validation import compile_model
+
+
+def test_every_api_model_is_compiled():
+    assert {"Login", "RefreshToken", "ChangeUser"} <= validators.keys()
+
+
+def test_compiled_validator_reports_restx_style_errors():
+    validate = validators["Login"]
+
+    assert validate({"email": "a@uic.edu.cn", "password": "Passw0rdTest"}) == {}
+    assert set(validate({"email": "a@uic.edu.cn"})) == {"password"}
+    assert set(validate({"email": 1, "password": "x" * 129})) == {"email", "password"}
+
+
+def test_numeric_fields_accept_numeric_strings():
+    item = Model("Item", {"score": fields.Float(required=True), "count": fields.Integer})
+    items = Model("Items", {"items": fields.List(fields.Nested(item))})
+    validate = compile_model(items, {"Item": item, "Items": items})
+
+    assert validate({"items": [{"score": "4.5", "count": "3"}, {"score": 2, "count": None}]}) == {}
+    assert set(validate({"items": [{"score": "4.5"}, {"score": "high"}, {"count": "1.5"}]})) == {"items.1.score", "items.2.score", "items.2.count"}
+
+
+def test_invalid_payload_answers_the_validation_envelope(client):
+    response = client.post("/api/v1/user/login", json={"email": "a@uic.edu.cn"})
+
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body["success"] is False
+    assert body["code"] == "VALIDATION_ERROR"
+    assert "password" in body["message"]
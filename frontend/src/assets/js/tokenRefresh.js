@@ -0,0 +1,60 @@
+import { apiBaseUrl } from '@/assets/js/config.js';
+
+// Access tokens are short-lived. When an API call fails with EXPIRED_TOKEN,
+// exchange the stored refresh token for a new access token and retry once.
+let refreshing = null;
+
+const refreshAccessToken = originalFetch => {
+  if (!refreshing) {
+    refreshing = originalFetch(`${apiBaseUrl}/user/token/refresh`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refreshToken: localStorage.getItem('refreshToken') }),
+    })
+      .then(res => res.json())
+      .then(response => {
+        if (response.success) {
+          localStorage.setItem('token', response.data.token);
+          return response.data.token;
+        }
+        return null;
+      })
+      .catch(() => null)
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
+const installTokenRefresh = () => {
+  const originalFetch = window.fetch.bind(window);
+
+  window.fetch = async (input, init = {}) => {
+    const response = await originalFetch(input, init);
+    const url = typeof input === 'string' ? input : input.url;
+    const headers = new Headers(init.headers || {});
+    if (
+      response.status !== 401 ||
+      !url.startsWith(apiBaseUrl) ||
+      !headers.has('Authorization') ||
+      !localStorage.getItem('refreshToken')
+    ) {
+      return response;
+    }
+
+    const body = await response.clone().json().catch(() => ({}));
+    if (body.code !== 'EXPIRED_TOKEN') {
+      return response;
+    }
+
+    const token = await refreshAccessToken(originalFetch);
+    if (!token) {
+      return response;
+    }
+    headers.set('Authorization', token);
+    return originalFetch(input, { ...init, headers });
+  };
+};
+
+export default installTokenRefresh;
@@ -5,6 +5,9 @@ import store from './models';
 import App from './App';
 import { BrowserRouter as Router } from 'react-router-dom';
 import './index.common.less';
+import installTokenRefresh from './assets/js/tokenRefresh';
+
+installTokenRefresh();
 
 const container = document.getElementById('root');
 const root = createRoot(container);
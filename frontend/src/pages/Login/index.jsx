@@ -31,6 +31,7 @@ const Login = () => {
     if (response.success) {
       message.info(response.message);
       localStorage.setItem('token', response.data.token);
+      localStorage.setItem('refreshToken', response.data.refreshToken);
       localStorage.setItem('user', JSON.stringify(response.data.user));
       window.location.href = '/home';
     } else {
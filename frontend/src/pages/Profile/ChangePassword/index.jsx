@@ -43,6 +43,11 @@ const ChangePassword = () => {
       .then(response => {
         if (response.success) {
           message.success(response.message);
+          // the old token is revoked after a password change, keep the new one
+          if (response.data && response.data.token) {
+            localStorage.setItem('token', response.data.token);
+            localStorage.setItem('refreshToken', response.data.refreshToken);
+          }
           form.resetFields();
         } else {
           message.error(response.message);